@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+import sys
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Compare benchmark results against a stored baseline.")
+    p.add_argument("baseline", help="Baseline results JSON (from run_benchmarks.py)")
+    p.add_argument("current", help="Current results JSON")
+    p.add_argument("--threshold", type=float, default=0.10,
+                   help="Flag a regression when median time grows by more than this fraction (default 0.10)")
+    return p.parse_args()
+
+
+def _load(path: str) -> dict[tuple[str, int, int], dict]:
+    with Path(path).open("r", encoding="utf-8") as f:
+        report = json.load(f)
+    return {(r["case"], r["rows"], r["tickers"]): r for r in report["results"]}
+
+
+def compare(baseline: str, current: str, threshold: float = 0.10) -> list[dict]:
+    """
+    Median-time ratio (current / baseline) for every case present in both files.
+    Rows with ratio > 1 + threshold are marked as regressions.
+    """
+    base = _load(baseline)
+    cur = _load(current)
+
+    rows = []
+    for key in sorted(base.keys() & cur.keys()):
+        b, c = base[key]["median"], cur[key]["median"]
+        ratio = c / b if b > 0 else float("inf")
+        rows.append({
+            "case": key[0],
+            "rows": key[1],
+            "tickers": key[2],
+            "baseline": b,
+            "current": c,
+            "ratio": ratio,
+            "regression": ratio > 1.0 + threshold,
+        })
+    return rows
+
+
+def main() -> None:
+    args = parse_args()
+    rows = compare(args.baseline, args.current, args.threshold)
+    if not rows:
+        print("No common cases between baseline and current results.")
+        sys.exit(1)
+
+    print(f"{'case':<18} {'rows':>10} {'tickers':>7} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for r in rows:
+        flag = "  REGRESSION" if r["regression"] else ""
+        print(f"{r['case']:<18} {r['rows']:>10} {r['tickers']:>7} "
+              f"{r['baseline']:>9.4f}s {r['current']:>9.4f}s {r['ratio']:>6.2f}x{flag}")
+
+    regressions = [r for r in rows if r["regression"]]
+    print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%} threshold")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import argparse
+from contextlib import contextmanager
+import json
+import os
+from pathlib import Path
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import write_universe
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+# Windows used by the sweep case (a dense grid like the agent's refine stage)
+SWEEP_WINDOWS = list(range(5, 251, 5))
+
+# The shipped feature spec (sma 5..250 step 5, ...). build_features inside the
+# workspace does not see it and falls back to DEFAULT_SPEC, so the
+# features_default_spec cases load it from the repo.
+FEATURE_SPEC = REPO_ROOT / "configs" / "features" / "default.yaml"
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Time Axiom pipeline stages on synthetic OHLCV data.")
+    p.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000],
+                   help="Rows per ticker (e.g. 1000 100000 1000000 10000000)")
+    p.add_argument("--tickers", type=int, nargs="+", default=[1, 10],
+                   help="Universe sizes (e.g. 1 10 100 1000)")
+    p.add_argument("--repeat", type=int, default=3, help="Timed repetitions per case")
+    p.add_argument("--cases", nargs="+", default=None, help="Only run these cases (default: all)")
+    p.add_argument("--seed", type=int, default=0, help="Synthetic data seed")
+    p.add_argument("--out", default="benchmarks/results.json", help="Where to write the JSON results")
+    return p.parse_args()
+
+
+@contextmanager
+def _workspace():
+    """
+    Temporary working directory: pipeline code writes to relative data/ paths.
+    """
+    old = Path.cwd()
+    with tempfile.TemporaryDirectory(prefix="axiom-bench-") as tmp:
+        os.chdir(tmp)
+        try:
+            yield Path(tmp)
+        finally:
+            os.chdir(old)
+
+
+@contextmanager
+def _quiet():
+    """
+    Silence stdout at the file-descriptor level (covers run_batch's subprocesses too).
+    """
+    sys.stdout.flush()
+    saved = os.dup(1)
+    with open(os.devnull, "w") as devnull:
+        os.dup2(devnull.fileno(), 1)
+        try:
+            yield
+        finally:
+            sys.stdout.flush()
+            os.dup2(saved, 1)
+            os.close(saved)
+
+
+def _time(fn: Callable[[], object], repeat: int, setup: Callable[[], object] | None = None) -> list[float]:
+    """
+    Wall-clock seconds of fn() over `repeat` runs (output silenced, setup untimed).
+    """
+    seconds = []
+    for _ in range(repeat):
+        with _quiet():
+            if setup is not None:
+                setup()
+            t0 = time.perf_counter()
+            fn()
+            seconds.append(time.perf_counter() - t0)
+    return seconds
+
+
+def _write_config(path: Path) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        "risk:\n  max_drawdown: -0.30\n\n"
+        "search:\n  coarse_windows: [10, 20, 50, 100, 200]\n  refine_range: 20\n  refine_step: 5\n",
+        encoding="utf-8",
+    )
+    return path
+
+
+def run_size(n_rows: int, n_tickers: int, repeat: int, cases: set[str] | None, seed: int) -> list[dict]:
+    """
+    Run every benchmark case for one (rows, tickers) size inside a fresh workspace.
+    """
+    from src.agents.ma_research_agent import run_agent
+    from src.backtest.cache import ResultCache
+    from src.backtest.run_ma_backtest import run_ma_backtest, run_ma_sweep
+    from src.features.build_features import build_features
+    from src.features.library import compute_features, load_feature_spec
+    from src.tools.run_batch import run_batch
+    from src.tools.summarize_runs import summarize
+
+    results = []
+
+    def record(case: str, seconds: list[float]) -> None:
+        results.append({
+            "case": case,
+            "rows": n_rows,
+            "tickers": n_tickers,
+            "seconds": seconds,
+            "min": min(seconds),
+            "median": statistics.median(seconds),
+        })
+        print(f"  {case:<30} rows={n_rows:<10} tickers={n_tickers:<5} median={statistics.median(seconds):.4f}s")
+
+    def wanted(case: str) -> bool:
+        return cases is None or case in cases
+
+    with _workspace() as ws:
+        raw_paths = write_universe(ws / "data" / "raw", n_tickers, n_rows, seed)
+
+        # Features are needed by every later case, so they are always built once
+        seconds = _time(lambda: [build_features(p) for p in raw_paths], repeat if wanted("build_features") else 1)
+        if wanted("build_features"):
+            record("build_features", seconds)
+
+        # Rolling kernels alone (compute_features): the parquet write would hide their cost
+        spec = load_feature_spec(FEATURE_SPEC)
+        closes = [pd.read_parquet(p, columns=["Close"])["Close"].to_numpy(dtype=np.float64) for p in raw_paths]
+        for case, exact in (("features_default_spec", True), ("features_default_spec_approx", False)):
+            if wanted(case):
+                record(case, _time(lambda: [compute_features(c, spec, exact=exact) for c in closes], repeat))
+
+        feature_dir = ws / "data" / "features"
+        first = sorted(feature_dir.glob("*_feat.parquet"))[0]
+        config = _write_config(ws / "configs" / "ma.yaml")
+        for name in ("ma_aggressive", "ma_conservative"):
+            _write_config(ws / "configs" / f"{name}.yaml")
+
+        if wanted("run_ma_backtest"):
+            record("run_ma_backtest", _time(lambda: run_ma_backtest(first, ma_window=50), repeat))
+        if wanted("run_ma_backtest_metrics"):
+            record("run_ma_backtest_metrics", _time(
+                lambda: run_ma_backtest(first, ma_window=50, return_frame=False), repeat
+            ))
+        if wanted("run_ma_sweep"):
+            record("run_ma_sweep", _time(lambda: run_ma_sweep(first, SWEEP_WINDOWS), repeat))
+        if wanted("agent_search"):
+            record("agent_search", _time(
+                lambda: run_agent(config, feature_dir, ws / "reports" / "agent", use_cache=False), repeat
+            ))
+        if wanted("run_batch"):
+            record("run_batch", _time(
+                lambda: run_batch(str(ws / "configs"), str(feature_dir), str(ws / "reports" / "batch")),
+                repeat, setup=ResultCache().purge,
+            ))
+        if wanted("summarize"):
+            if not (ws / "reports" / "batch").exists():
+                with _quiet():
+                    run_batch(str(ws / "configs"), str(feature_dir), str(ws / "reports" / "batch"))
+            record("summarize", _time(lambda: summarize(str(ws / "reports" / "batch")), repeat))
+
+    return results
+
+
+def main() -> None:
+    args = parse_args()
+
+    # run_batch spawns `python -m src...` subprocesses from the temp workspace
+    os.environ["PYTHONPATH"] = os.pathsep.join(filter(None, [str(REPO_ROOT), os.environ.get("PYTHONPATH")]))
+    if str(REPO_ROOT) not in sys.path:
+        sys.path.insert(0, str(REPO_ROOT))
+
+    cases = set(args.cases) if args.cases else None
+    results = []
+    for n_tickers in args.tickers:
+        for n_rows in args.rows:
+            print(f"=== rows={n_rows} tickers={n_tickers} ===")
+            results.extend(run_size(n_rows, n_tickers, args.repeat, cases, args.seed))
+
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with out.open("w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print("Saved benchmark results:", out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from pathlib import Path
+import zlib
+
+import numpy as np
+import pandas as pd
+
+
+# Log-return drift and vol per trading day of the synthetic random walk
+DAILY_DRIFT = 0.0003
+DAILY_VOL = 0.015
+MINUTES_PER_DAY = 1440
+
+
+def synthetic_ticker(i: int) -> str:
+    """
+    Deterministic ticker label for the i-th synthetic instrument (SYN0000, SYN0001, ...).
+    """
+    return f"SYN{i:04d}"
+
+
+def generate_ohlcv(n_rows: int, ticker: str = "SYN0000", seed: int = 0, start: str = "1990-01-01") -> pd.DataFrame:
+    """
+    Deterministic synthetic daily OHLCV in the layout download.py writes
+    (Date, Open, High, Low, Close, Volume).
+
+    Close follows a geometric random walk (DAILY_DRIFT / DAILY_VOL per day, scaled
+    down per bar on the minute calendar); the RNG stream depends only on
+    (seed, ticker), so every ticker is reproducible on its own.
+    Dates are business days from `start` (10M rows reaches far past 2262, so
+    very long series fall back to a minute-bar calendar).
+    """
+    stream = zlib.crc32(ticker.encode()) ^ seed
+    rng = np.random.default_rng([seed, stream])
+
+    if n_rows <= 60_000:
+        dates = pd.bdate_range(start, periods=n_rows)
+        bars_per_day = 1
+    else:
+        dates = pd.date_range(start, periods=n_rows, freq="min")
+        bars_per_day = MINUTES_PER_DAY
+
+    # Daily drift / vol scaled to the bar length, so long minute series stay finite
+    # (unscaled, exp(cumsum) overflows past ~2.3M rows)
+    log_ret = rng.normal(DAILY_DRIFT / bars_per_day, DAILY_VOL / np.sqrt(bars_per_day), n_rows)
+    close = 100.0 * np.exp(np.cumsum(log_ret))
+    spread = np.abs(rng.normal(0.0, 0.005, n_rows))
+    open_offset = rng.uniform(-1.0, 1.0, n_rows) * spread
+
+    return pd.DataFrame({
+        "Date": dates,
+        "Open": close * (1.0 + open_offset),
+        "High": close * (1.0 + spread),
+        "Low": close * (1.0 - spread),
+        "Close": close,
+        "Volume": rng.integers(100_000, 10_000_000, n_rows),
+    })
+
+
+def write_universe(raw_dir: Path, n_tickers: int, n_rows: int, seed: int = 0) -> list[Path]:
+    """
+    Write n_tickers synthetic raw parquet files ({ticker}.parquet) under raw_dir.
+    Returns the written paths.
+    """
+    raw_dir = Path(raw_dir)
+    raw_dir.mkdir(parents=True, exist_ok=True)
+
+    paths = []
+    for i in range(n_tickers):
+        ticker = synthetic_ticker(i)
+        path = raw_dir / f"{ticker}.parquet"
+        generate_ohlcv(n_rows, ticker, seed).to_parquet(path, index=False)
+        paths.append(path)
+    return paths
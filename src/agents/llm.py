@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import hashlib
+import importlib.util
+import json
+import os
+from pathlib import Path
+import time
+from typing import Protocol
+
+
+LLM_CACHE_DIR = Path("data") / "cache" / "llm"
+DEFAULT_MODEL = "models/gemini-2.5-flash"
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+
+
+class LLMClient(Protocol):
+    """
+    Anything that turns a prompt into text.
+    """
+
+    def generate(self, prompt: str, model: str = DEFAULT_MODEL) -> str:
+        ...
+
+
+class GeminiClient:
+    """
+    Google Gemini via google-genai (imported lazily; the client is created once).
+    """
+
+    def __init__(self, api_key: str | None = None):
+        self.api_key = api_key or os.getenv("GEMINI_API_KEY")
+        self._client = None
+
+    def generate(self, prompt: str, model: str = DEFAULT_MODEL) -> str:
+        if self._client is None:
+            from google import genai
+
+            self._client = genai.Client(api_key=self.api_key)
+        resp = self._client.models.generate_content(model=model, contents=prompt)
+        return resp.text or ""
+
+
+def gemini_available() -> bool:
+    """
+    Whether google-genai can be imported (without importing it).
+    """
+    try:
+        return importlib.util.find_spec("google.genai") is not None
+    except ModuleNotFoundError:
+        return False
+
+
+class LocalClient:
+    """
+    Offline, deterministic stand-in: the same prompt always gives the same answer.
+    The reply follows the report prompt's format (a short memo plus three
+    `# filename:` YAML blocks), so the whole report path runs without network.
+    """
+
+    def generate(self, prompt: str, model: str = DEFAULT_MODEL) -> str:
+        digest = hashlib.sha256(f"{model}\n{prompt}".encode()).hexdigest()[:12]
+        lines = [
+            "## Research memo (local model)",
+            "",
+            f"Deterministic offline response for prompt {digest} ({len(prompt)} chars).",
+            "",
+        ]
+        for name, max_drawdown, windows in (
+            ("aggressive", -0.5, [5, 10, 15, 20]),
+            ("baseline", -0.3, [30, 40, 50, 60, 70]),
+            ("conservative", -0.2, [100, 150, 200]),
+        ):
+            lines += [
+                "```yaml",
+                f"# filename: local_{name}.yaml",
+                "risk:",
+                f"  max_drawdown: {max_drawdown}",
+                "search:",
+                f"  coarse_windows: {windows}",
+                "  refine_range: 10",
+                "  refine_step: 5",
+                "```",
+                "",
+            ]
+        return "\n".join(lines)
+
+
+class ResponseCache:
+    """
+    On-disk cache of LLM responses keyed by sha256(model, prompt).
+
+    One small JSON file per entry under root/<2-char shard>/<key>.json. Entries
+    older than ttl_seconds count as misses and are removed by evict_expired().
+    """
+
+    def __init__(self, root: str | Path = LLM_CACHE_DIR, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.root = Path(root)
+        self.ttl_seconds = float(ttl_seconds)
+
+    @staticmethod
+    def key(model: str, prompt: str) -> str:
+        return hashlib.sha256(json.dumps([model, prompt]).encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, model: str, prompt: str) -> str | None:
+        path = self._path(self.key(model, prompt))
+        try:
+            with path.open("r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if time.time() - entry["created"] > self.ttl_seconds:
+            path.unlink(missing_ok=True)
+            return None
+        return entry["response"]
+
+    def put(self, model: str, prompt: str, response: str) -> None:
+        key = self.key(model, prompt)
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump({"key": key, "model": model, "created": time.time(), "response": response}, f)
+        tmp.replace(path)
+
+    def evict_expired(self) -> int:
+        """
+        Remove entries past their TTL. Returns the number removed.
+        """
+        if not self.root.exists():
+            return 0
+        cutoff = time.time() - self.ttl_seconds
+        removed = 0
+        for p in self.root.glob("??/*.json"):
+            try:
+                with p.open("r", encoding="utf-8") as f:
+                    created = json.load(f)["created"]
+            except (FileNotFoundError, json.JSONDecodeError, KeyError):
+                created = 0.0
+            if created < cutoff:
+                p.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+
+class CachedClient:
+    """
+    Wrap any LLMClient with a ResponseCache: unchanged prompts are answered from disk.
+    `hits` / `misses` count this instance's lookups.
+    """
+
+    def __init__(self, client: LLMClient, cache: ResponseCache | None = None):
+        self.client = client
+        self.cache = cache or ResponseCache()
+        self.hits = 0
+        self.misses = 0
+
+    def generate(self, prompt: str, model: str = DEFAULT_MODEL) -> str:
+        cached = self.cache.get(model, prompt)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        text = self.client.generate(prompt, model=model)
+        self.cache.put(model, prompt, text)
+        return text
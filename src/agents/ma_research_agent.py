@@ -1,12 +1,29 @@
 from __future__ import annotations
-from src.config import load_config
+from src.config import load_config, validate_config
 from pathlib import Path
+from typing import Callable
 
 import argparse
 import json
+import numpy as np
 import pandas as pd
 
-from src.backtest.run_ma_backtest import run_ma_backtest
+from src.agents.search import MODEL_PARAMS, Evaluator, parse_space, run_search, space_windows
+from src.backtest.artifacts import EQUITY_CURVES_FILE, CurveCollector, collect_curves, write_collected_curves
+from src.backtest.bootstrap import bootstrap_sweep
+from src.backtest.cache import ResultCache
+from src.backtest.run_ma_backtest import rolling_means, run_ma_sweep, sweep_metrics
+from src.backtest.walk_forward import walk_forward
+from src.features.store import FeatureStore, panel_labels
+from src.tools.run_registry import RunRegistry
+from src.tracing import span
+
+
+# (windows x dates x tickers) cells per panel sweep. Stacking more tickers than
+# this stops paying off: the temporaries leave the CPU cache and the sweep turns
+# memory-bound (1000 tickers x 5040 dates swept at once ran ~2x slower)
+PANEL_BLOCK_CELLS = 2_000_000
+
 
 def parse_args() -> argparse.Namespace:
     """
@@ -14,15 +31,23 @@ def parse_args() -> argparse.Namespace:
     """
     p = argparse.ArgumentParser(description="Axiom MA Research Agent (config-driven)")
     p.add_argument("--config", default="configs/ma.yaml", help="Path to YAML config file")
-    p.add_argument("--features", default="data/features", help="Folder containing *_feat.parquet files")
+    p.add_argument("--features", default="data/features",
+                   help="Folder containing *_feat.parquet files (the first is used), or one feature file")
     p.add_argument("--outdir", default="data/reports", help="Output folder for reports (csv/json)")
+    p.add_argument("--panel", action="store_true",
+                   help="Search all *_feat.parquet files at once (per-ticker + cross-sectional best)")
+    p.add_argument("--no-cache", dest="use_cache", action="store_false",
+                   help="Always re-run backtests instead of using the on-disk result cache")
+    p.add_argument("--no-registry", dest="record", action="store_false",
+                   help="Don't record this run's experiments in the run registry")
     return p.parse_args()
 
-def main() -> None:
-    args = parse_args()
-    config = load_config(args.config)
 
-    # --- Optional config blocks with safe defaults (infra: avoid KeyError) ---
+def search_params(config: dict) -> tuple[float, list[int], int, int]:
+    """
+    Read risk/search blocks with safe defaults (infra: avoid KeyError).
+    Returns (max_dd_limit, coarse_windows, refine_range, refine_step).
+    """
     risk_cfg = config.get("risk", {})
     max_dd_limit = float(risk_cfg.get("max_drawdown", 1.0))  # 1.0 = almost no drawdown limit
 
@@ -30,53 +55,181 @@ def main() -> None:
     coarse_windows = search_cfg.get("coarse_windows", [5, 10, 15, 20, 25, 30, 35, 40, 50, 100, 200])
     refine_range = int(search_cfg.get("refine_range", 10))   # +/- range around best coarse window
     refine_step  = int(search_cfg.get("refine_step", 5))     # step size in refine search
-    # ------------------------------------------------------------
-    # Agent Goal:
-    # Automatically search MA window parameter and pick the best one.
-    # "Best" here = highest Sharpe ratio (risk-adjusted return).
-    # ------------------------------------------------------------
+    return max_dd_limit, [int(w) for w in coarse_windows], refine_range, refine_step
 
-    # Select one feature file to work on (later we can support multi-ticker)
-    feature_files = list(Path(args.features).glob("*_feat.parquet"))
-    if not feature_files:
-        raise FileNotFoundError("No feature files found in data/features")
 
-    feature_path = feature_files[0]
+def data_window(config: dict) -> tuple[str | None, str | None]:
+    """
+    Optional `data: {start, end}` block: restrict research to the [start, end) Date window.
+    """
+    data_cfg = config.get("data", {})
+    start = data_cfg.get("start")
+    end = data_cfg.get("end")
+    return (str(start) if start is not None else None, str(end) if end is not None else None)
 
-    # Candidate parameter space (this is the agent's search space)
-    # ------------------------------------------------------------
-    # Adaptive search (2-stage):
-    # Stage 1: coarse search
-    # Stage 2: refine around the best window from Stage 1
-    # ------------------------------------------------------------
 
-    # Stage 1 experiments
-    results: list[dict] = []
-    for w in coarse_windows:
-        _, metrics = run_ma_backtest(feature_path, ma_window=w)
-        results.append(metrics)
+def refine_around(w_star: int, refine_range: int, refine_step: int) -> list[int]:
+    """
+    Stage 2 grid: refine around w_star (clamp to sensible bounds).
+    """
+    low = max(5, w_star - refine_range)
+    high = min(250, w_star + refine_range)
+    return list(range(low, high + 1, refine_step))
+
 
-    df_stage1 = pd.DataFrame(results)
+def stage2_windows(stage1: list[dict], refine_range: int, refine_step: int) -> list[int]:
+    """
+    Windows Stage 2 still has to run: the refine grid around Stage 1's best Sharpe,
+    minus the windows Stage 1 already tried.
+    """
+    df_stage1 = pd.DataFrame(stage1)
 
     # Pick best from Stage 1 by Sharpe (we'll apply risk filter later in final selection)
     best_stage1 = df_stage1.sort_values("sharpe", ascending=False).iloc[0]
     w_star = int(best_stage1["ma_window"])
 
-    # Stage 2: refine around w_star (clamp to sensible bounds)
-    low = max(5, w_star - refine_range)
-    high = min(250, w_star + refine_range)
+    # Refine around w_star (clamp to sensible bounds), avoiding duplicates
+    seen = set(df_stage1["ma_window"].astype(int).tolist())
+    return [w for w in refine_around(w_star, refine_range, refine_step) if w not in seen]
 
-    refine_windows = list(range(low, high + 1, refine_step))
 
-    # Run Stage 2 experiments (avoid duplicates)
-    seen = set(df_stage1["ma_window"].astype(int).tolist())
-    for w in refine_windows:
-        if w in seen:
-            continue
-        _, metrics = run_ma_backtest(feature_path, ma_window=w)
-        results.append(metrics)
+def selection_params(config: dict) -> dict:
+    """
+    Optional `selection:` block. criterion is "sharpe" (full-history Sharpe, default)
+    or "walk_forward" (the window rolling train/test folds pick most often on their
+    train blocks; their mean test Sharpe is reported as the out-of-sample estimate).
+    """
+    sel_cfg = config.get("selection", {})
+    criterion = sel_cfg.get("criterion", "sharpe")
+    if criterion not in ("sharpe", "walk_forward"):
+        raise ValueError(f"Unknown selection criterion: {criterion!r} (expected sharpe or walk_forward)")
+    step = sel_cfg.get("step")
+    return {
+        "criterion": criterion,
+        "train_size": int(sel_cfg.get("train_size", 756)),
+        "test_size": int(sel_cfg.get("test_size", 252)),
+        "step": int(step) if step is not None else None,
+        "anchored": bool(sel_cfg.get("anchored", False)),
+    }
+
+
+def bootstrap_params(config: dict) -> dict | None:
+    """
+    Optional `bootstrap:` block (model=ma). When present, ma_sweep.csv gets Sharpe
+    confidence intervals and a probability-best score per window.
+    """
+    bs_cfg = config.get("bootstrap")
+    if not bs_cfg or not bs_cfg.get("enabled", True):
+        return None
+    return {
+        "n_resamples": int(bs_cfg.get("n_resamples", 2000)),
+        "mean_block": float(bs_cfg.get("mean_block", 20)),
+        "ci": float(bs_cfg.get("ci", 0.95)),
+        "seed": int(bs_cfg.get("seed", 0)),
+        "jobs": int(bs_cfg.get("jobs", 1)),
+    }
+
+
+def artifact_params(config: dict) -> dict:
+    """
+    Optional `artifacts:` block. equity_curves (default on, model=ma) writes every
+    tried window's equity curve to equity_curves.parquet, keeping every n-th date.
+    Curves of windows the search computes come out of its own sweeps (in their
+    window blocks); only windows served from the ResultCache are backtested again,
+    for their curves alone.
+    """
+    art_cfg = config.get("artifacts", {})
+    return {
+        "equity_curves": bool(art_cfg.get("equity_curves", True)),
+        "every": int(art_cfg.get("every", 1)),
+    }
+
+
+def rank_by_risk(df: pd.DataFrame, max_dd_limit: float, metric: str | list[str] = "sharpe") -> pd.DataFrame:
+    """
+    Risk-aware ranking:
+    1) Filter out strategies with too large drawdown (risk constraint)
+    2) Sort the survivors by `metric` (Sharpe unless walk-forward selection is on;
+       a list sorts by each column in turn)
+    If everything fails the risk constraint, fall back to pure metric ranking.
+    """
+    survivors = df[df["max_drawdown"] >= max_dd_limit].copy()
+
+    if len(survivors) > 0:
+        return survivors.sort_values(metric, ascending=False)
+    return df.sort_values(metric, ascending=False)
+
+def run_agent(
+    config_path: str | Path,
+    features: str | Path,
+    outdir: str | Path,
+    use_cache: bool = True,
+    record: bool = True,
+    sweep: Callable[..., list[dict]] | None = None,
+) -> dict:
+    """
+    Run the full MA research loop for one config and write its artifacts.
+    With use_cache, (file content, window) results are memoized in the ResultCache.
+    With record, every evaluated row is appended to the run registry.
+    sweep replaces run_ma_sweep for the grid stages (same signature, including
+    equity_sink); the experiment planner passes a memo of the results it already
+    computed across configs.
+    Returns the best config dict (also saved as best_config.json).
+    """
+    config = validate_config(load_config(config_path), config_path)
+    max_dd_limit, coarse_windows, refine_range, refine_step = search_params(config)
+    start, end = data_window(config)
+    selection = selection_params(config)
+    bootstrap = bootstrap_params(config)
+    artifacts = artifact_params(config)
+    cache = ResultCache() if use_cache else None
+    sweep = sweep or run_ma_sweep
+    # ------------------------------------------------------------
+    # Agent Goal:
+    # Automatically search MA window parameter and pick the best one.
+    # "Best" here = highest Sharpe ratio (risk-adjusted return).
+    # ------------------------------------------------------------
+
+    # Select one feature file to work on (see --panel for multi-ticker);
+    # `features` may also name the file itself (one work-queue unit)
+    feature_path = Path(features) if Path(features).suffix == ".parquet" else FeatureStore(features).first()
+    problems = FeatureStore(feature_path.parent).check(feature_path, ["Close", "ret_1d"], start, end)
+    if problems:
+        raise ValueError(f"Unusable feature file for {config_path}: " + "; ".join(problems))
 
-    windows = sorted({m["ma_window"] for m in results})
+    search_cfg = config.get("search", {})
+    strategy = search_cfg.get("strategy", "grid")
+    model = search_cfg.get("model", "ma")
+    curves = CurveCollector(artifacts["every"]) if artifacts["equity_curves"] and model == "ma" else None
+
+    if strategy == "grid" and model == "ma":
+        # Candidate parameter space (this is the agent's search space)
+        # ------------------------------------------------------------
+        # Adaptive search (2-stage):
+        # Stage 1: coarse search
+        # Stage 2: refine around the best window from Stage 1
+        # ------------------------------------------------------------
+
+        # Stage 1 experiments (one batched sweep: the file is loaded once)
+        results: list[dict] = sweep(feature_path, coarse_windows, start, end, cache=cache, equity_sink=curves)
+
+        # Stage 2: refine around the Stage 1 best (only windows not tried yet)
+        new_windows = stage2_windows(results, refine_range, refine_step)
+        if new_windows:
+            results.extend(sweep(feature_path, new_windows, start, end, cache=cache, equity_sink=curves))
+
+        tried = f"Tried windows: {sorted({m['ma_window'] for m in results})}"
+    else:
+        # Pluggable multi-fidelity strategies (successive halving / TPE), any model
+        space = parse_space(model, search_cfg.get("space"))
+        evaluator = Evaluator(
+            feature_path, model, start, end, cache=cache, equity_sink=curves, windows=space_windows(space)
+        )
+        results = run_search(evaluator, search_cfg)
+        tried = (
+            f"Strategy: {strategy} ({model})  backtests: {evaluator.backtests}  "
+            f"cost: {evaluator.cost:.1f} full-history equivalents"
+        )
 
 
     # Rank experiments and pick the best config
@@ -86,33 +239,252 @@ def main() -> None:
     # 2) Choose the best Sharpe among the survivors
     # ------------------------------------------------------------
     df = pd.DataFrame(results)
+    metric, folds = "sharpe", None
+    if selection["criterion"] == "walk_forward":
+        if model != "ma":
+            raise ValueError("selection.criterion=walk_forward is only supported for model=ma")
+        # Score every tried window out-of-sample; strategy returns are computed once
+        with span("walk_forward", windows=len(df)):
+            folds, wf_summary = walk_forward(
+                feature_path, df["ma_window"].astype(int).tolist(),
+                train_size=selection["train_size"], test_size=selection["test_size"],
+                step=selection["step"], anchored=selection["anchored"], start=start, end=end,
+            )
+        df = df.merge(wf_summary, on="ma_window", how="left")
+        # Select with train-block information only: the window the folds chose most
+        # often (then most recently, then by mean train Sharpe). Ranking by the
+        # test-block Sharpe would tune to the test blocks; the honest estimate is the
+        # mean test Sharpe of the fold-by-fold choices.
+        metric = ["times_chosen", "last_chosen", "is_sharpe"]
+        wf_oos_sharpe = float(folds["test_sharpe"].mean())
+        tried += f"  walk-forward folds: {len(folds)}  out-of-sample Sharpe of the selection: {wf_oos_sharpe:.3f}"
 
-    survivors = df[df["max_drawdown"] >= max_dd_limit].copy()
+    if bootstrap is not None:
+        if model != "ma":
+            raise ValueError("bootstrap is only supported for model=ma")
+        # Sharpe uncertainty for every tried window from one shared set of resamples
+        bs = bootstrap_sweep(feature_path, df["ma_window"].astype(int).tolist(), start, end, **bootstrap)
+        df = df.merge(bs, on="ma_window", how="left")
+        tried += f"  bootstrap resamples: {bootstrap['n_resamples']}"
 
-    if len(survivors) > 0:
-        ranked = survivors.sort_values("sharpe", ascending=False)
-    else:
-        # If everything fails the risk constraint, fall back to pure Sharpe ranking
-        ranked = df.sort_values("sharpe", ascending=False)
+    ranked = rank_by_risk(df, max_dd_limit, metric)
 
     best = ranked.iloc[0].to_dict()
+    if folds is not None:
+        best["wf_oos_sharpe"] = wf_oos_sharpe
 
     # 5) Save artifacts (industrial habit)
-    out_dir = Path(args.outdir)
+    out_dir = Path(outdir)
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    df.to_csv(out_dir / "ma_sweep.csv", index=False)
+    with span("artifact_write", run=out_dir.name):
+        df.to_csv(out_dir / "ma_sweep.csv", index=False)
+        if folds is not None:
+            folds.to_csv(out_dir / "walk_forward_folds.csv", index=False)
+
+        with (out_dir / "best_config.json").open("w", encoding="utf-8") as f:
+            json.dump(best, f, indent=2)
 
-    with (out_dir / "best_config.json").open("w", encoding="utf-8") as f:
-        json.dump(best, f, indent=2)
+    if curves is not None:
+        # Every tried window's curve in one compact file, so analysis never re-runs backtests
+        windows = sorted(df["ma_window"].astype(int).unique().tolist())
+        dates = collect_curves(feature_path, curves, windows, start, end)
+        write_collected_curves(out_dir / EQUITY_CURVES_FILE, dates, windows, curves)
+
+    if record:
+        with span("registry_write", run=out_dir.name, rows=len(df)):
+            RunRegistry().record_run(
+                out_dir, df.to_dict("records"), best,
+                best_row=df.index.get_loc(ranked.index[0]), config=config_path, model=model,
+            )
 
     # 6) Print a human-readable summary
     print("=== MA Research Agent Summary ===")
     print("Feature file:", feature_path)
-    print("Tried windows:", windows)
-    print("\nTop 5 by Sharpe:")
-    print(ranked[["ma_window", "total_return", "max_drawdown", "sharpe"]].head(5))
+    print(tried)
+    print(f"\nTop 5 by {metric if isinstance(metric, str) else ', '.join(metric)}:")
+    extra = ["times_chosen", "is_sharpe", "oos_sharpe"] if folds is not None else []
+    if bootstrap is not None:
+        extra += ["sharpe_ci_lo", "sharpe_ci_hi", "prob_best"]
+    print(ranked[[*MODEL_PARAMS[model], "total_return", "max_drawdown", "sharpe", *extra]].head(5))
     print("\nBest config saved to:", out_dir / "best_config.json")
+    return best
+
+
+def _panel_sweep(parts: list[dict[str, np.ndarray]], windows: list[int]) -> dict[str, np.ndarray]:
+    """
+    sweep_metrics of every ticker on its own rows, stacked to (windows, tickers).
+
+    Tickers with the same Dates are stacked into one (dates, tickers) matrix and
+    swept in batched passes over slices of PANEL_BLOCK_CELLS, so a universe on a
+    common calendar needs len(tickers) / slice sweeps instead of one per file.
+    Tickers are never aligned on a union calendar: a Date one ticker lacks
+    would blank its MA for the next window rows and break its signal shift.
+    The ma_N columns in `parts` are used where a ticker has them (as run_ma_sweep
+    does); the other MAs are rolled.
+    """
+    out = {k: np.empty((len(windows), len(parts))) for k in ("total_return", "max_drawdown", "sharpe")}
+    calendars: dict[bytes, list[int]] = {}
+    for j, c in enumerate(parts):
+        calendars.setdefault(np.asarray(c["Date"]).tobytes(), []).append(j)
+
+    groups = []
+    for members in calendars.values():
+        step = max(1, PANEL_BLOCK_CELLS // max(1, len(windows) * len(parts[members[0]]["Date"])))
+        groups.extend(members[lo:lo + step] for lo in range(0, len(members), step))
+
+    for members in groups:
+        close = np.stack([parts[j]["Close"].astype(np.float64, copy=False) for j in members], axis=1)
+        ret_1d = np.stack([parts[j]["ret_1d"].astype(np.float64, copy=False) for j in members], axis=1)
+
+        overrides = {}
+        for w in windows:
+            have = [i for i, j in enumerate(members) if f"ma_{w}" in parts[j]]
+            if not have:
+                continue
+            # Tickers without the column get the rolled MA, as in a single-file run
+            ma = np.empty(close.shape) if len(have) == len(members) else rolling_means(close, [w])[0]
+            for i in have:
+                ma[:, i] = parts[members[i]][f"ma_{w}"]
+            overrides[w] = ma
+
+        with span("panel_sweep", tickers=len(members), windows=len(windows), rows=close.shape[0]):
+            res = sweep_metrics(close, ret_1d, windows, ma_overrides=overrides)
+        for k in out:
+            out[k][:, members] = res[k]
+    return out
+
+
+def run_panel_agent(
+    config_path: str | Path,
+    features: str | Path,
+    outdir: str | Path,
+    record: bool = True,
+) -> dict:
+    """
+    Panel mode: run the 2-stage window search on every *_feat.parquet at once.
+
+    Each ticker is backtested on its own rows (its own calendar), so its results
+    are those of a single-file run (up to float summation order, ~1e-15); each stage is one batched sweep over
+    all windows and all tickers that share a calendar. Writes:
+      - ma_panel_sweep.csv: every (ticker, window) experiment
+      - best_by_ticker.csv: risk-aware best window per ticker
+      - cross_section.csv: per-window averages across the universe
+      - best_config.json: cross-sectional best window (what summarize reads)
+    With record, every (ticker, window) row is appended to the run registry.
+    Returns the cross-sectional best config dict.
+    """
+    config = validate_config(load_config(config_path), config_path)
+    max_dd_limit, coarse_windows, refine_range, refine_step = search_params(config)
+    start, end = data_window(config)
+
+    store = FeatureStore(features)
+    # Partitions with no rows in the data window are skipped without opening them
+    feature_files = store.select(start=start, end=end)
+    if not feature_files:
+        raise FileNotFoundError(f"No feature files with rows in the data window in {features}")
+    # One read per file: Close, ret_1d and the ma_N columns of every window either
+    # stage can reach (Stage 2 only refines around Stage 1 windows)
+    reachable = set(coarse_windows).union(*(refine_around(w, refine_range, refine_step) for w in coarse_windows))
+    parts = []
+    for p in feature_files:
+        available = set(store.columns(p))
+        names = [f"ma_{w}" for w in sorted(reachable) if f"ma_{w}" in available]
+        parts.append(store.read_arrays(p, ["Close", "ret_1d", *names], start, end))
+    feature_files = [p for p, c in zip(feature_files, parts) if len(c["Date"])]
+    parts = [c for c in parts if len(c["Date"])]
+    if not parts:
+        raise FileNotFoundError(f"No feature files with rows in the data window in {features}")
+    tickers = panel_labels(feature_files)
+
+    # Stage 1: coarse windows for every ticker
+    stage1 = _panel_sweep(parts, coarse_windows)
+    w_star = np.asarray(coarse_windows)[np.argmax(stage1["sharpe"], axis=0)]
+
+    # Stage 2: each ticker refines around its own w_star; the union is evaluated once
+    own_refine = {int(w): refine_around(int(w), refine_range, refine_step) for w in set(w_star.tolist())}
+    refine_union = sorted({w for ws in own_refine.values() for w in ws} - set(coarse_windows))
+    stage2 = _panel_sweep(parts, refine_union) if refine_union else None
+
+    # Long table of (ticker, window) results; `candidate` marks the windows that
+    # ticker's own 2-stage search would have tried
+    rows: list[dict] = []
+    for stage, windows in ((stage1, coarse_windows), (stage2, refine_union)):
+        if stage is None:
+            continue
+        for i, w in enumerate(windows):
+            for j, ticker in enumerate(tickers):
+                rows.append({
+                    "ticker": ticker,
+                    "feature_file": str(feature_files[j]),
+                    "ma_window": int(w),
+                    "total_return": float(stage["total_return"][i, j]),
+                    "max_drawdown": float(stage["max_drawdown"][i, j]),
+                    "sharpe": float(stage["sharpe"][i, j]),
+                    "candidate": w in coarse_windows or w in own_refine[int(w_star[j])],
+                })
+    df = pd.DataFrame(rows)
+
+    # Per-ticker risk-aware best among that ticker's candidates
+    best_rows = [
+        rank_by_risk(g[g["candidate"]], max_dd_limit).iloc[0]
+        for _, g in df.groupby("ticker", sort=True)
+    ]
+    best_by_ticker = pd.DataFrame(best_rows).drop(columns="candidate").reset_index(drop=True)
+
+    # Cross-sectional view: average each window over the universe, then rank the same way
+    cross = (
+        df.groupby("ma_window")
+        .agg(
+            total_return=("total_return", "mean"),
+            max_drawdown=("max_drawdown", "mean"),
+            sharpe=("sharpe", "mean"),
+            sharpe_median=("sharpe", "median"),
+            n_tickers=("ticker", "nunique"),
+        )
+        .reset_index()
+    )
+    cross_ranked = rank_by_risk(cross, max_dd_limit)
+    best = {"feature_file": str(features), **cross_ranked.iloc[0].to_dict()}
+    best["ma_window"] = int(best["ma_window"])
+    best["n_tickers"] = int(best["n_tickers"])
+
+    out_dir = Path(outdir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    with span("artifact_write", run=out_dir.name):
+        df.to_csv(out_dir / "ma_panel_sweep.csv", index=False)
+        best_by_ticker.to_csv(out_dir / "best_by_ticker.csv", index=False)
+        cross.to_csv(out_dir / "cross_section.csv", index=False)
+        with (out_dir / "best_config.json").open("w", encoding="utf-8") as f:
+            json.dump(best, f, indent=2)
+
+    if record:
+        with span("registry_write", run=out_dir.name, rows=len(df)):
+            RunRegistry().record_run(out_dir, df.to_dict("records"), best, config=config_path, model="ma")
+
+    print("=== MA Research Agent Summary (panel) ===")
+    first = min(pd.Timestamp(c["Date"][0]) for c in parts if len(c["Date"]))
+    last = max(pd.Timestamp(c["Date"][-1]) for c in parts if len(c["Date"]))
+    print(f"Tickers: {len(tickers)}  Rows: {sum(len(c['Date']) for c in parts)} ({first.date()} .. {last.date()})")
+    print("Tried windows:", sorted(set(coarse_windows) | set(refine_union)))
+    print("\nBest window per ticker (top 10 by Sharpe):")
+    print(best_by_ticker.sort_values("sharpe", ascending=False)[
+        ["ticker", "ma_window", "total_return", "max_drawdown", "sharpe"]
+    ].head(10))
+    print("\nCross-sectional top 5 by mean Sharpe:")
+    print(cross_ranked[["ma_window", "total_return", "max_drawdown", "sharpe", "n_tickers"]].head(5))
+    print("\nBest config saved to:", out_dir / "best_config.json")
+    return best
+
+
+def main() -> None:
+    args = parse_args()
+    with span("agent", config=args.config, panel=args.panel):
+        if args.panel:
+            run_panel_agent(args.config, args.features, args.outdir, record=args.record)
+        else:
+            run_agent(args.config, args.features, args.outdir, use_cache=args.use_cache, record=args.record)
 
 
 if __name__ == "__main__":
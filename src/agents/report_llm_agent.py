@@ -1,41 +1,74 @@
 from __future__ import annotations
-from google import genai
 from pathlib import Path
 
+import argparse
 import re
 import os
 import pandas as pd
 
-def call_gemini(prompt: str, model: str = "models/gemini-2.5-flash") -> str:
-    api_key = os.getenv("GEMINI_API_KEY")
-    client = genai.Client(api_key=api_key)
+from src.agents.llm import (
+    DEFAULT_MODEL,
+    DEFAULT_TTL_SECONDS,
+    CachedClient,
+    GeminiClient,
+    LLMClient,
+    LocalClient,
+    ResponseCache,
+    gemini_available,
+)
 
-    resp = client.models.generate_content(
-        model=model,
-        contents=prompt,
+# Above this many rows the prompt gets the top-k rows plus aggregates instead of the full table
+PROMPT_MAX_ROWS = 30
+PROMPT_TOP_K = 10
+
+
+def call_gemini(prompt: str, model: str = DEFAULT_MODEL) -> str:
+    return GeminiClient().generate(prompt, model=model)
+
+
+def compact_table(df: pd.DataFrame, max_rows: int = PROMPT_MAX_ROWS, top_k: int = PROMPT_TOP_K) -> str:
+    """
+    Table text for the prompt. Small tables are sent whole as CSV; larger ones as
+    the top_k rows by Sharpe plus count / mean / median / min / max of every
+    numeric column, so prompt size stays flat as the number of runs grows.
+    """
+    if len(df) <= max_rows:
+        return "CSV:\n" + df.to_csv(index=False)
+
+    top = df.sort_values("sharpe", ascending=False).head(top_k) if "sharpe" in df.columns else df.head(top_k)
+    stats = df.select_dtypes("number").agg(["count", "mean", "median", "min", "max"]).T
+    return (
+        f"The table has {len(df)} runs; showing the top {len(top)} by Sharpe.\n\n"
+        f"Top runs CSV:\n{top.to_csv(index=False)}\n"
+        f"Aggregate statistics over all {len(df)} runs (CSV):\n{stats.to_csv(float_format='%.6g')}"
     )
-    return resp.text or ""
 
-def generate_gemini_summary(df: pd.DataFrame) -> str:
-    table_csv = df.to_csv(index=False)
 
-    prompt = f"""
+def build_prompt(df: pd.DataFrame, max_rows: int = PROMPT_MAX_ROWS, top_k: int = PROMPT_TOP_K) -> str:
+    return f"""
 You are a quant research assistant.
 
-You are given backtest summary results as CSV. Your job:
+You are given backtest summary results. Your job:
 1) Write a short Markdown memo (<= 250 words) comparing the configs.
 2) Then output EXACTLY 3 new experiment configs as YAML code blocks.
    - Each YAML block must start with a comment line: # filename: <name>.yaml
-   - Use forward slashes in paths (data/features/...)
-   - Include keys: run_name, feature_file, ma_window, windows (list)
+   - The file name is the run name; the feature file is chosen by the runner
+   - Use only these keys:
+       risk: {{max_drawdown: <negative fraction, e.g. -0.3>}}
+       search: {{coarse_windows: [<positive ints>], refine_range: <int>, refine_step: <int>}}
    - Make the 3 configs meaningfully different (aggressive / baseline / conservative)
 3) Do not include any other code blocks besides those 3 YAML blocks.
 
-CSV:
-{df.to_csv(index=False)}
+{compact_table(df, max_rows, top_k)}
 """.strip()
 
-    return call_gemini(prompt, model="models/gemini-2.5-flash")
+
+def generate_llm_summary(df: pd.DataFrame, client: LLMClient, model: str = DEFAULT_MODEL) -> str:
+    return client.generate(build_prompt(df), model=model)
+
+
+def generate_gemini_summary(df: pd.DataFrame) -> str:
+    return generate_llm_summary(df, CachedClient(GeminiClient()))
 
 
 def generate_template_summary(df: pd.DataFrame) -> str:
@@ -90,17 +123,46 @@ def write_next_configs(blocks: list[tuple[str, str]], out_dir: Path) -> list[Pat
         written.append(path)
     return written
 
-def main() -> None:
-    summary_path = Path("data/reports/batch/summary.csv")
+def default_client(use_cache: bool = True, ttl_seconds: float = DEFAULT_TTL_SECONDS) -> LLMClient | None:
+    """
+    Gemini when GEMINI_API_KEY is set, the local stand-in when AXIOM_LLM=local
+    or when the key is set but google-genai is not installed, otherwise None
+    (template report). Wrapped in the response cache by default.
+    """
+    if os.getenv("GEMINI_API_KEY") and gemini_available():
+        client = GeminiClient()
+    elif os.getenv("GEMINI_API_KEY"):
+        print("google-genai is not installed; using the local model")
+        client = LocalClient()
+    elif os.getenv("AXIOM_LLM") == "local":
+        client = LocalClient()
+    else:
+        return None
+    return CachedClient(client, ResponseCache(ttl_seconds=ttl_seconds)) if use_cache else client
+
+
+def write_report(
+    summary_path: Path,
+    next_dir: Path = Path("configs/llm_next"),
+    client: LLMClient | None = None,
+    model: str = DEFAULT_MODEL,
+) -> Path:
+    """
+    Write report.md next to summary.csv and any suggested configs into next_dir.
+    The memo comes from `client` (default: default_client()), or from the
+    template when no LLM is configured. Returns the report path.
+    """
+    summary_path = Path(summary_path)
     if not summary_path.exists():
         raise FileNotFoundError("No summary.csv found—run research pipeline first.")
 
     df = pd.read_csv(summary_path)
 
-    use_gemini = bool(os.getenv("GEMINI_API_KEY"))
-
-    if use_gemini:
-        text = generate_gemini_summary(df)
+    client = client if client is not None else default_client()
+    if client is not None:
+        text = generate_llm_summary(df, client, model=model)
+        if isinstance(client, CachedClient):
+            print(f"LLM response cache: {client.hits} hit(s), {client.misses} miss(es)")
     else:
         text = generate_template_summary(df)
 
@@ -117,7 +179,6 @@ def main() -> None:
     blocks = extract_yaml_blocks(text)
 
     if blocks:
-        next_dir = Path("configs/llm_next")
         written = write_next_configs(blocks, next_dir)
 
         print("Wrote next configs:")
@@ -125,6 +186,33 @@ def main() -> None:
             print(" -", p)
     else:
         print("No YAML config blocks found in LLM output.")
+    return out_file
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Write report.md (LLM memo or template) from a batch summary.csv.")
+    p.add_argument("--summary", default="data/reports/batch/summary.csv", help="summary.csv to report on")
+    p.add_argument("--next_dir", default="configs/llm_next", help="Where suggested configs are written")
+    p.add_argument("--model", default=DEFAULT_MODEL)
+    p.add_argument("--local", action="store_true", help="Use the offline deterministic LLM stand-in")
+    p.add_argument("--no-cache", dest="use_cache", action="store_false", help="Always call the LLM")
+    p.add_argument("--ttl_hours", type=float, default=DEFAULT_TTL_SECONDS / 3600,
+                   help="Reuse cached responses younger than this")
+    return p.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    ttl = args.ttl_hours * 3600
+    if args.local:
+        client = LocalClient()
+        if args.use_cache:
+            client = CachedClient(client, ResponseCache(ttl_seconds=ttl))
+    else:
+        client = default_client(args.use_cache, ttl)
+    if isinstance(client, CachedClient):
+        client.cache.evict_expired()
+    write_report(Path(args.summary), Path(args.next_dir), client=client, model=args.model)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Callable
+import math
+import re
+
+import numpy as np
+
+from src.backtest.cache import ResultCache
+from src.backtest.run_ma_backtest import (
+    cached_sweep,
+    crossover_metrics,
+    load_feature_arrays,
+    ma_columns,
+    sweep_metrics,
+    sweep_rows,
+)
+from src.features.store import FeatureStore
+
+
+# Parameter names per strategy model (the search space dimensions)
+MODEL_PARAMS = {
+    "ma": ("ma_window",),
+    "crossover": ("fast", "slow"),
+}
+
+DEFAULT_SPACES = {
+    "ma": {"ma_window": {"low": 5, "high": 250, "step": 5}},
+    "crossover": {
+        "fast": {"low": 5, "high": 50, "step": 5},
+        "slow": {"low": 20, "high": 250, "step": 10},
+    },
+}
+
+
+class Evaluator:
+    """
+    Backtests parameter sets for one feature file, loading its columns once.
+
+    evaluate(params, rows=None) scores a batch of parameter dicts; with `rows`
+    only the most recent `rows` bars are scored (earlier bars just warm up the
+    moving averages). Full-history single-MA results are looked up in and
+    stored to the on-disk ResultCache under run_ma_sweep's keys, and the misses
+    are swept on the loaded arrays (the file is not read again per trial).
+    `windows` are the MA windows the search can reach; only their ma_N columns
+    are loaded (default: every ma_N column of the file).
+
+    `backtests` counts evaluated candidates and `cost` sums the rows they
+    scored, in full-history units. equity_sink (model=ma) receives the equity
+    curves of full-history evaluations that are not served from the cache, as
+    in run_ma_sweep.
+    """
+
+    def __init__(
+        self,
+        feature_path: Path,
+        model: str = "ma",
+        start: str | None = None,
+        end: str | None = None,
+        cache: ResultCache | None = None,
+        equity_sink: Callable[[list[int], np.ndarray], None] | None = None,
+        windows: list[int] | None = None,
+    ):
+        if model not in MODEL_PARAMS:
+            raise ValueError(f"Unknown search model: {model!r} (expected one of {sorted(MODEL_PARAMS)})")
+
+        self.feature_path = Path(feature_path)
+        self.model = model
+        self.start, self.end, self.cache = start, end, cache
+        self.equity_sink = equity_sink
+
+        # The precomputed ma_N columns run_ma_sweep would use for reachable windows
+        store = FeatureStore(self.feature_path.parent)
+        ma_names = [c for c in store.columns(self.feature_path) if re.fullmatch(r"ma_\d+", c)]
+        if windows is not None:
+            reachable = {f"ma_{int(w)}" for w in windows}
+            ma_names = [c for c in ma_names if c in reachable]
+        cols = load_feature_arrays(self.feature_path, ma_names, start, end)
+        self.close = cols["Close"].astype(np.float64, copy=False)
+        self.ret_1d = cols["ret_1d"].astype(np.float64, copy=False)
+        self.ma = ma_columns(cols, [int(c[3:]) for c in ma_names])
+        self.n_rows = len(self.close)
+
+        self.backtests = 0
+        self.cost = 0.0
+
+    def evaluate(self, params: list[dict], rows: int | None = None) -> list[dict]:
+        if not params:
+            return []
+        full = rows is None or rows >= self.n_rows
+        self.backtests += len(params)
+        self.cost += len(params) * (1.0 if full else rows / self.n_rows)
+
+        if full and self.model == "ma":
+            return cached_sweep(
+                self.feature_path, [p["ma_window"] for p in params], self.start, self.end, self.cache,
+                lambda todo: sweep_rows(self.feature_path, todo, sweep_metrics(
+                    self.close, self.ret_1d, todo, ma_overrides=self.ma, equity_sink=self.equity_sink,
+                )),
+            )
+
+        max_window = max(max(p.values()) for p in params)
+        if full:
+            lo, warmup = 0, 0
+        else:
+            lo = max(0, self.n_rows - rows - max_window)
+            warmup = self.n_rows - rows - lo
+        close, ret_1d = self.close[lo:], self.ret_1d[lo:]
+        ma = {w: v[lo:] for w, v in self.ma.items()}
+
+        if self.model == "ma":
+            res = sweep_metrics(close, ret_1d, [p["ma_window"] for p in params], ma_overrides=ma, warmup=warmup)
+        else:
+            res = crossover_metrics(
+                close, ret_1d, [(p["fast"], p["slow"]) for p in params], warmup=warmup, ma_overrides=ma
+            )
+
+        return [
+            {
+                "feature_file": str(self.feature_path),
+                **{k: int(v) for k, v in p.items()},
+                "total_return": float(res["total_return"][i]),
+                "max_drawdown": float(res["max_drawdown"][i]),
+                "sharpe": float(res["sharpe"][i]),
+            }
+            for i, p in enumerate(params)
+        ]
+
+
+def parse_space(model: str, space_cfg: dict | None) -> dict[str, list[int]]:
+    """
+    Search space from the YAML `space:` block: name -> {low, high, step} (inclusive)
+    or an explicit list of values. Missing dimensions use DEFAULT_SPACES.
+    """
+    space_cfg = dict(space_cfg or {})
+    space = {}
+    for name in MODEL_PARAMS[model]:
+        spec = space_cfg.pop(name, DEFAULT_SPACES[model][name])
+        if isinstance(spec, dict):
+            values = list(range(int(spec["low"]), int(spec["high"]) + 1, int(spec.get("step", 1))))
+        else:
+            values = sorted({int(v) for v in spec})
+        if not values:
+            raise ValueError(f"Empty search space for {name}: {spec}")
+        space[name] = values
+    if space_cfg:
+        raise ValueError(f"Unknown search space keys for model={model}: {sorted(space_cfg)}")
+    return space
+
+
+def space_windows(space: dict[str, list[int]]) -> list[int]:
+    """
+    Every MA window a search space can reach (any dimension).
+    """
+    return sorted({int(v) for values in space.values() for v in values})
+
+
+def _valid(model: str, params: dict) -> bool:
+    return model != "crossover" or params["fast"] < params["slow"]
+
+
+def _grid(model: str, space: dict[str, list[int]]) -> list[dict]:
+    names = MODEL_PARAMS[model]
+    mesh = np.meshgrid(*[space[n] for n in names], indexing="ij")
+    points = [dict(zip(names, map(int, vals))) for vals in zip(*[m.ravel() for m in mesh])]
+    return [p for p in points if _valid(model, p)]
+
+
+def successive_halving(
+    evaluator: Evaluator,
+    space: dict[str, list[int]],
+    eta: int = 3,
+    min_rows: int = 252,
+) -> list[dict]:
+    """
+    Successive halving over the whole grid.
+
+    Rung 0 scores every candidate on the most recent `min_rows` bars; each rung keeps
+    the top 1/eta by Sharpe and multiplies the slice length by eta, until the
+    survivors are scored on the full history. Returns the full-history results.
+    """
+    candidates = _grid(evaluator.model, space)
+    rows = min_rows
+    while rows < evaluator.n_rows and len(candidates) > 1:
+        scored = evaluator.evaluate(candidates, rows=rows)
+        scored.sort(key=lambda r: r["sharpe"], reverse=True)
+        keep = max(1, math.ceil(len(scored) / eta))
+        names = MODEL_PARAMS[evaluator.model]
+        candidates = [{n: r[n] for n in names} for r in scored[:keep]]
+        rows *= eta
+    return evaluator.evaluate(candidates)
+
+
+def tpe_search(
+    evaluator: Evaluator,
+    space: dict[str, list[int]],
+    n_trials: int = 30,
+    n_startup: int = 10,
+    gamma: float = 0.25,
+    n_candidates: int = 24,
+    seed: int = 0,
+) -> list[dict]:
+    """
+    Tree-structured Parzen Estimator style search over a discrete grid.
+
+    After n_startup random trials, observations are split into the top `gamma`
+    fraction by Sharpe ("good") and the rest. Each dimension gets a Parzen
+    density over its grid values for both groups; candidates are drawn from
+    the good density and the one maximizing good/bad density is evaluated next.
+    Every trial is a full-history backtest. Returns all trial results.
+    """
+    rng = np.random.default_rng(seed)
+    names = MODEL_PARAMS[evaluator.model]
+    grid = _grid(evaluator.model, space)
+    n_trials = min(n_trials, len(grid))
+
+    def key(p: dict) -> tuple:
+        return tuple(p[n] for n in names)
+
+    def density(values: list[int], observed: list[int]) -> np.ndarray:
+        # Gaussian kernels on grid positions plus a uniform prior component
+        pos = np.arange(len(values))
+        idx = np.searchsorted(values, observed)
+        bw = max(1.0, len(values) / max(len(observed), 1) ** 0.5 / 2)
+        k = np.exp(-0.5 * ((pos[None, :] - idx[:, None]) / bw) ** 2).sum(axis=0)
+        d = k + 1.0 / len(values)
+        return d / d.sum()
+
+    seen: set[tuple] = set()
+    results: list[dict] = []
+
+    startup = rng.choice(len(grid), size=min(n_startup, n_trials), replace=False)
+    for r in evaluator.evaluate([grid[i] for i in startup]):
+        seen.add(key(r))
+        results.append(r)
+
+    while len(results) < n_trials:
+        ranked = sorted(results, key=lambda r: r["sharpe"], reverse=True)
+        n_good = max(1, int(math.ceil(gamma * len(ranked))))
+        good, bad = ranked[:n_good], ranked[n_good:]
+
+        l_dens = {n: density(space[n], [r[n] for r in good]) for n in names}
+        g_dens = {n: density(space[n], [r[n] for r in bad]) for n in names}
+
+        best_p, best_score = None, -np.inf
+        for _ in range(n_candidates):
+            p = {n: int(space[n][rng.choice(len(space[n]), p=l_dens[n])]) for n in names}
+            if not _valid(evaluator.model, p) or key(p) in seen:
+                continue
+            score = sum(
+                math.log(l_dens[n][space[n].index(p[n])]) - math.log(g_dens[n][space[n].index(p[n])])
+                for n in names
+            )
+            if score > best_score:
+                best_p, best_score = p, score
+
+        if best_p is None:
+            # All draws were duplicates: fall back to an unseen random grid point
+            unseen = [p for p in grid if key(p) not in seen]
+            if not unseen:
+                break
+            best_p = unseen[rng.integers(len(unseen))]
+
+        r = evaluator.evaluate([best_p])[0]
+        seen.add(key(r))
+        results.append(r)
+
+    return results
+
+
+def run_search(evaluator: Evaluator, search_cfg: dict) -> list[dict]:
+    """
+    Dispatch the `search:` block's strategy (grid | halving | tpe) to its
+    implementation. Returns the full-history results to rank. The agent runs
+    grid for model=ma through its two-stage sweep; here grid scores every
+    point of the space, for any model.
+    """
+    strategy = search_cfg.get("strategy", "grid")
+    space = parse_space(evaluator.model, search_cfg.get("space"))
+
+    if strategy == "grid":
+        return evaluator.evaluate(_grid(evaluator.model, space))
+    if strategy == "halving":
+        return successive_halving(
+            evaluator, space,
+            eta=int(search_cfg.get("eta", 3)),
+            min_rows=int(search_cfg.get("min_rows", 252)),
+        )
+    if strategy == "tpe":
+        return tpe_search(
+            evaluator, space,
+            n_trials=int(search_cfg.get("n_trials", 30)),
+            n_startup=int(search_cfg.get("n_startup", 10)),
+            gamma=float(search_cfg.get("gamma", 0.25)),
+            seed=int(search_cfg.get("seed", 0)),
+        )
+    raise ValueError(f"Unknown search strategy: {strategy!r} (expected grid, halving or tpe)")
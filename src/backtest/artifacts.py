@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.backtest.run_ma_backtest import load_feature_arrays, ma_columns, sweep_metrics
+from src.tracing import span
+
+
+EQUITY_CURVES_FILE = "equity_curves.parquet"
+
+# Curves are written in row groups of this many dates, so date slices skip whole groups
+CURVE_ROW_GROUP_SIZE = 4096
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Inspect a run's equity_curves.parquet.")
+    p.add_argument("path", help="equity_curves.parquet (or the run folder that contains it)")
+    p.add_argument("--windows", type=int, nargs="+", default=None, help="Only these MA windows")
+    p.add_argument("--start", default=None, help="Inclusive start date")
+    p.add_argument("--end", default=None, help="Exclusive end date")
+    return p.parse_args()
+
+
+def curve_column(window: int) -> str:
+    return f"equity_{int(window)}"
+
+
+def kept_rows(n_rows: int, every: int = 1) -> np.ndarray:
+    """
+    Row indices a curve file keeps: every n-th date, and always the last one.
+    """
+    keep = np.arange(0, n_rows, max(1, int(every)))
+    if n_rows and keep[-1] != n_rows - 1:
+        keep = np.append(keep, n_rows - 1)
+    return keep
+
+
+class CurveCollector:
+    """
+    equity_sink for sweep_metrics / run_ma_sweep that keeps each window's curve,
+    downsampled to kept_rows(every) and cast to dtype as its block is computed,
+    so only the artifact-sized curves outlive a block. `curves` maps window ->
+    1-D curve.
+    """
+
+    def __init__(self, every: int = 1, dtype=np.float32):
+        self.every = max(1, int(every))
+        self.dtype = dtype
+        self.curves: dict[int, np.ndarray] = {}
+
+    def __call__(self, windows: list[int], equity: np.ndarray) -> None:
+        keep = kept_rows(equity.shape[1], self.every)
+        for w, curve in zip(windows, equity):
+            self.curves[int(w)] = curve[keep].astype(self.dtype)
+
+    def missing(self, windows: list[int]) -> list[int]:
+        return [int(w) for w in windows if int(w) not in self.curves]
+
+
+def collect_curves(
+    feature_path: Path,
+    collector: CurveCollector,
+    windows: list[int],
+    start: str | None = None,
+    end: str | None = None,
+) -> np.ndarray:
+    """
+    Backtest the windows the collector has no curve for yet (one blocked sweep
+    with the same returns and precomputed ma_N columns as run_ma_sweep).
+    Returns the file's Dates in [start, end).
+    """
+    todo = collector.missing(windows)
+    cols = load_feature_arrays(feature_path, [f"ma_{w}" for w in todo], start, end)
+    if todo:
+        sweep_metrics(
+            cols["Close"].astype(np.float64, copy=False), cols["ret_1d"].astype(np.float64, copy=False), todo,
+            ma_overrides=ma_columns(cols, todo), equity_sink=collector,
+        )
+    return cols["Date"]
+
+
+def equity_curves(
+    feature_path: Path,
+    windows: list[int],
+    start: str | None = None,
+    end: str | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Equity curves of the MA strategy for many windows, computed in sweep_metrics'
+    window blocks (the same returns and precomputed ma_N columns as run_ma_sweep).
+    Returns (dates, equity) with equity shaped (dates, windows).
+    """
+    windows = [int(w) for w in windows]
+    collector = CurveCollector(dtype=np.float64)
+    dates = collect_curves(feature_path, collector, windows, start, end)
+    equity = np.empty((len(dates), len(windows)))
+    for i, w in enumerate(windows):
+        equity[:, i] = collector.curves[w]
+    return dates, equity
+
+
+def _write_curve_columns(
+    path: Path,
+    dates: np.ndarray,
+    windows: list[int],
+    columns: list[np.ndarray],
+    every: int,
+    dtype,
+) -> Path:
+    # Stream one row group at a time: only a CURVE_ROW_GROUP_SIZE slice of every
+    # column is converted to Arrow at once
+    dates = np.asarray(dates)
+    schema = pa.schema(
+        [("Date", pa.array(dates[:0]).type), *((curve_column(w), pa.from_numpy_dtype(dtype)) for w in windows)],
+        metadata={"axiom": json.dumps({"windows": [int(w) for w in windows], "every": every})},
+    )
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".parquet.tmp")
+    with span("artifact_write", file=path.name, windows=len(windows), rows=len(dates)):
+        with pq.ParquetWriter(tmp, schema, compression="zstd") as writer:
+            for lo in range(0, len(dates), CURVE_ROW_GROUP_SIZE):
+                rows = slice(lo, lo + CURVE_ROW_GROUP_SIZE)
+                arrays = [pa.array(dates[rows])]
+                arrays += [pa.array(np.ascontiguousarray(c[rows], dtype=dtype)) for c in columns]
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+    tmp.replace(path)
+    return path
+
+
+def write_equity_curves(
+    path: str | Path,
+    dates: np.ndarray,
+    windows: list[int],
+    equity: np.ndarray,
+    every: int = 1,
+    dtype=np.float32,
+) -> Path:
+    """
+    Write (dates, windows) equity curves as one columnar file: a Date column plus
+    one equity_<window> column per window, zstd-compressed, float32 by default.
+
+    every > 1 keeps every n-th date (and always the last one), which shrinks the
+    file proportionally; drawdowns read back from a downsampled file can miss the
+    exact trough between kept dates. Returns the path.
+    """
+    keep = kept_rows(len(dates), every)
+    columns = [equity[keep, i] for i in range(len(windows))]
+    return _write_curve_columns(Path(path), np.asarray(dates)[keep], windows, columns, every, dtype)
+
+
+def write_collected_curves(path: str | Path, dates: np.ndarray, windows: list[int], collector: CurveCollector) -> Path:
+    """
+    write_equity_curves for curves a CurveCollector gathered (already downsampled);
+    `dates` are the full Dates the curves were computed on.
+    """
+    keep = kept_rows(len(dates), collector.every)
+    columns = [collector.curves[int(w)] for w in windows]
+    return _write_curve_columns(Path(path), np.asarray(dates)[keep], windows, columns, collector.every, collector.dtype)
+
+
+def _curves_path(path: str | Path) -> Path:
+    path = Path(path)
+    return path / EQUITY_CURVES_FILE if path.is_dir() else path
+
+
+def curve_windows(path: str | Path) -> list[int]:
+    """
+    Windows stored in an equity curve file, from the footer only.
+    """
+    return [int(c.split("_", 1)[1]) for c in pq.read_schema(_curves_path(path)).names if c.startswith("equity_")]
+
+
+def load_equity_curves(
+    path: str | Path,
+    windows: list[int] | None = None,
+    start: str | None = None,
+    end: str | None = None,
+) -> pd.DataFrame:
+    """
+    Equity curves as a Date-indexed frame with one column per window (named by
+    the window). Only the requested windows are read, row groups outside
+    [start, end) are skipped, and the file is memory-mapped rather than read
+    into a buffer first. `path` may be the run folder.
+    """
+    path = _curves_path(path)
+    columns = None if windows is None else ["Date", *(curve_column(w) for w in windows)]
+    filters = []
+    if start is not None:
+        filters.append(("Date", ">=", pd.Timestamp(start)))
+    if end is not None:
+        filters.append(("Date", "<", pd.Timestamp(end)))
+
+    with span("parquet_load", file=path.name, windows=len(windows) if windows else "all"):
+        table = pq.read_table(path, columns=columns, filters=filters or None, memory_map=True)
+    df = table.to_pandas().set_index("Date")
+    df.columns = [int(c.split("_", 1)[1]) for c in df.columns]
+    return df
+
+
+def drawdowns(curves: pd.DataFrame) -> pd.DataFrame:
+    """
+    Drawdown series (equity / running peak - 1) for every curve column.
+    """
+    return curves / curves.cummax() - 1.0
+
+
+def main() -> None:
+    args = parse_args()
+    path = _curves_path(args.path)
+    meta = json.loads((pq.read_schema(path).metadata or {}).get(b"axiom", b"{}"))
+    curves = load_equity_curves(path, args.windows, args.start, args.end)
+    print(f"{path}: {path.stat().st_size / 1024:.1f} KiB, {len(curve_windows(path))} windows, "
+          f"downsampled every {meta.get('every', 1)} row(s)")
+    if curves.empty:
+        print("No rows in range.")
+        return
+    print(f"Loaded {curves.shape[1]} curves x {len(curves)} dates "
+          f"({curves.index[0].date()} .. {curves.index[-1].date()})")
+    summary = pd.DataFrame({
+        "total_return": curves.iloc[-1] / curves.iloc[0] - 1.0,
+        "max_drawdown": drawdowns(curves).min(),
+    })
+    print(summary.sort_values("total_return", ascending=False).head(10))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from src.backtest.run_ma_backtest import load_feature_arrays, ma_columns, strategy_returns
+from src.tracing import span
+
+
+# Resamples per work unit; fixed so results don't depend on the number of workers
+CHUNK_RESAMPLES = 250
+
+
+def stationary_blocks(
+    n: int,
+    n_resamples: int,
+    mean_block: float,
+    rng: np.random.Generator,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Politis-Romano stationary bootstrap of a length-n series, as blocks.
+
+    Each resample is a run of circular blocks with uniform random starts and
+    geometric lengths (mean `mean_block`), cut to n rows in total. Returns flat
+    (starts, lengths, offsets) index arrays: the blocks of resample b are
+    offsets[b]:offsets[b + 1]. Block sums then come from prefix sums instead of
+    gathering every row.
+    """
+    p = 1.0 / max(float(mean_block), 1.0)
+    # Enough draws that almost every resample reaches n; the rest are topped up below
+    per = int(np.ceil(n * p * 1.5)) + 8
+
+    lengths = rng.geometric(p, size=(n_resamples, per))
+    ends = np.cumsum(lengths, axis=1)
+    while (ends[:, -1] < n).any():
+        more = rng.geometric(p, size=(n_resamples, per))
+        lengths = np.concatenate([lengths, more], axis=1)
+        ends = np.cumsum(lengths, axis=1)
+
+    # Keep blocks until the one that crosses n, and trim it
+    keep = (ends - lengths) < n
+    lengths = np.where(ends > n, lengths - (ends - n), lengths)
+
+    starts = rng.integers(0, n, size=lengths.shape)
+    counts = keep.sum(axis=1)
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    return starts[keep], lengths[keep], offsets
+
+
+def _resample_sharpes(
+    prefix: np.ndarray,
+    prefix_sq: np.ndarray,
+    prefix_count: np.ndarray,
+    n_resamples: int,
+    mean_block: float,
+    seed: np.random.SeedSequence,
+    annual_trading_days: int = 252,
+) -> np.ndarray:
+    """
+    Sharpe of every window in n_resamples bootstrap resamples, shaped (windows, resamples).
+    prefix* are circular (2n + 1, windows) prefix sums of returns, squared returns
+    and valid-return counts (dates first, so each block gathers contiguous rows).
+    """
+    n = (prefix.shape[0] - 1) // 2
+    starts, lengths, offsets = stationary_blocks(n, n_resamples, mean_block, np.random.default_rng(seed))
+    ends = starts + lengths
+
+    def per_resample(p: np.ndarray) -> np.ndarray:
+        block = p[ends] - p[starts]
+        return np.add.reduceat(block, offsets[:-1], axis=0).T
+
+    s1 = per_resample(prefix)
+    s2 = per_resample(prefix_sq)
+    count = per_resample(prefix_count)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = s1 / count
+        std = np.sqrt(np.maximum(s2 - count * mean * mean, 0.0) / (count - 1))
+        sharpe = mean / std * np.sqrt(annual_trading_days)
+    bad = (count < 2) | (std == 0) | np.isnan(std)
+    return np.where(bad, 0.0, sharpe)
+
+
+def bootstrap_sharpe(
+    strategy_ret: np.ndarray,
+    n_resamples: int = 2000,
+    mean_block: float = 20.0,
+    ci: float = 0.95,
+    seed: int = 0,
+    jobs: int = 1,
+) -> dict[str, np.ndarray]:
+    """
+    Stationary-bootstrap Sharpe uncertainty for many strategies at once.
+
+    strategy_ret is a (windows, dates) matrix (NaN = no return that day). Every
+    resample applies the same block index arrays to all windows, so their
+    Sharpes stay comparable within a resample. Resamples are processed in chunks
+    of CHUNK_RESAMPLES, on a process pool when jobs > 1.
+
+    Returns per-window arrays:
+      - sharpe_ci_lo / sharpe_ci_hi: percentile confidence interval at level `ci`
+      - sharpe_se: bootstrap standard error
+      - prob_best: share of resamples in which the window has the highest Sharpe
+    """
+    strategy_ret = np.asarray(strategy_ret, dtype=np.float64)
+    n_windows, n = strategy_ret.shape
+    if n < 2:
+        raise ValueError("Need at least 2 rows to bootstrap")
+
+    valid = ~np.isnan(strategy_ret.T)
+    r = np.where(valid, strategy_ret.T, 0.0)
+    zero = np.zeros((1, n_windows))
+    # Circular prefix sums (dates x windows): blocks that run past the end wrap to the start
+    prefix = np.concatenate([zero, np.cumsum(np.concatenate([r, r]), axis=0)])
+    prefix_sq = np.concatenate([zero, np.cumsum(np.concatenate([r * r, r * r]), axis=0)])
+    prefix_count = np.concatenate([zero, np.cumsum(np.concatenate([valid, valid]), axis=0)])
+
+    sizes = [min(CHUNK_RESAMPLES, n_resamples - i) for i in range(0, n_resamples, CHUNK_RESAMPLES)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(prefix, prefix_sq, prefix_count, size, mean_block, s) for size, s in zip(sizes, seeds)]
+
+    with span("bootstrap", windows=n_windows, rows=n, resamples=n_resamples, jobs=jobs):
+        if jobs > 1 and len(args) > 1:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                parts = list(pool.map(_resample_sharpes, *zip(*args)))
+        else:
+            parts = [_resample_sharpes(*a) for a in args]
+    sharpes = np.concatenate(parts, axis=1)
+
+    alpha = (1.0 - ci) / 2.0
+    lo, hi = np.quantile(sharpes, [alpha, 1.0 - alpha], axis=1)
+    winners = np.argmax(sharpes, axis=0)
+    return {
+        "sharpe_ci_lo": lo,
+        "sharpe_ci_hi": hi,
+        "sharpe_se": sharpes.std(axis=1, ddof=1),
+        "prob_best": np.bincount(winners, minlength=n_windows) / sharpes.shape[1],
+    }
+
+
+def bootstrap_sweep(
+    feature_path: Path,
+    windows: list[int],
+    start: str | None = None,
+    end: str | None = None,
+    n_resamples: int = 2000,
+    mean_block: float = 20.0,
+    ci: float = 0.95,
+    seed: int = 0,
+    jobs: int = 1,
+) -> pd.DataFrame:
+    """
+    bootstrap_sharpe for MA windows on one feature file (same returns as run_ma_sweep,
+    including precomputed ma_N columns). One row per window: ma_window plus the
+    bootstrap columns, ready to merge into ma_sweep.csv.
+    """
+    windows = [int(w) for w in windows]
+    cols = load_feature_arrays(feature_path, [f"ma_{w}" for w in windows], start, end)
+    returns = strategy_returns(cols["Close"], cols["ret_1d"], windows, ma_overrides=ma_columns(cols, windows))
+
+    res = bootstrap_sharpe(returns, n_resamples, mean_block, ci, seed, jobs)
+    return pd.DataFrame({"ma_window": windows, **res})
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+from pathlib import Path
+import time
+
+from src.digest import _read_json, _write_json_atomic, file_digest
+
+
+CACHE_DIR = Path("data") / "cache" / "backtest"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class ResultCache:
+    """
+    On-disk, content-addressed memo of backtest metrics.
+
+    Entries are keyed by (feature file sha256, ma_window, strategy version, date window)
+    and stored as small JSON files under root/<2-char shard>/<key>.json. Hits refresh
+    the entry's mtime, and evict() drops least-recently-used entries beyond max_bytes.
+
+    Writers report what they wrote to account(), which keeps an approximate total
+    in usage.json and only runs the O(entries) evict() scan once that total passes
+    max_bytes (the scan then stores the exact total). Concurrent writers may lose
+    or double-count a few increments; that only moves the next scan a little.
+    """
+
+    def __init__(self, root: str | Path = CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = int(max_bytes)
+
+    @property
+    def digest_index(self) -> Path:
+        return self.root / "digests.json"
+
+    @property
+    def usage_path(self) -> Path:
+        return self.root / "usage.json"
+
+    def file_hash(self, feature_path: Path) -> str:
+        return file_digest(feature_path, self.digest_index)
+
+    @staticmethod
+    def key(file_hash: str, ma_window: int, version: str, start: str | None = None, end: str | None = None) -> str:
+        raw = json.dumps([file_hash, int(ma_window), version, start, end])
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> dict | None:
+        path = self._path(key)
+        entry = _read_json(path)
+        if not entry:
+            return None
+        try:
+            os.utime(path)  # LRU: mark as recently used
+        except FileNotFoundError:
+            pass
+        return entry["metrics"]
+
+    def put(self, key: str, metrics: dict, **meta) -> int:
+        """
+        Store an entry; returns its size in bytes (for account()).
+        """
+        entry = {"key": key, "created": time.time(), "metrics": metrics, **meta}
+        path = self._path(key)
+        _write_json_atomic(path, entry)
+        try:
+            return path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def account(self, written_bytes: int) -> int:
+        """
+        Add freshly written bytes to the running size estimate and evict only
+        when it passes max_bytes (or when there is no estimate yet).
+        O(1) per call otherwise. Returns the number of evicted entries.
+        """
+        usage = _read_json(self.usage_path)
+        if "bytes" not in usage:
+            return self.evict()
+        total = int(usage["bytes"]) + int(written_bytes)
+        if total > self.max_bytes:
+            return self.evict()
+        _write_json_atomic(self.usage_path, {"bytes": total})
+        return 0
+
+    def _entry_files(self) -> list[Path]:
+        if not self.root.exists():
+            return []
+        return [p for p in self.root.glob("??/*.json")]
+
+    def entries(self) -> list[dict]:
+        """
+        All entries with their size and last-used time (for inspection).
+        """
+        rows = []
+        for p in self._entry_files():
+            entry = _read_json(p)
+            if not entry:
+                continue
+            st = p.stat()
+            rows.append({
+                "key": entry.get("key", p.stem),
+                "feature_file": entry.get("feature_file"),
+                "ma_window": entry.get("ma_window"),
+                "version": entry.get("version"),
+                "bytes": st.st_size,
+                "last_used": st.st_mtime,
+            })
+        return rows
+
+    def stats(self) -> dict:
+        files = self._entry_files()
+        return {
+            "root": str(self.root),
+            "entries": len(files),
+            "bytes": sum(p.stat().st_size for p in files),
+            "max_bytes": self.max_bytes,
+        }
+
+    def evict(self, max_bytes: int | None = None) -> int:
+        """
+        Remove least-recently-used entries until the cache fits in max_bytes.
+        Returns the number of removed entries.
+        """
+        limit = self.max_bytes if max_bytes is None else int(max_bytes)
+        files = []
+        for p in self._entry_files():
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            files.append((st.st_mtime, st.st_size, p))
+
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for _, size, p in sorted(files):
+            if total <= limit:
+                break
+            p.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        _write_json_atomic(self.usage_path, {"bytes": total})
+        return removed
+
+    def purge(self, feature_file: str | None = None, older_than_days: float | None = None) -> int:
+        """
+        Remove entries (all by default, or only those matching the filters).
+        Returns the number of removed entries.
+        """
+        cutoff = time.time() - older_than_days * 86400 if older_than_days is not None else None
+        removed = 0
+        for p in self._entry_files():
+            if feature_file is not None and _read_json(p).get("feature_file") != feature_file:
+                continue
+            if cutoff is not None and p.stat().st_mtime >= cutoff:
+                continue
+            p.unlink(missing_ok=True)
+            removed += 1
+        if feature_file is None and older_than_days is None:
+            self.digest_index.unlink(missing_ok=True)
+        self.usage_path.unlink(missing_ok=True)  # recounted by the next account()
+        return removed
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Inspect or purge the backtest result cache.")
+    p.add_argument("--root", default=str(CACHE_DIR), help="Cache folder")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    sub.add_parser("stats", help="Entry count and total size")
+
+    ls = sub.add_parser("list", help="List entries, most recently used first")
+    ls.add_argument("--limit", type=int, default=50)
+
+    purge = sub.add_parser("purge", help="Delete entries (all unless filtered)")
+    purge.add_argument("--feature_file", default=None, help="Only entries for this feature file")
+    purge.add_argument("--older_than_days", type=float, default=None, help="Only entries unused for this long")
+
+    evict = sub.add_parser("evict", help="LRU-evict down to a size budget")
+    evict.add_argument("--max_bytes", type=int, default=DEFAULT_MAX_BYTES)
+    return p.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    cache = ResultCache(args.root)
+
+    if args.cmd == "stats":
+        for k, v in cache.stats().items():
+            print(f"{k}: {v}")
+    elif args.cmd == "list":
+        rows = sorted(cache.entries(), key=lambda r: r["last_used"], reverse=True)
+        for r in rows[:args.limit]:
+            used = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(r["last_used"]))
+            print(f"{r['key'][:12]}  {used}  w={r['ma_window']:<4} {r['version']}  {r['feature_file']}")
+        print(f"{len(rows)} entries")
+    elif args.cmd == "purge":
+        print("Removed entries:", cache.purge(args.feature_file, args.older_than_days))
+    elif args.cmd == "evict":
+        print("Removed entries:", cache.evict(args.max_bytes))
+
+
+if __name__ == "__main__":
+    main()
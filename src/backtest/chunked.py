@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.backtest.run_ma_backtest import REQUIRED_COLUMNS
+from src.features.store import ROW_GROUP_SIZE, FeatureStore
+from src.tracing import span
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Out-of-core MA backtest over a feature file, one row group at a time.")
+    p.add_argument("--features", required=True, help="A *_feat.parquet file")
+    p.add_argument("--ma_window", type=int, default=20)
+    p.add_argument("--start", default=None, help="First Date (inclusive)")
+    p.add_argument("--end", default=None, help="Last Date (exclusive)")
+    p.add_argument("--equity_out", default=None, help="Optional parquet path for the Date/signal/strategy_ret/equity columns")
+    return p.parse_args()
+
+
+def run_ma_backtest_chunked(
+    feature_path: Path,
+    ma_window: int = 20,
+    start: str | None = None,
+    end: str | None = None,
+    equity_path: Path | None = None,
+    row_group_size: int = ROW_GROUP_SIZE,
+) -> dict:
+    """
+    run_ma_backtest for files larger than memory: the feature file is streamed one
+    row group at a time (FeatureStore.iter_batches) and only O(ma_window) state is
+    carried across chunk boundaries:
+      - the running cumulative sum / count of Close and its last ma_window prefixes
+        (the same arithmetic as rolling_means, so the MA matches the sweep engine)
+      - yesterday's signal
+      - equity, running peak and worst drawdown (cumprod / cummax continue exactly)
+      - count, mean and M2 of strategy returns, merged per chunk for the Sharpe
+
+    A precomputed ma_<window> column is used when the file has one, like run_ma_backtest.
+    With equity_path, Date / Close / signal / strategy_ret / equity are written back
+    chunk by chunk instead of being returned as a DataFrame.
+
+    Returns the metrics dict of run_ma_backtest. total_return and max_drawdown
+    equal sweep_metrics exactly; Sharpe agrees to floating-point rounding.
+    """
+    w = int(ma_window)
+    if w < 1:
+        raise ValueError(f"ma_window must be >= 1, got {w}")
+    ma_col = f"ma_{w}"
+    store = FeatureStore(Path(feature_path).parent)
+    available = store.columns(feature_path)
+    missing = [c for c in REQUIRED_COLUMNS if c not in available]
+    if missing:
+        raise ValueError(f"Missing columns in features file: {missing}")
+    columns = REQUIRED_COLUMNS + ([ma_col] if ma_col in available else [])
+
+    # MA state: prefixes of the cumulative Close sum / valid count (index 0 = empty prefix)
+    pre_sum = np.zeros(1)
+    pre_count = np.zeros(1)
+    prev_signal = None
+
+    equity, peak, max_dd = 1.0, -np.inf, 0.0
+    n, mean, m2 = 0, 0.0, 0.0
+    rows = 0
+
+    writer = None
+    try:
+        for table in store.iter_batches(feature_path, columns, start, end):
+            m = table.num_rows
+            close = table.column("Close").to_numpy().astype(np.float64, copy=False)
+            ret_1d = table.column("ret_1d").to_numpy().astype(np.float64, copy=False)
+
+            with span("rolling", window=w, rows=m, chunked=True):
+                if ma_col in columns:
+                    ma = table.column(ma_col).to_numpy().astype(np.float64, copy=False)
+                else:
+                    valid = ~np.isnan(close)
+                    # Continue the running sums (accumulate from the carried total, as one long cumsum would)
+                    csum = np.cumsum(np.concatenate([pre_sum[-1:], np.where(valid, close, 0.0)]))[1:]
+                    ccount = np.cumsum(np.concatenate([pre_count[-1:], valid]))[1:]
+                    ps = np.concatenate([pre_sum, csum])
+                    pc = np.concatenate([pre_count, ccount])
+
+                    k = len(pre_sum)
+                    hi = np.arange(k, k + m)
+                    lo = hi - w
+                    lo_idx = np.clip(lo, 0, None)
+                    full = (lo >= 0) & (pc[hi] - pc[lo_idx] == w)
+                    with np.errstate(invalid="ignore"):
+                        ma = np.where(full, (ps[hi] - ps[lo_idx]) / w, np.nan)
+
+                    pre_sum, pre_count = ps[-w:], pc[-w:]
+
+            with span("metrics", window=w, rows=m, chunked=True):
+                with np.errstate(invalid="ignore"):
+                    signal = close > ma
+
+                # Yesterday's signal times today's return; NaN on the very first bar
+                strategy_ret = np.empty(m)
+                strategy_ret[1:] = signal[:-1] * ret_1d[1:]
+                strategy_ret[0] = np.nan if prev_signal is None else prev_signal * ret_1d[0]
+                prev_signal = signal[-1]
+
+                growth = np.cumprod(np.concatenate([[equity], 1.0 + np.nan_to_num(strategy_ret, nan=0.0)]))[1:]
+                running_peak = np.maximum.accumulate(np.concatenate([[peak], growth]))[1:]
+                max_dd = min(max_dd, float((growth / running_peak - 1.0).min()))
+                equity, peak = float(growth[-1]), float(running_peak[-1])
+
+                # Merge this chunk's (count, mean, M2) into the running totals
+                r = strategy_ret[~np.isnan(strategy_ret)]
+                if len(r):
+                    c_mean = r.mean()
+                    c_m2 = float(((r - c_mean) ** 2).sum())
+                    total = n + len(r)
+                    delta = c_mean - mean
+                    mean += delta * len(r) / total
+                    m2 += c_m2 + delta * delta * n * len(r) / total
+                    n = total
+
+            if equity_path is not None:
+                with span("artifact_write", file=Path(equity_path).name, rows=m, chunked=True):
+                    out = pa.table({
+                        "Date": table.column("Date"),
+                        "Close": close,
+                        ma_col: ma,
+                        "signal": signal.astype(np.int64),
+                        "strategy_ret": strategy_ret,
+                        "equity": growth,
+                    })
+                    if writer is None:
+                        Path(equity_path).parent.mkdir(parents=True, exist_ok=True)
+                        writer = pq.ParquetWriter(equity_path, out.schema)
+                    writer.write_table(out, row_group_size=row_group_size)
+            rows += m
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if rows == 0:
+        raise ValueError("Cannot backtest an empty series")
+
+    sharpe = 0.0
+    if n >= 2:
+        std = np.sqrt(m2 / (n - 1))
+        if std != 0 and not np.isnan(std):
+            sharpe = float(mean / std * np.sqrt(252))
+
+    return {
+        "feature_file": str(feature_path),
+        "ma_window": w,
+        "total_return": equity - 1.0,
+        "max_drawdown": max_dd,
+        "sharpe": sharpe,
+    }
+
+
+def main() -> None:
+    args = parse_args()
+    metrics = run_ma_backtest_chunked(
+        Path(args.features), args.ma_window, args.start, args.end,
+        equity_path=Path(args.equity_out) if args.equity_out else None,
+    )
+    print("Metrics:", metrics)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from src.backtest.run_ma_backtest import compute_max_drawdown, compute_sharpe, rolling_means
+from src.features.store import FEATURES_DIR, FeatureStore
+from src.tracing import span
+
+
+ANNUAL_TRADING_DAYS = 252
+
+# Calendar schedules: trade at the close of the last trading day of each period
+SCHEDULES = {"weekly": "W", "monthly": "M", "quarterly": "Q"}
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Vol-targeted MA trend portfolio over many tickers, with trading costs.")
+    p.add_argument("--features", default=str(FEATURES_DIR), help="Folder containing *_feat.parquet files")
+    p.add_argument("--tickers", nargs="+", default=None, help="Tickers to trade (default: every partition)")
+    p.add_argument("--start", default=None, help="First Date (inclusive)")
+    p.add_argument("--end", default=None, help="Last Date (exclusive)")
+    p.add_argument("--ma_window", type=int, default=20, help="Signal: long when Close > MA(window)")
+    p.add_argument("--vol_window", type=int, default=20, help="vol_N column used for vol targeting")
+    p.add_argument("--target_vol", type=float, default=0.10,
+                   help="Annualized vol target (0 = equal weights, no vol targeting)")
+    p.add_argument("--max_weight", type=float, default=0.25, help="Cap on any single ticker's weight")
+    p.add_argument("--max_leverage", type=float, default=1.0, help="Cap on gross exposure (sum of weights)")
+    p.add_argument("--rebalance", default="daily",
+                   help="daily, weekly, monthly, quarterly, or every N trading days (an integer)")
+    p.add_argument("--cost_bps", type=float, default=0.0, help="Commission per unit of turnover, in bps")
+    p.add_argument("--slippage_bps", type=float, default=0.0, help="Fixed slippage per unit of turnover, in bps")
+    p.add_argument("--vol_slippage", type=float, default=0.0,
+                   help="Extra slippage per unit of turnover, as a fraction of the ticker's daily vol")
+    p.add_argument("--out", default=None, help="Optional CSV path for the daily portfolio series")
+    return p.parse_args()
+
+
+class CostModel:
+    """
+    Turnover-based trading costs. Trading |dw| of a ticker costs
+      |dw| * ((cost_bps + slippage_bps) / 1e4 + vol_slippage * daily_vol)
+    of portfolio value: a fixed commission and spread, plus slippage that grows
+    with the ticker's volatility (wider spreads and more impact in turbulent names).
+    """
+
+    def __init__(self, cost_bps: float = 0.0, slippage_bps: float = 0.0, vol_slippage: float = 0.0):
+        self.cost_bps = float(cost_bps)
+        self.slippage_bps = float(slippage_bps)
+        self.vol_slippage = float(vol_slippage)
+
+    def __call__(self, trades: np.ndarray, vol: np.ndarray | None = None) -> np.ndarray:
+        """
+        Cost per date (fraction of portfolio value) of a (dates, tickers) matrix of weight changes.
+        """
+        trades = np.abs(trades)
+        rate = (self.cost_bps + self.slippage_bps) / 1e4
+        cost = rate * trades.sum(axis=1)
+        if self.vol_slippage and vol is not None:
+            cost += self.vol_slippage * np.nansum(trades * vol, axis=1)
+        return cost
+
+
+def rebalance_mask(dates: pd.DatetimeIndex | None, n_rows: int, rebalance: str | int = "daily") -> np.ndarray:
+    """
+    Boolean (dates,) mask of the closes at which the portfolio trades: every day,
+    every N rows, or the last trading day of each week / month / quarter. The
+    first date always trades (that is when the portfolio is built).
+    """
+    if isinstance(rebalance, str) and rebalance.isdigit():
+        rebalance = int(rebalance)
+    if rebalance == "daily" or rebalance == 1:
+        mask = np.ones(n_rows, dtype=bool)
+    elif isinstance(rebalance, int):
+        if rebalance < 1:
+            raise ValueError(f"rebalance every N rows needs N >= 1, got {rebalance}")
+        mask = np.arange(n_rows) % rebalance == 0
+    elif rebalance in SCHEDULES:
+        if dates is None:
+            raise ValueError(f"rebalance={rebalance!r} needs the Date index")
+        period = pd.DatetimeIndex(dates).to_period(SCHEDULES[rebalance]).asi8
+        mask = np.ones(n_rows, dtype=bool)
+        mask[:-1] = period[:-1] != period[1:]
+    else:
+        raise ValueError(f"Unknown rebalance schedule: {rebalance!r} (daily, {', '.join(SCHEDULES)} or an integer)")
+    if n_rows:
+        mask[0] = True
+    return mask
+
+
+def target_weights(
+    signal: np.ndarray,
+    vol: np.ndarray | None = None,
+    target_vol: float = 0.10,
+    max_weight: float = 1.0,
+    max_leverage: float = 1.0,
+    annual_trading_days: int = ANNUAL_TRADING_DAYS,
+) -> np.ndarray:
+    """
+    Weights wanted at each close, shaped (dates, tickers), from a signal matrix
+    (1 = long, 0 = flat; NaN = not tradable that day).
+
+    Each tradable ticker gets an equal share of the risk budget: with vol
+    (daily return std, e.g. vol_20) the weight is
+      signal * target_vol / (vol * sqrt(annual_trading_days)) / n_tradable
+    (a naive target that ignores correlations), without vol it is
+    signal / n_tradable. Weights are capped at max_weight per ticker and whole
+    rows are scaled down to at most max_leverage gross exposure; the rest is cash.
+    """
+    signal = np.asarray(signal, dtype=np.float64)
+    tradable = ~np.isnan(signal)
+    if vol is not None:
+        vol = np.asarray(vol, dtype=np.float64)
+        tradable &= ~np.isnan(vol) & (vol > 0)
+
+    n_tradable = tradable.sum(axis=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if vol is None:
+            raw = signal / n_tradable
+        else:
+            raw = signal * (target_vol / np.sqrt(annual_trading_days)) / vol / n_tradable
+    weights = np.where(tradable, raw, 0.0)
+
+    np.clip(weights, -max_weight, max_weight, out=weights)
+    gross = np.abs(weights).sum(axis=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        scale = np.where(gross > max_leverage, max_leverage / gross, 1.0)
+    return weights * scale
+
+
+def simulate_portfolio(
+    ret_1d: np.ndarray,
+    weights: np.ndarray,
+    rebalance: np.ndarray,
+    costs: CostModel | None = None,
+    vol: np.ndarray | None = None,
+) -> dict[str, np.ndarray]:
+    """
+    Daily returns of a portfolio that trades to `weights` at the closes marked in
+    `rebalance` and lets positions drift with prices in between.
+
+    All inputs are (dates, tickers) matrices (rebalance is (dates,)); weights
+    set at close t earn the returns of day t + 1, like the single-ticker backtest
+    (yesterday's signal times today's return). The trade at close t costs
+    costs(|weights - drifted weights|) and is charged on day t + 1's return.
+    Drift uses each ticker's growth since the last rebalance, so the whole run is
+    a handful of cumulative products and gathers with no loop over dates or tickers.
+
+    Returns arrays (dates,): gross_ret and net_ret (NaN on day 0), turnover, cost,
+    exposure (gross weight held after the close), plus held (dates, tickers)
+    weights after each close.
+    """
+    r = np.nan_to_num(np.asarray(ret_1d, dtype=np.float64), nan=0.0)
+    weights = np.asarray(weights, dtype=np.float64)
+    rebalance = np.asarray(rebalance, dtype=bool)
+    n = r.shape[0]
+    if n == 0:
+        raise ValueError("Cannot backtest an empty series")
+
+    rows = np.arange(n)
+    # Last rebalance at or before each close, and strictly before it
+    last = np.maximum.accumulate(np.where(rebalance, rows, 0))
+    prev = np.concatenate([[-1], last[:-1]])
+
+    with span("metrics", rows=n, tickers=r.shape[1], stage="drift"):
+        growth = np.cumprod(1.0 + r, axis=0)
+
+        def drifted(anchor: np.ndarray) -> np.ndarray:
+            # Weights set at `anchor` after each ticker (and cash) grew since then
+            w0 = weights[anchor]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                rel = growth / growth[anchor]
+            value = w0 * rel
+            total = 1.0 - w0.sum(axis=1, keepdims=True) + value.sum(axis=1, keepdims=True)
+            return value / total
+
+        held = drifted(last)
+        before = drifted(np.maximum(prev, 0))
+        before[0] = 0.0  # nothing is held before the first close
+
+    trades = np.where(rebalance[:, None], weights - before, 0.0)
+    turnover = np.abs(trades).sum(axis=1)
+    cost = costs(trades, vol) if costs is not None else np.zeros(n)
+
+    gross_ret = np.empty(n)
+    gross_ret[0] = np.nan
+    gross_ret[1:] = (held[:-1] * r[1:]).sum(axis=1)
+    net_ret = gross_ret.copy()
+    net_ret[1:] -= cost[:-1]
+
+    return {
+        "gross_ret": gross_ret,
+        "net_ret": net_ret,
+        "turnover": turnover,
+        "cost": cost,
+        "exposure": np.abs(held).sum(axis=1),
+        "held": held,
+    }
+
+
+def run_portfolio_backtest(
+    features: str | Path = FEATURES_DIR,
+    tickers: list[str] | None = None,
+    start: str | None = None,
+    end: str | None = None,
+    ma_window: int = 20,
+    vol_window: int = 20,
+    target_vol: float = 0.10,
+    max_weight: float = 0.25,
+    max_leverage: float = 1.0,
+    rebalance: str | int = "daily",
+    costs: CostModel | None = None,
+) -> tuple[pd.DataFrame, dict]:
+    """
+    MA trend portfolio across a feature folder:
+      - signal = 1 when Close > MA(ma_window) per ticker (precomputed ma_N columns
+        when every file has them, else rolled from the aligned Close panel)
+      - weights = target_weights from vol_<vol_window> (target_vol=0: equal weights)
+      - traded on the rebalance schedule with costs (see simulate_portfolio)
+
+    Tickers are aligned on the union of their Dates (FeatureStore.read_panel);
+    a ticker is not tradable on dates where it has no row.
+
+    Returns:
+      - df: Date, gross_ret, cost, strategy_ret (net), equity, turnover, exposure
+      - metrics: total_return, max_drawdown, sharpe (compute_sharpe /
+        compute_max_drawdown), plus annual turnover, total cost and average exposure
+    """
+    store = FeatureStore(features)
+    paths = store.select(tickers, start, end)
+    if not paths:
+        raise FileNotFoundError(f"No feature files with rows in the data window in {features}")
+
+    ma_col = f"ma_{ma_window}"
+    vol_col = f"vol_{vol_window}"
+    need = ["Close", "ret_1d"] + ([vol_col] if target_vol else [])
+    problems = [msg for p in paths for msg in store.check(p, need, start, end)]
+    if problems:
+        raise ValueError("Unusable feature files: " + "; ".join(problems))
+    has_ma = all(ma_col in store.columns(p) for p in paths)
+
+    columns = tuple(need + ([ma_col] if has_ma else []))
+    dates, labels, arrays = store.read_panel(paths, columns, start, end)
+    close, ret_1d = arrays["Close"], arrays["ret_1d"]
+    vol = arrays[vol_col] if target_vol else None
+
+    with span("rolling", rows=len(dates), tickers=len(labels)):
+        ma = arrays[ma_col] if has_ma else rolling_means(close, [ma_window])[0]
+        with np.errstate(invalid="ignore"):
+            signal = np.where(np.isnan(close) | np.isnan(ma), np.nan, (close > ma).astype(np.float64))
+
+    weights = target_weights(signal, vol, target_vol, max_weight, max_leverage)
+    mask = rebalance_mask(dates, len(dates), rebalance)
+    res = simulate_portfolio(ret_1d, weights, mask, costs, vol)
+
+    df = pd.DataFrame({
+        "Date": dates,
+        "gross_ret": res["gross_ret"],
+        "cost": res["cost"],
+        "strategy_ret": res["net_ret"],
+        "turnover": res["turnover"],
+        "exposure": res["exposure"],
+    })
+    df["equity"] = (1 + df["strategy_ret"].fillna(0)).cumprod()
+
+    years = max(len(df) / ANNUAL_TRADING_DAYS, 1e-12)
+    metrics = {
+        "tickers": labels,
+        "rebalance": str(rebalance),
+        "total_return": float(df["equity"].iloc[-1] - 1),
+        "max_drawdown": compute_max_drawdown(df["equity"]),
+        "sharpe": compute_sharpe(df["strategy_ret"]),
+        "annual_turnover": float(df["turnover"].sum() / years),
+        "total_cost": float(df["cost"].sum()),
+        "avg_exposure": float(df["exposure"].mean()),
+    }
+    return df, metrics
+
+
+def main() -> None:
+    args = parse_args()
+    costs = CostModel(args.cost_bps, args.slippage_bps, args.vol_slippage)
+    df, metrics = run_portfolio_backtest(
+        args.features, args.tickers, args.start, args.end,
+        ma_window=args.ma_window, vol_window=args.vol_window, target_vol=args.target_vol,
+        max_weight=args.max_weight, max_leverage=args.max_leverage,
+        rebalance=args.rebalance, costs=costs,
+    )
+    print(f"Portfolio of {len(metrics['tickers'])} tickers, {len(df)} dates, rebalance={metrics['rebalance']}")
+    for k in ("total_return", "max_drawdown", "sharpe", "annual_turnover", "total_cost", "avg_exposure"):
+        print(f"  {k:>15}: {metrics[k]:.4f}")
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        df.to_csv(args.out, index=False)
+        print("Saved:", args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,75 @@
 from __future__ import annotations
 
 from pathlib import Path
+from typing import Callable
 import numpy as np
 import pandas as pd
 
+from src.backtest.cache import ResultCache
+from src.features.store import FeatureStore
+from src.tracing import span
+
+
+REQUIRED_COLUMNS = ["Date", "Close", "ret_1d"]
+
+# Part of every result-cache key: bump whenever the strategy or metric math changes
+STRATEGY_VERSION = "ma-trend-v1"
+
+# Upper bound on (windows x rows) cells materialized at once by the sweep engine.
+# Larger sweeps are processed in blocks of windows to keep peak memory bounded.
+SWEEP_MAX_CELLS = 20_000_000
+
+
+def load_features(
+    feature_path: Path,
+    extra_columns: list[str] | None = None,
+    start: str | None = None,
+    end: str | None = None,
+) -> pd.DataFrame:
+    """
+    Load the backtest columns (Date, Close, ret_1d) of a *_feat.parquet file in Date order.
+    extra_columns are added when the file has them (e.g. precomputed ma_N columns).
+    start/end restrict rows to the [start, end) Date window.
+    """
+    store = FeatureStore(Path(feature_path).parent)
+    return store.read(feature_path, _backtest_columns(store, feature_path, extra_columns), start, end)
+
+
+def load_feature_arrays(
+    feature_path: Path,
+    extra_columns: list[str] | None = None,
+    start: str | None = None,
+    end: str | None = None,
+) -> dict[str, np.ndarray]:
+    """
+    Same columns as load_features, as NumPy arrays (zero-copy where possible).
+    """
+    store = FeatureStore(Path(feature_path).parent)
+    return store.read_arrays(feature_path, _backtest_columns(store, feature_path, extra_columns), start, end)
+
+
+def ma_columns(cols: dict[str, np.ndarray], windows: list[int]) -> dict[int, np.ndarray]:
+    """
+    Precomputed ma_N columns among cols (as float64), keyed by window; the
+    ma_overrides argument of the batched backtests.
+    """
+    return {
+        int(w): cols[f"ma_{w}"].astype(np.float64, copy=False)
+        for w in windows
+        if f"ma_{w}" in cols
+    }
+
+
+def _backtest_columns(store: FeatureStore, feature_path: Path, extra_columns: list[str] | None) -> list[str]:
+    available = store.columns(feature_path)
+
+    missing = [c for c in REQUIRED_COLUMNS if c not in available]
+    if missing:
+        raise ValueError(f"Missing columns in features file: {missing}")
+
+    extra = [c for c in (extra_columns or []) if c in available and c not in REQUIRED_COLUMNS]
+    return REQUIRED_COLUMNS + extra
+
 
 def compute_max_drawdown(equity: pd.Series) -> float:
     """
@@ -29,36 +95,72 @@ def compute_sharpe(strategy_ret: pd.Series, annual_trading_days: int = 252) -> f
     return float((r.mean() / std) * np.sqrt(annual_trading_days))
 
 
-def run_ma_backtest(feature_path: Path, ma_window: int = 20) -> tuple[pd.DataFrame, dict]:
+def run_ma_backtest(
+    feature_path: Path,
+    ma_window: int = 20,
+    start: str | None = None,
+    end: str | None = None,
+    return_frame: bool = True,
+    dtype: np.dtype | type = np.float64,
+    scratch: BacktestScratch | None = None,
+    cache: ResultCache | None = None,
+) -> tuple[pd.DataFrame, dict] | dict:
     """
     MA Trend Strategy:
       - signal = 1 when Close > MA(window), else 0
       - strategy_ret = yesterday_signal * today_ret_1d   (avoid look-ahead bias)
       - equity starts at 1.0 and compounds over time
 
+    start/end optionally restrict the backtest to the [start, end) Date window.
+
+    return_frame=False is the metrics-only fast path: the columns are read as NumPy
+    arrays and the backtest runs in a BacktestScratch (pass one in to reuse its
+    buffers across calls) in the given dtype, e.g. np.float32 to halve memory traffic.
+
+    With a ResultCache, the float64 metrics-only path is memoized under the same
+    keys as run_ma_sweep (file content, window, strategy version, date window).
+    The frame path always recomputes: the per-row frame is what it returns.
+
     Returns:
       - df: dataframe with signal/strategy_ret/equity columns
       - metrics: dict with total_return, max_drawdown, sharpe
+    or just the metrics dict when return_frame=False.
     """
-    # ------------------------------------------------------------
-    # Load input features (produced by build_features.py)
-    # ------------------------------------------------------------
-    df = pd.read_parquet(feature_path).sort_values("Date")
+    ma_col = f"ma_{ma_window}"
+    if not return_frame:
+        key = None
+        if cache is not None and np.dtype(dtype) == np.float64:
+            key = cache.key(cache.file_hash(feature_path), ma_window, STRATEGY_VERSION, start, end)
+            hit = cache.get(key)
+            if hit is not None:
+                return {**hit, "feature_file": str(feature_path)}
+
+        cols = load_feature_arrays(feature_path, [ma_col], start, end)
+        if scratch is None:
+            scratch = BacktestScratch(dtype)
+        scratch.load(cols["Close"], cols["ret_1d"])
+        metrics = {
+            "feature_file": str(feature_path),
+            "ma_window": int(ma_window),
+            **scratch.metrics(ma_window, cols.get(ma_col)),
+        }
+        if key is not None:
+            cache.account(cache.put(
+                key, metrics, feature_file=str(feature_path), ma_window=int(ma_window), version=STRATEGY_VERSION,
+            ))
+        return metrics
 
     # ------------------------------------------------------------
-    # Ensure we have the required columns
+    # Load input features (produced by build_features.py)
     # ------------------------------------------------------------
-    required = ["Date", "Close", "ret_1d"]
-    missing = [c for c in required if c not in df.columns]
-    if missing:
-        raise ValueError(f"Missing columns in features file: {missing}")
+    df = load_features(feature_path, [ma_col], start, end)
 
     # ------------------------------------------------------------
     # Compute MA(window) if not present (keeps this backtest reusable)
     # ------------------------------------------------------------
-    ma_col = f"ma_{ma_window}"
     if ma_col not in df.columns:
-        df[ma_col] = df["Close"].rolling(ma_window).mean()
+        with span("rolling", window=ma_window, rows=len(df)):
+            df[ma_col] = df["Close"].rolling(ma_window).mean()
 
     # ------------------------------------------------------------
     # Strategy signal: long when Close > MA(window)
@@ -78,9 +180,10 @@ def run_ma_backtest(feature_path: Path, ma_window: int = 20) -> tuple[pd.DataFra
     # ------------------------------------------------------------
     # Metrics
     # ------------------------------------------------------------
-    total_return = float(df["equity"].iloc[-1] - 1.0)
-    max_dd = compute_max_drawdown(df["equity"])
-    sharpe = compute_sharpe(df["strategy_ret"])
+    with span("metrics", window=ma_window, rows=len(df)):
+        total_return = float(df["equity"].iloc[-1] - 1.0)
+        max_dd = compute_max_drawdown(df["equity"])
+        sharpe = compute_sharpe(df["strategy_ret"])
 
     metrics = {
         "feature_file": str(feature_path),
@@ -92,15 +195,465 @@ def run_ma_backtest(feature_path: Path, ma_window: int = 20) -> tuple[pd.DataFra
     return df, metrics
 
 
+class BacktestScratch:
+    """
+    Preallocated work buffers for metrics-only MA backtests.
+
+    load(close, ret_1d) copies one series into the buffers (in `dtype`) and builds
+    its Close prefix sums once; metrics(window) then runs the backtest for any
+    number of windows without allocating per-row arrays. Buffers grow to the
+    longest series loaded and are reused afterwards.
+
+    Prefix sums are always float64: float32 running sums over long histories lose
+    too much precision for the MA. Sums for the Sharpe are accumulated in float64.
+    Same strategy and MA arithmetic as sweep_metrics.
+    """
+
+    def __init__(self, dtype: np.dtype | type = np.float64):
+        self.dtype = np.dtype(dtype)
+        self.n = 0
+        self._capacity = -1
+        self._reserve(0)
+
+    def _reserve(self, n: int) -> None:
+        if n <= self._capacity:
+            return
+        self._close = np.empty(n, self.dtype)
+        self._ret_1d = np.empty(n, self.dtype)
+        self._ma = np.empty(n, self.dtype)
+        self._strategy_ret = np.empty(n, self.dtype)
+        self._work = np.empty(n, self.dtype)
+        self._work2 = np.empty(n, self.dtype)
+        self._signal = np.empty(n, bool)
+        self._mask = np.empty(n, bool)
+        self._csum = np.empty(n + 1, np.float64)
+        self._ccount = np.empty(n + 1, np.int64)
+        self._capacity = n
+
+    def load(self, close: np.ndarray, ret_1d: np.ndarray) -> None:
+        n = len(close)
+        if n == 0:
+            raise ValueError("Cannot backtest an empty series")
+        self._reserve(n)
+        self.n = n
+        close_buf, ret_buf = self._close[:n], self._ret_1d[:n]
+        np.copyto(close_buf, close, casting="unsafe")
+        np.copyto(ret_buf, ret_1d, casting="unsafe")
+
+        # Close prefix sums (NaN counted as 0; counts track how many were valid)
+        csum = self._csum[:n + 1]
+        csum[0] = 0.0
+        np.isnan(close_buf, out=self._mask[:n])
+        self._has_nan = bool(self._mask[:n].any())
+        if self._has_nan:
+            np.copyto(self._work[:n], close_buf)
+            self._work[:n][self._mask[:n]] = 0.0
+            np.cumsum(self._work[:n], out=csum[1:], dtype=np.float64)
+            np.logical_not(self._mask[:n], out=self._mask[:n])
+            self._ccount[0] = 0
+            np.cumsum(self._mask[:n], out=self._ccount[1:n + 1])
+        else:
+            np.cumsum(close_buf, out=csum[1:], dtype=np.float64)
+
+    def metrics(self, ma_window: int, ma: np.ndarray | None = None) -> dict:
+        """
+        total_return / max_drawdown / sharpe for one window on the loaded series.
+        `ma` replaces the rolling mean (e.g. a precomputed ma_N column).
+        """
+        n, w = self.n, int(ma_window)
+        close, ret_1d = self._close[:n], self._ret_1d[:n]
+        ma_buf, signal, mask = self._ma[:n], self._signal[:n], self._mask[:n]
+        strategy_ret, work, work2 = self._strategy_ret[:n], self._work[:n], self._work2[:n]
+
+        # --- MA(window) from the shared prefix sums ---
+        if ma is not None:
+            np.copyto(ma_buf, ma, casting="unsafe")
+        else:
+            ma_buf[:] = np.nan
+            if w <= n:
+                csum = self._csum[:n + 1]
+                tail = ma_buf[w - 1:]
+                np.subtract(csum[w:], csum[:n + 1 - w], out=tail, casting="same_kind")
+                np.divide(tail, w, out=tail)
+                if self._has_nan:
+                    counts = self._ccount[w:n + 1] - self._ccount[:n + 1 - w]
+                    tail[counts != w] = np.nan
+
+        # --- Signal and strategy returns (yesterday's signal * today's return) ---
+        with np.errstate(invalid="ignore"):
+            np.greater(close, ma_buf, out=signal)
+        strategy_ret[0] = np.nan
+        np.multiply(signal[:-1], ret_1d[1:], out=strategy_ret[1:])
+
+        # --- Sharpe over valid returns ---
+        np.isnan(strategy_ret, out=mask)
+        count = n - int(np.count_nonzero(mask))
+        np.copyto(work, strategy_ret)
+        work[mask] = 0.0
+        sharpe = 0.0
+        if count >= 2:
+            mean = work.sum(dtype=np.float64) / count
+            np.subtract(work, mean, out=work2, casting="same_kind")
+            work2[mask] = 0.0
+            np.multiply(work2, work2, out=work2)
+            std = np.sqrt(work2.sum(dtype=np.float64) / (count - 1))
+            if std != 0 and not np.isnan(std):
+                sharpe = float(mean / std * np.sqrt(252))
+
+        # --- Equity (NaN returns count as 0) and drawdown ---
+        np.add(work, 1.0, out=work)
+        np.multiply.accumulate(work, out=work)
+        np.maximum.accumulate(work, out=work2)
+        np.divide(work, work2, out=work2)
+
+        return {
+            "total_return": float(work[-1]) - 1.0,
+            "max_drawdown": float(work2.min()) - 1.0,
+            "sharpe": sharpe,
+        }
+
+
+def rolling_means(close: np.ndarray, windows: list[int]) -> np.ndarray:
+    """
+    Moving averages of Close for many windows at once, from one shared cumulative sum.
+
+    close may be 1-D (dates,) or 2-D (dates, series). Returns an array shaped
+    (len(windows),) + close.shape. Like Series.rolling(w).mean(), a value is NaN
+    until w observations are available and whenever the window contains a NaN.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    n = close.shape[0]
+    w = np.asarray(windows, dtype=np.int64)
+    extra = (1,) * (close.ndim - 1)
+
+    valid = ~np.isnan(close)
+    zero = np.zeros((1,) + close.shape[1:])
+    csum = np.concatenate([zero, np.cumsum(np.where(valid, close, 0.0), axis=0)])
+    ccount = np.concatenate([zero, np.cumsum(valid, axis=0)])
+
+    # Window [t - w + 1, t] maps to prefix indices (t + 1) - w .. (t + 1)
+    hi = np.arange(1, n + 1)
+    lo = hi[None, :] - w[:, None]
+    lo_idx = np.clip(lo, 0, None)
+
+    sums = csum[hi][None] - csum[lo_idx]
+    counts = ccount[hi][None] - ccount[lo_idx]
+    w_b = w.reshape((-1, 1) + extra)
+    full = (lo >= 0).reshape(lo.shape + extra) & (counts == w_b)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(full, sums / w_b, np.nan)
+
+
+def _window_means(close: np.ndarray, windows: list[int], ma_overrides: dict[int, np.ndarray]) -> np.ndarray:
+    """
+    MAs shaped (len(windows),) + close.shape: precomputed columns where
+    ma_overrides has them, rolled from the shared cumulative sum otherwise.
+    """
+    ma = np.empty((len(windows),) + close.shape)
+    rolled = [i for i, w in enumerate(windows) if w not in ma_overrides]
+    if rolled:
+        ma[rolled] = rolling_means(close, [windows[i] for i in rolled])
+    for i, w in enumerate(windows):
+        if w in ma_overrides:
+            ma[i] = ma_overrides[w]
+    return ma
+
+
+def sweep_metrics(
+    close: np.ndarray,
+    ret_1d: np.ndarray,
+    windows: list[int],
+    ma_overrides: dict[int, np.ndarray] | None = None,
+    warmup: int = 0,
+    equity_sink: Callable[[list[int], np.ndarray], None] | None = None,
+) -> dict[str, np.ndarray]:
+    """
+    Batched MA trend backtest for many windows in one NumPy pass.
+
+    Same strategy as run_ma_backtest (signal = Close > MA, yesterday's signal
+    times today's ret_1d, equity compounds from 1.0). close / ret_1d may be 1-D
+    (dates,) or 2-D (dates, series) to evaluate several aligned series together.
+    ma_overrides maps a window to an already computed MA (e.g. a ma_20 column).
+    The first `warmup` rows only feed the moving averages; metrics are measured
+    on the rows after them. equity_sink(block_windows, equity) receives the equity
+    curves of each block of windows as it is computed, shaped
+    (len(block_windows),) + close.shape, so curves never need a second backtest.
+
+    Returns a dict of total_return / max_drawdown / sharpe arrays shaped
+    (len(windows),) + close.shape[1:].
+    """
+    close = np.asarray(close, dtype=np.float64)
+    ret_1d = np.asarray(ret_1d, dtype=np.float64)
+    ma_overrides = ma_overrides or {}
+    windows = [int(w) for w in windows]
+
+    if close.shape[0] == 0:
+        raise ValueError("Cannot backtest an empty series")
+
+    per_window = max(1, int(np.prod(close.shape)))
+    block = max(1, SWEEP_MAX_CELLS // per_window)
+
+    out = {
+        k: np.empty((len(windows),) + close.shape[1:])
+        for k in ("total_return", "max_drawdown", "sharpe")
+    }
+
+    for start in range(0, len(windows), block):
+        ws = windows[start:start + block]
+        with span("rolling", windows=len(ws), rows=close.shape[0]):
+            ma = _window_means(close, ws, ma_overrides)
+
+        with span("metrics", windows=len(ws), rows=close.shape[0]):
+            # --- Signal: long when Close > MA(window) ---
+            with np.errstate(invalid="ignore"):
+                signal = close[None] > ma
+
+            sl = slice(start, start + len(ws))
+            metrics = _signal_metrics(signal, ret_1d, warmup, keep_equity=equity_sink is not None)
+            if equity_sink is not None:
+                equity_sink(ws, metrics.pop("equity"))
+            for k, v in metrics.items():
+                out[k][sl] = v
+
+    return out
+
+
+def crossover_metrics(
+    close: np.ndarray,
+    ret_1d: np.ndarray,
+    pairs: list[tuple[int, int]],
+    warmup: int = 0,
+    ma_overrides: dict[int, np.ndarray] | None = None,
+) -> dict[str, np.ndarray]:
+    """
+    Batched dual-MA crossover backtest: long when MA(fast) > MA(slow).
+
+    Every distinct window is rolled once from the shared cumulative sum (or taken
+    from ma_overrides) and reused by all pairs that mention it. Inputs and
+    outputs follow sweep_metrics, with one result per (fast, slow) pair.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    ret_1d = np.asarray(ret_1d, dtype=np.float64)
+    pairs = [(int(f), int(s)) for f, s in pairs]
+    ma_overrides = ma_overrides or {}
+
+    if close.shape[0] == 0:
+        raise ValueError("Cannot backtest an empty series")
+
+    per_pair = max(1, int(np.prod(close.shape)))
+    block = max(1, SWEEP_MAX_CELLS // (3 * per_pair))
+
+    out = {
+        k: np.empty((len(pairs),) + close.shape[1:])
+        for k in ("total_return", "max_drawdown", "sharpe")
+    }
+
+    for start in range(0, len(pairs), block):
+        ps = pairs[start:start + block]
+        ws = sorted({w for pair in ps for w in pair})
+        with span("rolling", windows=len(ws), rows=close.shape[0]):
+            ma = _window_means(close, ws, ma_overrides)
+        pos = {w: i for i, w in enumerate(ws)}
+
+        with span("metrics", windows=len(ps), rows=close.shape[0]):
+            fast = ma[[pos[f] for f, _ in ps]]
+            slow = ma[[pos[s] for _, s in ps]]
+            with np.errstate(invalid="ignore"):
+                signal = fast > slow
+
+            sl = slice(start, start + len(ps))
+            for k, v in _signal_metrics(signal, ret_1d, warmup).items():
+                out[k][sl] = v
+
+    return out
+
+
+def _signal_metrics(
+    signal: np.ndarray, ret_1d: np.ndarray, warmup: int = 0, keep_equity: bool = False,
+) -> dict[str, np.ndarray]:
+    """
+    Metrics for a (strategies, dates, ...) boolean signal array over one ret_1d series.
+    keep_equity adds the equity curves themselves under "equity".
+    """
+    strategy_ret = _signal_returns(signal, ret_1d, warmup)
+
+    # --- Equity curve and drawdown ---
+    equity = np.cumprod(1.0 + np.nan_to_num(strategy_ret, nan=0.0), axis=1)
+    drawdown = equity / np.maximum.accumulate(equity, axis=1) - 1.0
+
+    out = {
+        "total_return": equity[:, -1] - 1.0,
+        "max_drawdown": drawdown.min(axis=1),
+        "sharpe": _batched_sharpe(strategy_ret),
+    }
+    if keep_equity:
+        out["equity"] = equity
+    return out
+
+
+def _signal_returns(signal: np.ndarray, ret_1d: np.ndarray, warmup: int = 0) -> np.ndarray:
+    """
+    Strategy returns: yesterday's signal times today's return, NaN on day 0 and during warmup.
+    """
+    strategy_ret = np.empty(signal.shape)
+    strategy_ret[:, 0] = np.nan
+    strategy_ret[:, 1:] = signal[:, :-1] * ret_1d[None, 1:]
+    if warmup > 0:
+        strategy_ret[:, :warmup] = np.nan
+    return strategy_ret
+
+
+def strategy_returns(
+    close: np.ndarray,
+    ret_1d: np.ndarray,
+    windows: list[int],
+    ma_overrides: dict[int, np.ndarray] | None = None,
+) -> np.ndarray:
+    """
+    Per-window strategy return series, shaped (len(windows),) + close.shape.
+    NaN where run_ma_backtest's strategy_ret column is NaN.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    ret_1d = np.asarray(ret_1d, dtype=np.float64)
+    ma_overrides = ma_overrides or {}
+
+    ma = _window_means(close, [int(w) for w in windows], ma_overrides)
+    with np.errstate(invalid="ignore"):
+        signal = close[None] > ma
+    return _signal_returns(signal, ret_1d)
+
+
+def _batched_sharpe(strategy_ret: np.ndarray, annual_trading_days: int = 252) -> np.ndarray:
+    """
+    compute_sharpe along axis 1 of a (windows, dates, ...) array, skipping NaNs.
+    """
+    valid = ~np.isnan(strategy_ret)
+    count = valid.sum(axis=1)
+    r = np.where(valid, strategy_ret, 0.0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = r.sum(axis=1) / count
+        dev = np.where(valid, strategy_ret - mean[:, None], 0.0)
+        std = np.sqrt((dev * dev).sum(axis=1) / (count - 1))
+        sharpe = mean / std * np.sqrt(annual_trading_days)
+
+    bad = (count < 2) | (std == 0) | np.isnan(std)
+    return np.where(bad, 0.0, sharpe)
+
+
+def run_ma_sweep(
+    feature_path: Path,
+    windows: list[int],
+    start: str | None = None,
+    end: str | None = None,
+    cache: ResultCache | None = None,
+    equity_sink: Callable[[list[int], np.ndarray], None] | None = None,
+) -> list[dict]:
+    """
+    Backtest many MA windows on one feature file with a single load.
+
+    Equivalent to calling run_ma_backtest(feature_path, ma_window=w) for each
+    window, but the file is read and sorted once and all windows are evaluated
+    in batched NumPy operations (MAs come from one shared cumulative sum).
+    start/end optionally restrict the sweep to the [start, end) Date window.
+
+    With a ResultCache, windows already evaluated on identical file content (same
+    strategy version and date window) are served from disk; only the rest are run.
+    An equity_sink (see sweep_metrics) receives the curves of the windows that
+    are run; cache hits carry no curve, so callers that need one for every window
+    backtest only the missing ones (artifacts.collect_curves does).
+
+    Returns one metrics dict per window, in the order given.
+    """
+    return cached_sweep(
+        feature_path, windows, start, end, cache,
+        lambda todo: _sweep_file(feature_path, todo, start, end, equity_sink),
+    )
+
+
+def cached_sweep(
+    feature_path: Path,
+    windows: list[int],
+    start: str | None,
+    end: str | None,
+    cache: ResultCache | None,
+    compute: Callable[[list[int]], list[dict]],
+) -> list[dict]:
+    """
+    run_ma_sweep's ResultCache handling around any sweep implementation: windows
+    cached for this file content and date window are served from disk, compute()
+    runs the rest (once each) and its rows are stored. Callers that already hold
+    the file's arrays pass a compute that sweeps them instead of re-reading.
+    """
+    windows = [int(w) for w in windows]
+    cached: dict[int, dict] = {}
+    keys: dict[int, str] = {}
+    if cache is not None:
+        with span("cache_lookup", file=Path(feature_path).name, windows=len(windows)):
+            file_hash = cache.file_hash(feature_path)
+            for w in windows:
+                keys[w] = cache.key(file_hash, w, STRATEGY_VERSION, start, end)
+                hit = cache.get(keys[w])
+                if hit is not None:
+                    cached[w] = {**hit, "feature_file": str(feature_path)}
+
+    todo = [w for w in dict.fromkeys(windows) if w not in cached]
+    if todo:
+        written = 0
+        for m in compute(todo):
+            cached[m["ma_window"]] = m
+            if cache is not None:
+                written += cache.put(
+                    keys[m["ma_window"]], m,
+                    feature_file=str(feature_path), ma_window=m["ma_window"], version=STRATEGY_VERSION,
+                )
+        if cache is not None:
+            cache.account(written)
+
+    return [dict(cached[w]) for w in windows]
+
+
+def sweep_rows(feature_path: Path, windows: list[int], res: dict[str, np.ndarray]) -> list[dict]:
+    """
+    run_ma_sweep's per-window result dicts from sweep_metrics output.
+    """
+    return [
+        {
+            "feature_file": str(feature_path),
+            "ma_window": int(w),
+            "total_return": float(res["total_return"][i]),
+            "max_drawdown": float(res["max_drawdown"][i]),
+            "sharpe": float(res["sharpe"][i]),
+        }
+        for i, w in enumerate(windows)
+    ]
+
+
+def _sweep_file(
+    feature_path: Path,
+    windows: list[int],
+    start: str | None,
+    end: str | None,
+    equity_sink: Callable[[list[int], np.ndarray], None] | None = None,
+) -> list[dict]:
+    cols = load_feature_arrays(feature_path, [f"ma_{w}" for w in windows], start, end)
+
+    close = cols["Close"].astype(np.float64, copy=False)
+    ret_1d = cols["ret_1d"].astype(np.float64, copy=False)
+
+    # Reuse precomputed MA columns (e.g. ma_20) exactly like run_ma_backtest does
+    ma_overrides = ma_columns(cols, windows)
+
+    res = sweep_metrics(close, ret_1d, windows, ma_overrides=ma_overrides, equity_sink=equity_sink)
+    return sweep_rows(feature_path, windows, res)
+
+
 if __name__ == "__main__":
     # ------------------------------------------------------------
     # Demo run: pick the first feature file and backtest MA20
     # ------------------------------------------------------------
-    feature_files = list((Path("data") / "features").glob("*_feat.parquet"))
-    if not feature_files:
-        raise FileNotFoundError("No feature files found in data/features")
-
-    df_out, metrics = run_ma_backtest(feature_files[0], ma_window=20)
+    df_out, metrics = run_ma_backtest(FeatureStore().first(), ma_window=20)
 
     print("Metrics:", metrics)
     print(df_out[["Date", "signal", "strategy_ret", "equity"]].head(35))
\ No newline at end of file
@@ -1,20 +1,15 @@
-from pathlib import Path
-import pandas as pd
 import numpy as np
 
-feature_files = list((Path("data") / "features").glob("*_feat.parquet"))
-if not feature_files:
-    raise FileNotFoundError("No feature files found in data/features")
+from src.features.store import FeatureStore
 
-path = feature_files[0]
-df = pd.read_parquet(path)
+store = FeatureStore()
+path = store.first()
+df = store.read(path, ["Date", "Close", "ret_1d", "ma_20"])
 
 print("Using file:", path)
 print("Columns:", list(df.columns))
 #print(df[["Date", "Close", "ret_1d", "ma_20", "vol_20"]].head(25))
 
-df = df.sort_values("Date")
-
 # Strategy signal: long when Close > MA20
 df["signal"] = (df["Close"] > df["ma_20"]).astype(int)
 
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import math
+from pathlib import Path
+
+import numpy as np
+
+
+class StreamingMABacktest:
+    """
+    Bar-by-bar MA trend backtest with O(1) work per bar.
+
+    Same strategy as run_ma_backtest / sweep_metrics:
+      - signal = 1 when Close > MA(window), else 0
+      - strategy_ret = yesterday_signal * today_ret_1d (NaN on the first bar)
+      - equity starts at 1.0 and compounds
+
+    State:
+      - MA: running cumulative sum of Close plus a ring buffer of the last
+        window+1 prefix sums (same arithmetic as rolling_means, so the MA and
+        signal match the batch engine bit for bit)
+      - Sharpe: Welford running mean / variance of strategy returns
+      - drawdown: running equity, peak and worst drawdown
+
+    total_return and max_drawdown equal sweep_metrics exactly; Sharpe agrees to
+    floating-point rounding (the batch engine uses a two-pass variance).
+    """
+
+    def __init__(self, ma_window: int, annual_trading_days: int = 252):
+        if ma_window < 1:
+            raise ValueError(f"ma_window must be >= 1, got {ma_window}")
+        self.ma_window = int(ma_window)
+        self.annual_trading_days = annual_trading_days
+
+        size = self.ma_window + 1
+        self._prefix_sum = [0.0] * size
+        self._prefix_count = [0] * size
+        self._csum = 0.0
+        self._ccount = 0
+        self.bars = 0
+
+        self._prev_close = math.nan
+        self._prev_signal: int | None = None
+
+        # Welford accumulators over valid strategy returns
+        self._n = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+
+        self.equity = 1.0
+        self.peak = 1.0
+        self.max_drawdown = 0.0
+        self.ma = math.nan
+
+    def update(self, close: float, ret_1d: float | None = None) -> float:
+        """
+        Feed one bar. ret_1d defaults to close / previous close - 1 (like pct_change).
+        Returns this bar's strategy return (NaN when undefined).
+        """
+        close = float(close)
+        if ret_1d is None:
+            ret_1d = close / self._prev_close - 1.0 if self.bars > 0 else math.nan
+        ret_1d = float(ret_1d)
+
+        # --- MA(window) from the prefix-sum ring buffer ---
+        w = self.ma_window
+        size = w + 1
+        valid = not math.isnan(close)
+        self._csum += close if valid else 0.0
+        self._ccount += 1 if valid else 0
+        self.bars += 1
+
+        pos = self.bars % size
+        self._prefix_sum[pos] = self._csum
+        self._prefix_count[pos] = self._ccount
+
+        self.ma = math.nan
+        if self.bars >= w:
+            old = (self.bars - w) % size
+            if self._ccount - self._prefix_count[old] == w:
+                self.ma = (self._csum - self._prefix_sum[old]) / w
+
+        signal = 1 if close > self.ma else 0  # NaN compares False
+
+        # --- Strategy return: yesterday's signal * today's return ---
+        strategy_ret = math.nan if self._prev_signal is None else self._prev_signal * ret_1d
+        self._prev_signal = signal
+        self._prev_close = close
+
+        # --- Online metrics ---
+        if not math.isnan(strategy_ret):
+            self._n += 1
+            delta = strategy_ret - self._mean
+            self._mean += delta / self._n
+            self._m2 += delta * (strategy_ret - self._mean)
+            self.equity *= 1.0 + strategy_ret
+
+        self.peak = max(self.peak, self.equity)
+        self.max_drawdown = min(self.max_drawdown, self.equity / self.peak - 1.0)
+        return strategy_ret
+
+    def update_many(self, closes: np.ndarray, rets: np.ndarray | None = None) -> None:
+        """
+        Feed a sequence of bars in order (convenience for warm-starting from history).
+        """
+        if rets is None:
+            for c in closes:
+                self.update(c)
+        else:
+            for c, r in zip(closes, rets):
+                self.update(c, r)
+
+    @property
+    def sharpe(self) -> float:
+        if self._n < 2:
+            return 0.0
+        std = math.sqrt(self._m2 / (self._n - 1))
+        if std == 0 or math.isnan(std):
+            return 0.0
+        return self._mean / std * math.sqrt(self.annual_trading_days)
+
+    @property
+    def signal(self) -> int:
+        """
+        Position to hold into the next bar.
+        """
+        return self._prev_signal or 0
+
+    def metrics(self, feature_file: str | Path | None = None) -> dict:
+        """
+        Current metrics in the same dict layout as run_ma_backtest.
+        """
+        return {
+            "feature_file": str(feature_file) if feature_file is not None else None,
+            "ma_window": self.ma_window,
+            "total_return": self.equity - 1.0,
+            "max_drawdown": self.max_drawdown,
+            "sharpe": self.sharpe,
+        }
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from src.backtest.run_ma_backtest import SWEEP_MAX_CELLS, load_feature_arrays, ma_columns, strategy_returns
+from src.tracing import span
+
+
+class FoldMetrics:
+    """
+    O(1) per-fold metrics for many windows from prefix sums.
+
+    strategy_ret is a (windows, dates) matrix of strategy returns (NaN = no
+    return that day). Prefix sums of returns, squared returns, valid counts and
+    log growth are built once; the Sharpe and total return of any [lo, hi) row
+    slice is then a difference of two prefix rows.
+    """
+
+    def __init__(self, strategy_ret: np.ndarray, annual_trading_days: int = 252):
+        valid = ~np.isnan(strategy_ret)
+        r = np.where(valid, strategy_ret, 0.0)
+        zero = np.zeros((strategy_ret.shape[0], 1))
+
+        self.sum = np.concatenate([zero, np.cumsum(r, axis=1)], axis=1)
+        self.sum_sq = np.concatenate([zero, np.cumsum(r * r, axis=1)], axis=1)
+        self.count = np.concatenate([zero, np.cumsum(valid, axis=1)], axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.log_growth = np.concatenate([zero, np.cumsum(np.log1p(r), axis=1)], axis=1)
+        self.annual_trading_days = annual_trading_days
+
+    def sharpe(self, lo: int, hi: int) -> np.ndarray:
+        """
+        compute_sharpe of each window's returns in rows [lo, hi).
+        """
+        n = self.count[:, hi] - self.count[:, lo]
+        s1 = self.sum[:, hi] - self.sum[:, lo]
+        s2 = self.sum_sq[:, hi] - self.sum_sq[:, lo]
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = s1 / n
+            var = np.maximum(s2 - n * mean * mean, 0.0) / (n - 1)
+            std = np.sqrt(var)
+            sharpe = mean / std * np.sqrt(self.annual_trading_days)
+
+        bad = (n < 2) | (std == 0) | np.isnan(std)
+        return np.where(bad, 0.0, sharpe)
+
+    def total_return(self, lo: int, hi: int) -> np.ndarray:
+        """
+        Compounded return of each window over rows [lo, hi).
+        """
+        return np.expm1(self.log_growth[:, hi] - self.log_growth[:, lo])
+
+
+def make_folds(
+    n_rows: int,
+    train_size: int,
+    test_size: int,
+    step: int | None = None,
+    anchored: bool = False,
+) -> list[tuple[int, int, int, int]]:
+    """
+    Rolling-origin folds as (train_lo, train_hi, test_lo, test_hi) row ranges.
+    Each test block follows its train block; origins advance by `step`
+    (default test_size). anchored=True grows the train block from row 0.
+    """
+    step = step or test_size
+    if train_size + test_size > n_rows:
+        raise ValueError(
+            f"Not enough rows for walk-forward: need train_size + test_size = "
+            f"{train_size + test_size}, have {n_rows}"
+        )
+
+    folds = []
+    origin = train_size
+    while origin + test_size <= n_rows:
+        train_lo = 0 if anchored else origin - train_size
+        folds.append((train_lo, origin, origin, origin + test_size))
+        origin += step
+    return folds
+
+
+def walk_forward(
+    feature_path: Path,
+    windows: list[int],
+    train_size: int = 756,
+    test_size: int = 252,
+    step: int | None = None,
+    anchored: bool = False,
+    start: str | None = None,
+    end: str | None = None,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Walk-forward evaluation of MA windows on one feature file.
+
+    Strategy returns are computed once per block of windows (blocks keep the
+    returns plus their prefix sums under SWEEP_MAX_CELLS); every fold's train and
+    test metrics are then O(1) prefix-sum slices. In each fold the window with
+    the best train Sharpe is chosen and scored on the following test block, so
+    the mean test Sharpe of the fold rows is the out-of-sample estimate of the
+    selection procedure itself.
+
+    Returns:
+      - folds: one row per fold (dates, chosen window, train/test Sharpe, test return)
+      - summary: one row per window with times_chosen, last_chosen (latest fold
+                 that chose it, -1 if none), is_sharpe (mean train Sharpe) and
+                 oos_sharpe (mean test Sharpe; a diagnostic only, since picking
+                 the window with the best test Sharpe would overfit the test blocks)
+    """
+    windows = [int(w) for w in windows]
+    cols = load_feature_arrays(feature_path, [f"ma_{w}" for w in windows], start, end)
+    dates = cols["Date"]
+    folds = make_folds(len(dates), train_size, test_size, step, anchored)
+
+    # (folds, windows) train/test metrics, filled block by block
+    shape = (len(folds), len(windows))
+    train, test, test_ret = np.empty(shape), np.empty(shape), np.empty(shape)
+
+    # Returns plus four prefix matrices per window are live at once
+    block = max(1, SWEEP_MAX_CELLS // (5 * max(1, len(dates))))
+    for lo in range(0, len(windows), block):
+        ws = windows[lo:lo + block]
+        # Same MAs as run_ma_sweep: precomputed ma_N columns where the file has them
+        with span("walk_forward_precompute", windows=len(ws), rows=len(dates)):
+            fm = FoldMetrics(strategy_returns(
+                cols["Close"], cols["ret_1d"], ws, ma_overrides=ma_columns(cols, ws)
+            ))
+        for k, (tr_lo, tr_hi, te_lo, te_hi) in enumerate(folds):
+            train[k, lo:lo + len(ws)] = fm.sharpe(tr_lo, tr_hi)
+            test[k, lo:lo + len(ws)] = fm.sharpe(te_lo, te_hi)
+            test_ret[k, lo:lo + len(ws)] = fm.total_return(te_lo, te_hi)
+        del fm
+
+    fold_rows = []
+    chosen_count = np.zeros(len(windows), dtype=int)
+    last_chosen = np.full(len(windows), -1)
+    for k, (tr_lo, tr_hi, te_lo, te_hi) in enumerate(folds):
+        best = int(np.argmax(train[k]))
+        chosen_count[best] += 1
+        last_chosen[best] = k
+
+        fold_rows.append({
+            "fold": k,
+            "train_start": pd.Timestamp(dates[tr_lo]),
+            "train_end": pd.Timestamp(dates[tr_hi - 1]),
+            "test_start": pd.Timestamp(dates[te_lo]),
+            "test_end": pd.Timestamp(dates[te_hi - 1]),
+            "ma_window": windows[best],
+            "train_sharpe": float(train[k, best]),
+            "test_sharpe": float(test[k, best]),
+            "test_return": float(test_ret[k, best]),
+        })
+
+    summary = pd.DataFrame({
+        "ma_window": windows,
+        "times_chosen": chosen_count,
+        "last_chosen": last_chosen,
+        "is_sharpe": train.mean(axis=0),
+        "oos_sharpe": test.mean(axis=0),
+    })
+    return pd.DataFrame(fold_rows), summary
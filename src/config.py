@@ -1,10 +1,122 @@
+from datetime import date
 import yaml
 from pathlib import Path
 
+
+# Recognised agent config keys: section -> key -> accepted YAML value types
+CONFIG_SCHEMA = {
+    "risk": {"max_drawdown": (int, float)},
+    "search": {
+        "coarse_windows": list,
+        "refine_range": int,
+        "refine_step": int,
+        "strategy": str,
+        "model": str,
+        "space": dict,
+        "eta": int,
+        "min_rows": int,
+        "n_trials": int,
+        "n_startup": int,
+        "gamma": (int, float),
+        "seed": int,
+    },
+    "data": {"start": (str, date), "end": (str, date)},
+    "selection": {
+        "criterion": str,
+        "train_size": int,
+        "test_size": int,
+        "step": (int, type(None)),
+        "anchored": bool,
+    },
+    "bootstrap": {
+        "enabled": bool,
+        "n_resamples": int,
+        "mean_block": (int, float),
+        "ci": float,
+        "seed": int,
+        "jobs": int,
+    },
+    "artifacts": {"equity_curves": bool, "every": int},
+}
+
+# Keys older LLM suggestions used, and where that setting lives now
+KEY_HINTS = {
+    "windows": "list candidate windows under search.coarse_windows",
+    "ma_window": "the window is searched; add it to search.coarse_windows",
+    "feature_file": "the feature file comes from --features",
+    "run_name": "the run name is the config file name",
+}
+
+SEARCH_STRATEGIES = ("grid", "halving", "tpe")
+SELECTION_CRITERIA = ("sharpe", "walk_forward")
+
+
+class ConfigError(ValueError):
+    """
+    One or more configs do not match CONFIG_SCHEMA; `problems` lists every issue.
+    """
+
+    def __init__(self, problems: list[str]):
+        self.problems = list(problems)
+        super().__init__("Invalid config:\n  " + "\n  ".join(self.problems))
+
+
 def load_config(path: str | Path) -> dict:
     """
     Load YAML configuration file.
     Returns a dictionary.
     """
     with open(path, "r") as f:
-        return yaml.safe_load(f)
\ No newline at end of file
+        return yaml.safe_load(f)
+
+
+def config_problems(config, path: str | Path = "<config>") -> list[str]:
+    """
+    Check a loaded config against CONFIG_SCHEMA. Returns a list of
+    "<path>: <problem>" messages (empty when the config is valid).
+    """
+    if config is None:
+        return []
+    if not isinstance(config, dict):
+        return [f"{path}: top level must be a mapping, got {type(config).__name__}"]
+
+    problems = []
+    for key, section in config.items():
+        if key not in CONFIG_SCHEMA:
+            hint = KEY_HINTS.get(key, f"expected one of {sorted(CONFIG_SCHEMA)}")
+            problems.append(f"{path}: unknown key '{key}' ({hint})")
+            continue
+        if not isinstance(section, dict):
+            problems.append(f"{path}: '{key}' must be a mapping, got {type(section).__name__}")
+            continue
+        allowed = CONFIG_SCHEMA[key]
+        for name, value in section.items():
+            if name not in allowed:
+                problems.append(f"{path}: unknown key '{key}.{name}' (expected one of {sorted(allowed)})")
+            elif isinstance(value, bool) and allowed[name] in (int, float, (int, float)):
+                problems.append(f"{path}: '{key}.{name}' must be a number, got {value!r}")
+            elif not isinstance(value, allowed[name]):
+                problems.append(f"{path}: '{key}.{name}' has the wrong type ({value!r})")
+
+    search = config.get("search") or {}
+    windows = search.get("coarse_windows")
+    if isinstance(windows, list) and (
+        not windows or not all(isinstance(w, int) and not isinstance(w, bool) and w > 0 for w in windows)
+    ):
+        problems.append(f"{path}: 'search.coarse_windows' must be a non-empty list of positive integers")
+    if search.get("strategy", "grid") not in SEARCH_STRATEGIES:
+        problems.append(f"{path}: 'search.strategy' must be one of {list(SEARCH_STRATEGIES)}")
+    selection = config.get("selection") or {}
+    if selection.get("criterion", "sharpe") not in SELECTION_CRITERIA:
+        problems.append(f"{path}: 'selection.criterion' must be one of {list(SELECTION_CRITERIA)}")
+    return problems
+
+
+def validate_config(config, path: str | Path = "<config>") -> dict:
+    """
+    Raise ConfigError listing every problem in `config`; returns it unchanged when valid.
+    """
+    problems = config_problems(config, path)
+    if problems:
+        raise ConfigError(problems)
+    return config or {}
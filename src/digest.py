@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+
+# Content digests of data files, shared by the feature catalog, the result cache
+# and the pipeline DAG.
+
+# In-process memo of file digests: resolved path -> ((size, mtime_ns), sha256)
+_DIGESTS: dict[str, tuple[tuple[int, int], str]] = {}
+
+
+def file_digest(path: Path, index_path: Path | None = None) -> str:
+    """
+    sha256 of a file's content.
+
+    Digests are memoized by (size, mtime_ns) in-process and, if index_path is given,
+    in a small JSON index on disk, so unchanged files are not re-hashed across runs.
+    """
+    path = Path(path).resolve()
+    st = path.stat()
+    stamp = (st.st_size, st.st_mtime_ns)
+    key = str(path)
+
+    hit = _DIGESTS.get(key)
+    if hit and hit[0] == stamp:
+        return hit[1]
+
+    index = _read_json(index_path) if index_path else {}
+    saved = index.get(key)
+    if saved and tuple(saved["stamp"]) == stamp:
+        _DIGESTS[key] = (stamp, saved["sha256"])
+        return saved["sha256"]
+
+    digest = sha256_file(path)
+    _DIGESTS[key] = (stamp, digest)
+
+    if index_path:
+        index[key] = {"stamp": list(stamp), "sha256": digest}
+        _write_json_atomic(index_path, index)
+    return digest
+
+
+def sha256_file(path: Path) -> str:
+    """
+    sha256 of a file's content, streamed in 1 MiB blocks (never memoized).
+    """
+    h = hashlib.sha256()
+    with Path(path).open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _read_json(path: Path) -> dict:
+    try:
+        with Path(path).open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _write_json_atomic(path: Path, obj: dict) -> None:
+    # Unique temp name: several workers may write the same entry at once
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(obj, f)
+    tmp.replace(path)
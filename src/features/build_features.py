@@ -1,63 +1,302 @@
 from __future__ import annotations
 
+import argparse
 from pathlib import Path
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
+from src.features import catalog
+from src.features.library import FEATURES_SPEC_PATH, FeatureSpec, compute_features, load_feature_spec
+from src.features.store import FEATURES_DIR, ROW_GROUP_SIZE, iter_date_chunks
+from src.tracing import span
 
-def build_features(raw_path: Path) -> Path:
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Build *_feat.parquet files from raw OHLCV parquet.")
+    p.add_argument("--raw", default=None, help="Raw parquet file (default: first file in data/raw)")
+    p.add_argument("--incremental", action="store_true",
+                   help="Only compute and append rows newer than the last Date in the existing feature file")
+    p.add_argument("--chunked", action="store_true",
+                   help="Stream the raw file row group by row group (bounded memory for long histories)")
+    p.add_argument("--row_group_size", type=int, default=ROW_GROUP_SIZE,
+                   help="Rows per parquet row group in the written feature file")
+    p.add_argument("--spec", default=str(FEATURES_SPEC_PATH),
+                   help="Feature spec YAML (sma/ema/vol/zscore/rsi windows); default columns if missing")
+    p.add_argument("--approx", dest="exact", action="store_false",
+                   help="Window sums from shared cumulative sums: faster for wide sma ranges, "
+                        "equal to a full build only to rounding (~1e-12)")
+    return p.parse_args()
+
+
+def _pick_col(cols: list, prefix: str) -> str:
+    # match exact "Date" if present
+    if prefix in cols:
+        return prefix
+    # match stringified tuple like "('Close', 'AAPL')"
+    candidates = [c for c in cols if isinstance(c, str) and c.startswith(f"('{prefix}'")]
+    if not candidates:
+        raise ValueError(f"Could not find a '{prefix}' column. Columns={cols}")
+    return candidates[0]
+
+
+def build_features(
+    raw_path: Path,
+    incremental: bool = False,
+    chunked: bool = False,
+    row_group_size: int = ROW_GROUP_SIZE,
+    out_dir: Path = FEATURES_DIR,
+    spec: FeatureSpec | None = None,
+    exact: bool = True,
+) -> Path:
     """
-    Read raw OHLCV parquet, compute simple features, save to data/features.
+    Read raw OHLCV parquet, compute features, save to out_dir (data/features).
     Features:
       - ret_1d: daily return based on Close
-      - ma_20: 20-day moving average of Close
-      - vol_20: 20-day rolling std of returns
+      - the spec's columns (default: load_feature_spec(), i.e. configs/features/default.yaml):
+        ma_N / ema_N of Close, vol_N of returns, z_N and rsi_N of Close
+    All columns come from one pass (see compute_features) and one parquet write.
+
+    incremental=True appends only raw rows newer than the last Date already in the
+    feature file, using its tail rows as rolling state. The result is bit-identical
+    to a full rebuild. Falls back to a full build when no feature file exists yet,
+    or when its columns do not match the spec.
+
+    chunked=True streams the raw file one row group at a time in Date order,
+    carrying the rolling tail across chunk boundaries, so peak memory is one row
+    group instead of the whole history. Output is identical to a full build.
+
+    Feature files are written in row groups of row_group_size rows, which is what
+    chunked readers (FeatureStore.iter_batches) iterate over. Every write is
+    recorded in out_dir's catalog.json, and a raw file the ingest catalog marks
+    as sorted is not re-sorted.
+
+    exact=False computes the window sums from shared cumulative sums (see
+    compute_features); values, and incremental or chunked builds, then match a
+    full exact build to rounding rather than bit for bit.
     """
-    df = pd.read_parquet(raw_path)
+    spec = spec or load_feature_spec()
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    out_path = out_dir / raw_path.name.replace(".parquet", "_feat.parquet")
 
-    # --- Normalize column names (handle yfinance multi-index saved as strings) ---
-    cols = list(df.columns)
+    if incremental and out_path.exists():
+        if _spec_matches(out_path, spec):
+            if _append_features(raw_path, out_path, spec, row_group_size, exact) or catalog.lookup(out_path) is None:
+                catalog.record(out_path)
+            return out_path
+        print("Feature spec changed; rebuilding:", out_path)
+
+    if chunked:
+        _build_chunked(raw_path, out_path, row_group_size, spec, exact)
+        catalog.record(out_path)
+        return out_path
 
-    def pick_col(prefix: str) -> str:
-        # match exact "Date" if present
-        if prefix in cols:
-            return prefix
-        # match stringified tuple like "('Close', 'AAPL')"
-        candidates = [c for c in cols if isinstance(c, str) and c.startswith(f"('{prefix}'")]
-        if not candidates:
-            raise ValueError(f"Could not find a '{prefix}' column. Columns={cols}")
-        return candidates[0]
+    with span("parquet_load", file=raw_path.name):
+        df = pd.read_parquet(raw_path)
 
-    date_col = pick_col("Date")
-    close_col = pick_col("Close")
+    # --- Normalize column names (handle yfinance multi-index saved as strings) ---
+    cols = list(df.columns)
+    date_col = _pick_col(cols, "Date")
+    close_col = _pick_col(cols, "Close")
 
     # rename to standard names
     df = df.rename(columns={date_col: "Date", close_col: "Close"})
 
-    df = df.sort_values("Date")
+    if not _raw_sorted(raw_path):
+        with span("sort", rows=len(df)):
+            df = df.sort_values("Date")
 
-    # 1) Daily return
-    df["ret_1d"] = df["Close"].pct_change()
+    with span("rolling", rows=len(df), columns=len(spec.columns())):
+        features = compute_features(df["Close"].to_numpy(dtype=np.float64), spec, exact=exact)
+        df = pd.concat([df.reset_index(drop=True), pd.DataFrame(features)], axis=1)
 
-    # 2) Moving average of price
-    df["ma_20"] = df["Close"].rolling(window=20).mean()
+    with span("artifact_write", file=out_path.name):
+        df.to_parquet(out_path, index=False, row_group_size=row_group_size)
+    catalog.record(out_path)
 
-    # 3) Rolling volatility of returns
-    df["vol_20"] = df["ret_1d"].rolling(window=20).std()
+    return out_path
 
-    out_dir = Path("data") / "features"
-    out_dir.mkdir(parents=True, exist_ok=True)
 
-    out_path = out_dir / raw_path.name.replace(".parquet", "_feat.parquet")
-    df.to_parquet(out_path, index=False)
+def _raw_sorted(raw_path: Path) -> bool:
+    # The ingest catalog says the raw file is already in Date order
+    entry = catalog.lookup(raw_path)
+    return entry is not None and entry["sorted"]
 
-    return out_path
+
+def _spec_matches(out_path: Path, spec: FeatureSpec) -> bool:
+    # An existing file can only be extended if it holds exactly the spec's feature columns
+    names = pq.read_schema(out_path).names
+    if "ret_1d" not in names:
+        return False
+    return names[names.index("ret_1d") + 1:] == spec.columns()
+
+
+def _build_chunked(
+    raw_path: Path, out_path: Path, row_group_size: int, spec: FeatureSpec, exact: bool = True,
+) -> int:
+    """
+    Chunked full build: raw row groups in Date order -> feature row groups, with
+    only the last spec.tail_rows Close / ret_1d values (and the last EMA values)
+    carried between chunks. Returns the number of rows written.
+    """
+    raw_cols = pq.read_schema(raw_path).names
+    date_col = _pick_col(raw_cols, "Date")
+    close_col = _pick_col(raw_cols, "Close")
+
+    tail_close = np.empty(0)
+    tail_ret = np.empty(0)
+    prev_ema = None
+    rows = 0
+    schema = None
+    writer = None
+
+    # Written to a temp file and swapped in, so readers never see a partial file
+    tmp_path = out_path.with_suffix(".parquet.tmp")
+    try:
+        for table in iter_date_chunks(raw_path, None, date_col):
+            with span("rolling", rows=table.num_rows, chunked=True):
+                chunk = table.to_pandas().rename(columns={date_col: "Date", close_col: "Close"})
+                close = chunk["Close"].to_numpy(dtype=np.float64)
+                features = compute_features(close, spec, tail_close, tail_ret, prev_ema, exact)
+                chunk = pd.concat([chunk, pd.DataFrame(features)], axis=1)
+
+                tail_close = np.concatenate([tail_close, close])[-spec.tail_rows:]
+                tail_ret = np.concatenate([tail_ret, features["ret_1d"]])[-spec.tail_rows:]
+                if spec.ema_columns():
+                    prev_ema = np.array([features[c][-1] for c in spec.ema_columns()])
+
+            with span("artifact_write", file=out_path.name, rows=len(chunk), chunked=True):
+                out = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    schema = out.schema
+                    writer = pq.ParquetWriter(tmp_path, schema)
+                writer.write_table(out.cast(schema), row_group_size=row_group_size)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        raise ValueError(f"No rows in raw file: {raw_path}")
+    tmp_path.replace(out_path)
+    return rows
+
+
+def _read_tail(pf: pq.ParquetFile, columns: list[str], n_rows: int) -> pd.DataFrame:
+    """
+    Read the last n_rows of a parquet file, touching only the trailing row groups.
+    """
+    tables = []
+    have = 0
+    for i in reversed(range(pf.num_row_groups)):
+        t = pf.read_row_group(i, columns=columns)
+        tables.append(t)
+        have += t.num_rows
+        if have >= n_rows:
+            break
+    tail = pa.concat_tables(reversed(tables)).to_pandas()
+    return tail.iloc[-n_rows:]
+
+
+def _flush_full_groups(writer: pq.ParquetWriter, pending: list[pa.Table], row_group_size: int) -> int:
+    # Write whole row_group_size groups from the buffered tables and keep the
+    # remainder buffered (pending is updated in place). Returns the rows still buffered.
+    table = pa.concat_tables(pending)
+    full = table.num_rows - table.num_rows % row_group_size
+    writer.write_table(table.slice(0, full), row_group_size=row_group_size)
+    pending[:] = [table.slice(full)] if full < table.num_rows else []
+    return table.num_rows - full
+
+
+def _append_features(
+    raw_path: Path, out_path: Path, spec: FeatureSpec, row_group_size: int = ROW_GROUP_SIZE, exact: bool = True,
+) -> int:
+    """
+    Incremental build: compute features for raw rows past the feature file's last Date
+    and append them. Returns the number of appended rows.
+
+    Only the new rows are computed, but parquet files cannot be appended in place,
+    so the file is still rewritten: every existing row group is decoded and
+    re-encoded into a temp file (I/O grows with the whole history, not with the
+    appended rows). The new rows are merged into the trailing partial row group
+    and row groups smaller than row_group_size are coalesced on the way, so daily
+    appends never leave a trail of tiny groups for chunked readers and pushdown.
+    """
+    with pq.ParquetFile(out_path) as feat_pf:
+        tail = _read_tail(feat_pf, ["Date", "Close", "ret_1d", *spec.ema_columns()], spec.tail_rows)
+    last_date = tail["Date"].iloc[-1]
+
+    # Only read raw rows newer than last_date (parquet predicate pushdown)
+    raw_cols = pq.read_schema(raw_path).names
+    date_col = _pick_col(raw_cols, "Date")
+    close_col = _pick_col(raw_cols, "Close")
+    with span("parquet_load", file=raw_path.name, incremental=True):
+        new = pd.read_parquet(raw_path, filters=[(date_col, ">", last_date)])
+    if new.empty:
+        print("Features up to date:", out_path)
+        return 0
+
+    new = new.rename(columns={date_col: "Date", close_col: "Close"})
+    if not _raw_sorted(raw_path):
+        new = new.sort_values("Date")
+    m = len(new)
+
+    # Tail state + new rows give the rolling windows exactly what a full build sees
+    prev_ema = tail[spec.ema_columns()].iloc[-1].to_numpy(dtype=np.float64) if spec.ema_columns() else None
+    features = compute_features(
+        new["Close"].to_numpy(dtype=np.float64),
+        spec,
+        tail["Close"].to_numpy(dtype=np.float64),
+        tail["ret_1d"].to_numpy(dtype=np.float64),
+        prev_ema,
+        exact,
+    )
+    for name, values in features.items():
+        new[name] = values
+
+    # Stream the old row groups and the new rows into a temp file, then swap it in.
+    # Full-size groups pass straight through; partial ones (the old tail, groups
+    # left by earlier appends) are buffered with the new rows into full groups.
+    tmp_path = out_path.with_suffix(".parquet.tmp")
+    with span("artifact_write", file=out_path.name, appended=m), pq.ParquetFile(out_path) as feat_pf:
+        schema = feat_pf.schema_arrow
+        new_table = pa.Table.from_pandas(new[schema.names], preserve_index=False).cast(schema)
+        with pq.ParquetWriter(tmp_path, schema) as writer:
+            pending: list[pa.Table] = []
+            buffered = 0
+            for i in range(feat_pf.num_row_groups):
+                group = feat_pf.read_row_group(i)
+                if not pending and group.num_rows >= row_group_size:
+                    writer.write_table(group, row_group_size=row_group_size)
+                    continue
+                pending.append(group)
+                buffered += group.num_rows
+                if buffered >= row_group_size:
+                    buffered = _flush_full_groups(writer, pending, row_group_size)
+            pending.append(new_table)
+            writer.write_table(pa.concat_tables(pending), row_group_size=row_group_size)
+    tmp_path.replace(out_path)
+
+    print(f"Appended {m} rows to:", out_path)
+    return m
 
 
 if __name__ == "__main__":
-    # Pick the first parquet file under data/raw and build features for it
-    raw_files = list((Path("data") / "raw").glob("*.parquet"))
-    if not raw_files:
-        raise FileNotFoundError("No raw parquet files found in data/raw. Run download.py first.")
+    args = parse_args()
+
+    if args.raw:
+        raw_path = Path(args.raw)
+    else:
+        # Pick the first parquet file under data/raw and build features for it
+        raw_files = list((Path("data") / "raw").glob("*.parquet"))
+        if not raw_files:
+            raise FileNotFoundError("No raw parquet files found in data/raw. Run download.py first.")
+        raw_path = raw_files[0]
 
-    out = build_features(raw_files[0])
-    print("Saved features:", out)
\ No newline at end of file
+    out = build_features(
+        raw_path, incremental=args.incremental, chunked=args.chunked, row_group_size=args.row_group_size,
+        spec=load_feature_spec(args.spec), exact=args.exact,
+    )
+    print("Saved features:", out)
@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from pathlib import Path
+import threading
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from src.digest import file_digest, sha256_file
+from src.tracing import span
+
+
+# One sidecar per data folder (data/raw, data/features, ...), keyed by file name
+CATALOG_FILE = "catalog.json"
+CATALOG_VERSION = 1
+
+# In-process memo of loaded catalogs: catalog path -> (mtime_ns, files)
+_LOADED: dict[str, tuple[int, dict[str, dict]]] = {}
+
+# Serializes catalog updates between threads (download_many records from a pool)
+_WRITE_LOCK = threading.Lock()
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Show or rebuild the catalog.json of a parquet data folder.")
+    p.add_argument("folder", nargs="?", default="data/features", help="Folder with parquet files")
+    p.add_argument("--rebuild", action="store_true", help="Describe every parquet file in the folder again")
+    p.add_argument("--verify", action="store_true",
+                   help="Re-hash every catalogued file and report content that no longer matches")
+    return p.parse_args()
+
+
+def catalog_path(folder: str | Path) -> Path:
+    return Path(folder) / CATALOG_FILE
+
+
+def _date_column(names: list[str]) -> str | None:
+    # "Date", or a yfinance (field, ticker) column stringified as "('Date', ...)"
+    if "Date" in names:
+        return "Date"
+    return next((n for n in names if n.startswith("('Date'")), None)
+
+
+def _stamp(path: Path) -> tuple[int, int]:
+    st = path.stat()
+    return st.st_size, st.st_mtime_ns
+
+
+# ------------------------------------------------------------
+# Describe / record
+# ------------------------------------------------------------
+def describe(path: str | Path, content_hash: bool = True) -> dict:
+    """
+    Catalog entry for one parquet file: ticker, rows, min/max Date, whether Dates
+    are sorted and unique, the schema, and the file's sha256 (plus size / mtime,
+    which tell whether the entry still describes the file). Only the footer and
+    the Date column are read.
+    """
+    from src.features.store import ticker_from_path
+
+    path = Path(path)
+    size, mtime_ns = _stamp(path)
+    with pq.ParquetFile(path) as pf:
+        schema = pf.schema_arrow
+        rows = pf.metadata.num_rows
+        date_col = _date_column(schema.names)
+        dates = None
+        if date_col is not None:
+            with span("parquet_load", file=path.name, columns=1):
+                dates = pf.read(columns=[date_col]).column(0).to_numpy()
+
+    entry = {
+        "ticker": ticker_from_path(path.stem),  # raw stores are plain <ticker>.parquet
+        "rows": rows,
+        "min_date": None,
+        "max_date": None,
+        "sorted": False,
+        "deduplicated": False,
+        "schema": [[f.name, str(f.type)] for f in schema],
+        "sha256": file_digest(path) if content_hash else None,
+        "size": size,
+        "mtime_ns": mtime_ns,
+    }
+    if dates is not None and len(dates):
+        ordered = bool((dates[1:] >= dates[:-1]).all())
+        unique = bool((dates[1:] > dates[:-1]).all()) if ordered else len(np.unique(dates)) == len(dates)
+        entry.update({
+            "min_date": pd.Timestamp(dates.min()).isoformat(),
+            "max_date": pd.Timestamp(dates.max()).isoformat(),
+            "sorted": ordered,
+            "deduplicated": unique,
+        })
+    return entry
+
+
+def load_catalog(folder: str | Path) -> dict[str, dict]:
+    """
+    File name -> entry for a folder's catalog ({} if it has none). Memoized by the
+    catalog's mtime, so repeated lookups in one process read it once.
+    """
+    path = catalog_path(folder)
+    try:
+        mtime_ns = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    key = str(path.resolve())
+    hit = _LOADED.get(key)
+    if hit and hit[0] == mtime_ns:
+        return hit[1]
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    files = data.get("files", {}) if data.get("version") == CATALOG_VERSION else {}
+    _LOADED[key] = (mtime_ns, files)
+    return files
+
+
+def _write_catalog(folder: Path, files: dict[str, dict]) -> None:
+    # Unique temp name + rename: concurrent builders never leave a partial catalog.
+    # A lost update between processes only drops an entry, and readers fall back
+    # to the file itself.
+    path = catalog_path(folder)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump({"version": CATALOG_VERSION, "files": dict(sorted(files.items()))}, f, indent=2)
+    tmp.replace(path)
+
+
+def record(path: str | Path) -> dict:
+    """
+    Describe a freshly written file and upsert its entry in the folder's catalog.
+    Writers (build_features, ingest) call this after swapping the file in.
+    """
+    path = Path(path)
+    entry = describe(path)
+    with _WRITE_LOCK:
+        files = dict(load_catalog(path.parent))
+        files[path.name] = entry
+        _write_catalog(path.parent, files)
+    return entry
+
+
+def rebuild(folder: str | Path, pattern: str = "*.parquet") -> dict[str, dict]:
+    """
+    Catalog every file matching pattern in folder from scratch (drops entries of
+    files that no longer exist).
+    """
+    folder = Path(folder)
+    files = {p.name: describe(p) for p in sorted(folder.glob(pattern))}
+    _write_catalog(folder, files)
+    return files
+
+
+# ------------------------------------------------------------
+# Lookups
+# ------------------------------------------------------------
+def lookup(path: str | Path) -> dict | None:
+    """
+    The catalog entry of a file if it still matches the file on disk (same size
+    and mtime), else None. Costs one stat plus a memoized catalog read.
+    """
+    path = Path(path)
+    entry = load_catalog(path.parent).get(path.name)
+    if entry is None:
+        return None
+    try:
+        if (entry["size"], entry["mtime_ns"]) != _stamp(path):
+            return None
+    except FileNotFoundError:
+        return None
+    return entry
+
+
+def overlaps(entry: dict, start: str | None = None, end: str | None = None) -> bool:
+    """
+    Whether an entry has any rows in [start, end).
+    """
+    if entry["min_date"] is None:
+        return False
+    if start is not None and pd.Timestamp(entry["max_date"]) < pd.Timestamp(start):
+        return False
+    if end is not None and pd.Timestamp(entry["min_date"]) >= pd.Timestamp(end):
+        return False
+    return True
+
+
+def check(
+    path: str | Path,
+    columns: list[str] | None = None,
+    start: str | None = None,
+    end: str | None = None,
+) -> list[str]:
+    """
+    Problems that make a file unusable as backtest input, from its catalog entry
+    (the footer and Date column when it is not catalogued): missing file or
+    columns, no rows in [start, end), duplicate Dates. Empty list = OK.
+    """
+    path = Path(path)
+    if not path.exists():
+        return [f"{path}: file not found"]
+    entry = lookup(path) or describe(path, content_hash=False)
+
+    problems = []
+    names = {name for name, _ in entry["schema"]}
+    missing = [c for c in (columns or []) if c not in names]
+    if missing:
+        problems.append(f"{path.name}: missing columns {missing}")
+    if not overlaps(entry, start, end):
+        window = f" in [{start or '...'}, {end or '...'})" if start or end else ""
+        problems.append(f"{path.name}: no rows{window}")
+    elif not entry["deduplicated"]:
+        problems.append(f"{path.name}: duplicate Dates")
+    return problems
+
+
+def main() -> None:
+    args = parse_args()
+    folder = Path(args.folder)
+    files = rebuild(folder) if args.rebuild else load_catalog(folder)
+    if not files:
+        print(f"No catalog in {folder} (run with --rebuild)")
+        return
+
+    rows = []
+    for name, entry in files.items():
+        path = folder / name
+        status = "ok" if lookup(path) is not None else ("missing" if not path.exists() else "stale")
+        if args.verify and status == "ok" and sha256_file(path) != entry["sha256"]:
+            status = "corrupt"
+        rows.append({
+            "file": name,
+            "ticker": entry["ticker"],
+            "rows": entry["rows"],
+            "min_date": (entry["min_date"] or "")[:10],
+            "max_date": (entry["max_date"] or "")[:10],
+            "sorted": entry["sorted"],
+            "dedup": entry["deduplicated"],
+            "columns": len(entry["schema"]),
+            "status": status,
+        })
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import yaml
+
+
+# Kept out of configs/*.yaml, which run_batch treats as agent configs
+FEATURES_SPEC_PATH = Path("configs") / "features" / "default.yaml"
+
+# Feature kind -> column name template. Columns are written in this order after ret_1d.
+KINDS = {
+    "sma": "ma_{}",      # mean of Close
+    "ema": "ema_{}",     # exponential mean of Close, alpha = 2 / (N + 1)
+    "vol": "vol_{}",     # sample std (ddof=1) of ret_1d
+    "zscore": "z_{}",    # (Close - ma_N) / std of Close over N rows
+    "rsi": "rsi_{}",     # 100 * gains / (gains + losses) over N Close changes
+}
+
+# What build_features wrote before feature specs existed
+DEFAULT_SPEC = {"sma": [20], "vol": [20]}
+
+
+def _windows(kind: str, value) -> list[int]:
+    # A list of windows or a {low, high, step} range (inclusive), like search spaces
+    if isinstance(value, dict):
+        unknown = set(value) - {"low", "high", "step"}
+        if unknown or "low" not in value or "high" not in value:
+            raise ValueError(f"Feature spec '{kind}': ranges need low/high (and optional step), got {value}")
+        value = range(int(value["low"]), int(value["high"]) + 1, int(value.get("step", 1)))
+    windows = sorted({int(w) for w in value})
+    if any(w < 1 for w in windows) or (kind in ("vol", "zscore") and any(w < 2 for w in windows)):
+        raise ValueError(f"Feature spec '{kind}': invalid windows {windows}")
+    return windows
+
+
+class FeatureSpec:
+    """
+    Which rolling features build_features writes, per kind a sorted list of windows.
+
+    Every feature except EMA depends only on its trailing window of rows, and EMA
+    only on its previous value, so a block of new rows can be computed from
+    `tail_rows` rows of history (plus the last EMA values) bit-identically to a
+    full build; incremental and chunked builds rely on this.
+    """
+
+    def __init__(self, **windows: list[int]):
+        unknown = set(windows) - set(KINDS)
+        if unknown:
+            raise ValueError(f"Unknown feature kinds: {sorted(unknown)} (expected some of {list(KINDS)})")
+        self.windows = {kind: _windows(kind, windows.get(kind) or []) for kind in KINDS}
+
+    @classmethod
+    def from_dict(cls, spec: dict | None) -> "FeatureSpec":
+        return cls(**(spec if spec is not None else DEFAULT_SPEC))
+
+    def to_dict(self) -> dict[str, list[int]]:
+        return {kind: ws for kind, ws in self.windows.items() if ws}
+
+    def columns(self) -> list[str]:
+        """
+        Feature columns in write order (after ret_1d).
+        """
+        return [KINDS[kind].format(w) for kind, ws in self.windows.items() for w in ws]
+
+    def ema_columns(self) -> list[str]:
+        return [KINDS["ema"].format(w) for w in self.windows["ema"]]
+
+    @property
+    def tail_rows(self) -> int:
+        """
+        Rows of Close / ret_1d history a block of new rows needs (RSI needs one extra Close).
+        """
+        w = self.windows
+        return max([1, *w["sma"], *w["vol"], *w["zscore"], *(r + 1 for r in w["rsi"])])
+
+
+def load_feature_spec(path: str | Path = FEATURES_SPEC_PATH) -> FeatureSpec:
+    """
+    Spec from a YAML file (kind -> windows); DEFAULT_SPEC when the file does not exist.
+    """
+    path = Path(path)
+    if not path.exists():
+        return FeatureSpec.from_dict(None)
+    with path.open("r", encoding="utf-8") as f:
+        return FeatureSpec.from_dict(yaml.safe_load(f) or {})
+
+
+# ------------------------------------------------------------
+# Window-local kernels
+# ------------------------------------------------------------
+def window_sums(x: np.ndarray, windows: list[int], exact: bool = True) -> dict[int, np.ndarray]:
+    """
+    Trailing sums of x for many windows in one pass over the lags.
+
+    One accumulator adds lag 1, 2, ... of x and is snapshotted as each window is
+    reached, so every window shares the additions of the smaller ones. Each
+    value is summed newest-to-oldest over its own window only (no global prefix
+    sum), so it is bit-identical whether computed over the full history or over
+    just its last rows. NaN before the window fills and if it contains a NaN.
+
+    That costs O(len(x) * max window). exact=False instead differences one shared
+    cumulative sum (O(len(x)) per window), which matches to rounding (~1e-12
+    relative) but depends on where x starts, so incremental and chunked builds
+    then match a full build only to rounding as well.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    n = len(x)
+    if not exact:
+        return _cumsum_window_sums(x, windows)
+    acc = x.copy()
+    lag = 0
+    out = {}
+    for w in sorted(set(int(w) for w in windows)):
+        while lag < w - 1 and lag < n - 1:
+            lag += 1
+            acc[lag:] += x[:-lag]
+        s = np.full(n, np.nan)
+        if n >= w:
+            s[w - 1:] = acc[w - 1:]
+        out[w] = s
+    return out
+
+
+def _cumsum_window_sums(x: np.ndarray, windows: list[int]) -> dict[int, np.ndarray]:
+    # Sums of x - ref (ref: first finite value) keep the running total small
+    n = len(x)
+    missing = np.isnan(x)
+    finite = x[~missing]
+    ref = finite[0] if len(finite) else 0.0
+    total = np.zeros(n + 1)
+    np.cumsum(np.where(missing, 0.0, x - ref), out=total[1:])
+    gaps = np.concatenate([[0], np.cumsum(missing)]) if missing.any() else None
+    out = {}
+    for w in sorted(set(int(w) for w in windows)):
+        s = np.empty(n)
+        s[:w - 1] = np.nan
+        if n >= w:
+            body = s[w - 1:]
+            np.subtract(total[w:], total[:n - w + 1], out=body)
+            body += w * ref
+            if gaps is not None:
+                body[gaps[w:] > gaps[:n - w + 1]] = np.nan
+        out[w] = s
+    return out
+
+
+def rolling_window_mean(x: np.ndarray, window: int) -> np.ndarray:
+    """
+    Rolling mean where each value depends only on the `window` values it covers.
+
+    Values are summed newest-to-oldest in a fixed order, so a row's result is
+    bit-identical whether it is computed over the full history or over just the
+    last `window` rows (which is what incremental builds rely on).
+    NaN until `window` observations exist, and NaN if the window contains a NaN.
+    """
+    return window_sums(x, [window])[window] / window
+
+
+def rolling_window_std(x: np.ndarray, window: int, mean: np.ndarray | None = None) -> np.ndarray:
+    """
+    Rolling sample std (ddof=1) with the same window-local, fixed-order arithmetic
+    as rolling_window_mean (two-pass: deviations from the window mean). `mean` is
+    that rolling mean when the caller already has it.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    n = len(x)
+    out = np.full(n, np.nan)
+    if n < window:
+        return out
+
+    if mean is None:
+        mean = rolling_window_mean(x, window)
+    mean = mean[window - 1:]
+    dev = x[window - 1:] - mean
+    acc = dev * dev
+    for lag in range(1, window):
+        dev = x[window - 1 - lag:n - lag] - mean
+        acc += dev * dev
+    out[window - 1:] = np.sqrt(acc / (window - 1))
+    return out
+
+
+def ema(x: np.ndarray, windows: list[int], prev: np.ndarray | None = None) -> np.ndarray:
+    """
+    Exponential means of x for many windows, shaped (len(windows), len(x)).
+
+    ema[t] = (1 - alpha) * ema[t-1] + alpha * x[t] with alpha = 2 / (N + 1), seeded
+    with the first observation (or with `prev`, the values of the row before x).
+    NaN inputs carry the previous value forward. The recursion runs in pandas'
+    compiled ewm (adjust=False, ignore_na=True), one pass per window, with `prev`
+    prepended as the carried state, so a block continued from `prev` matches a
+    full build.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    prev = np.full(len(windows), np.nan) if prev is None else np.asarray(prev, dtype=np.float64)
+    out = np.empty((len(windows), len(x)))
+    for i, w in enumerate(windows):
+        seeded = pd.Series(np.concatenate([[prev[i]], x]))
+        out[i] = seeded.ewm(alpha=2.0 / (w + 1.0), adjust=False, ignore_na=True).mean().to_numpy()[1:]
+    return out
+
+
+def compute_features(
+    close: np.ndarray,
+    spec: FeatureSpec,
+    tail_close: np.ndarray | None = None,
+    tail_ret: np.ndarray | None = None,
+    prev_ema: np.ndarray | None = None,
+    exact: bool = True,
+) -> dict[str, np.ndarray]:
+    """
+    ret_1d and every spec column for a block of new Close rows.
+
+    tail_close / tail_ret are the Close and ret_1d of the (up to spec.tail_rows)
+    rows before the block and prev_ema the EMA columns of the row just before;
+    leave them out for a full build. Returns values for the new rows only,
+    bit-identical to computing them over the whole history.
+
+    exact=False takes the window sums (sma, zscore and vol means, rsi) from shared
+    cumulative sums (see window_sums): much faster for wide sma ranges, equal to
+    rounding only. Rolling std stays two-pass either way, since the one-pass
+    variance from prefix sums cancels badly on price levels.
+    """
+    m = len(close)
+    tail_close = np.empty(0) if tail_close is None else np.asarray(tail_close, dtype=np.float64)
+    tail_ret = np.empty(0) if tail_ret is None else np.asarray(tail_ret, dtype=np.float64)
+    closes = np.concatenate([tail_close, np.asarray(close, dtype=np.float64)])
+    ret_1d = pd.Series(closes).pct_change().to_numpy()[-m:] if m else np.empty(0)
+    rets = np.concatenate([tail_ret, ret_1d])
+    w = spec.windows
+
+    out = {"ret_1d": ret_1d}
+    close_sums = window_sums(closes, [*w["sma"], *w["zscore"]], exact)
+    close_means = {k: s / k for k, s in close_sums.items()}
+    for k in w["sma"]:
+        out[KINDS["sma"].format(k)] = close_means[k][-m:]
+
+    if w["ema"]:
+        for k, values in zip(w["ema"], ema(closes[len(tail_close):], w["ema"], prev_ema)):
+            out[KINDS["ema"].format(k)] = values
+
+    ret_sums = window_sums(rets, w["vol"], exact)
+    for k in w["vol"]:
+        out[KINDS["vol"].format(k)] = rolling_window_std(rets, k, ret_sums[k] / k)[-m:]
+
+    for k in w["zscore"]:
+        std = rolling_window_std(closes, k, close_means[k])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            z = (closes - close_means[k]) / std
+        out[KINDS["zscore"].format(k)] = np.where(std == 0, 0.0, z)[-m:]
+
+    if w["rsi"]:
+        change = np.concatenate([[np.nan], np.diff(closes)])
+        gains = window_sums(np.where(change > 0, change, np.where(np.isnan(change), np.nan, 0.0)), w["rsi"], exact)
+        losses = window_sums(np.where(change < 0, -change, np.where(np.isnan(change), np.nan, 0.0)), w["rsi"], exact)
+        for k in w["rsi"]:
+            total = gains[k] + losses[k]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                rsi = np.where(total == 0, 50.0, 100.0 * gains[k] / total)
+            out[KINDS["rsi"].format(k)] = rsi[-m:]
+
+    # Write order: ret_1d, then the spec's kinds in KINDS order
+    return {name: out[name] for name in ["ret_1d", *spec.columns()]}
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable
+import numpy as np
+
+
+# Default budget for resident feature arrays (the research worker's --max_mb)
+DEFAULT_MAX_BYTES = 1 << 30
+
+
+class FeatureMemory:
+    """
+    In-process LRU cache of feature columns as read-only NumPy arrays.
+
+    Entries are keyed by (resolved path, mtime_ns, size, start, end) and hold every
+    column loaded for that slice so far; a request only reads the columns it is
+    missing. A rewritten file gets a new key, so stale arrays are never served and
+    simply age out. Least recently used entries are evicted once the cached
+    arrays exceed max_bytes.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = int(max_bytes)
+        self._entries: OrderedDict[tuple, dict[str, np.ndarray]] = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+        self,
+        path: str | Path,
+        columns: list[str],
+        start: str | None,
+        end: str | None,
+        load: Callable[[list[str]], dict[str, np.ndarray]],
+    ) -> dict[str, np.ndarray]:
+        """
+        Arrays for `columns` of the [start, end) slice of path; load(missing columns)
+        reads whatever is not cached yet.
+        """
+        path = Path(path).resolve()
+        st = path.stat()
+        key = (str(path), st.st_mtime_ns, st.st_size, start, end)
+
+        entry = self._entries.pop(key, {})
+        missing = [c for c in columns if c not in entry]
+        if missing:
+            self.misses += 1
+            for name, arr in load(missing).items():
+                if name in entry:
+                    continue
+                arr.flags.writeable = False
+                entry[name] = arr
+                self.bytes += arr.nbytes
+        else:
+            self.hits += 1
+        self._entries[key] = entry
+
+        while self.bytes > self.max_bytes and len(self._entries) > 1:
+            _, old = self._entries.popitem(last=False)
+            self.bytes -= sum(a.nbytes for a in old.values())
+        return {c: entry[c] for c in columns if c in entry}
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
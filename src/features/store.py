@@ -0,0 +1,357 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Iterator
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from src.features import catalog
+from src.features.memory import FeatureMemory
+from src.tracing import span
+
+
+FEATURES_DIR = Path("data") / "features"
+
+# Process-wide feature memory used by read_arrays (see use_memory)
+_memory: FeatureMemory | None = None
+
+
+def use_memory(memory: FeatureMemory | None) -> None:
+    """
+    Serve FeatureStore.read_arrays from `memory` in this process (None turns it off).
+    Long-lived processes such as the research worker keep hot feature files resident.
+    """
+    global _memory
+    _memory = memory
+
+# Rows per parquet row group for feature files; the unit of work for chunked reads
+ROW_GROUP_SIZE = 262_144
+
+
+def ticker_from_path(feature_path: Path) -> str:
+    """
+    Ticker symbol from a feature file name, e.g. AAPL_2020-01-01_2025-01-01_feat.parquet -> AAPL.
+    """
+    return Path(feature_path).name.split("_")[0]
+
+
+def panel_labels(paths: list[Path]) -> list[str]:
+    """
+    One label per feature file: the ticker, or the full file stem when the same
+    ticker appears over several date ranges.
+    """
+    labels = [ticker_from_path(p) for p in paths]
+    if len(set(labels)) != len(labels):
+        labels = [Path(p).name.replace("_feat.parquet", "") for p in paths]
+    return labels
+
+
+def iter_date_chunks(
+    path: str | Path,
+    columns: list[str] | None = None,
+    date_col: str = "Date",
+    start: str | None = None,
+    end: str | None = None,
+) -> Iterator[pa.Table]:
+    """
+    Yield a parquet file one row group at a time, in Date order, with bounded memory.
+
+    Row groups are ordered by their Date statistics and skipped when they fall
+    outside [start, end). Each chunk is sorted if needed; row groups whose Date
+    ranges overlap cannot be streamed in order and raise ValueError (rebuild the
+    file sorted, as build_features does).
+    """
+    path = Path(path)
+    if columns is not None and date_col not in columns:
+        columns = [date_col, *columns]
+    lo = pd.Timestamp(start) if start is not None else None
+    hi = pd.Timestamp(end) if end is not None else None
+
+    with pq.ParquetFile(path) as pf:
+        date_idx = pf.schema_arrow.get_field_index(date_col)
+        groups = []
+        for i in range(pf.num_row_groups):
+            stats = pf.metadata.row_group(i).column(date_idx).statistics
+            if stats is None or not stats.has_min_max:
+                raise ValueError(f"{path.name}: row group {i} has no {date_col} statistics; cannot stream in Date order")
+            gmin, gmax = pd.Timestamp(stats.min), pd.Timestamp(stats.max)
+            if (lo is not None and gmax < lo) or (hi is not None and gmin >= hi):
+                continue
+            groups.append((gmin, gmax, i))
+        groups.sort()
+
+        prev_max = None
+        for gmin, gmax, i in groups:
+            if prev_max is not None and gmin < prev_max:
+                raise ValueError(f"{path.name}: row groups overlap in {date_col}; cannot stream in Date order")
+            prev_max = gmax
+
+            table = pf.read_row_group(i, columns=columns)
+            dates = pc.cast(table.column(date_col), pa.timestamp("ns"))
+            if lo is not None or hi is not None:
+                mask = None
+                if lo is not None:
+                    mask = pc.greater_equal(dates, pa.scalar(lo.as_unit("ns")))
+                if hi is not None:
+                    below = pc.less(dates, pa.scalar(hi.as_unit("ns")))
+                    mask = below if mask is None else pc.and_(mask, below)
+                table = table.filter(mask)
+                dates = pc.cast(table.column(date_col), pa.timestamp("ns"))
+            if table.num_rows == 0:
+                continue
+            d = dates.to_numpy()
+            if len(d) > 1 and not (d[1:] >= d[:-1]).all():
+                table = table.sort_by(date_col)
+            yield table
+
+
+class FeatureStore:
+    """
+    Columnar feature store: one parquet partition per ticker under `root`
+    (the *_feat.parquet files written by build_features).
+
+    Reads project only the requested columns and push the [start, end) Date
+    window down to parquet row-group filtering, so consumers never load more
+    than they use. Date order is checked and only re-sorted when needed; files
+    whose catalog entry (catalog.json, written by build_features) still matches
+    them skip the check, and their schema, Date range and flags are answered
+    without opening the file.
+    """
+
+    def __init__(self, root: str | Path = FEATURES_DIR):
+        self.root = Path(root)
+
+    # ------------------------------------------------------------
+    # Discovery
+    # ------------------------------------------------------------
+    def paths(self) -> list[Path]:
+        return sorted(self.root.glob("*_feat.parquet"))
+
+    def tickers(self) -> list[str]:
+        return [ticker_from_path(p) for p in self.paths()]
+
+    def first(self) -> Path:
+        """
+        First feature file (sorted by name); raises if the store is empty.
+        """
+        paths = self.paths()
+        if not paths:
+            raise FileNotFoundError(f"No feature files found in {self.root}")
+        return paths[0]
+
+    def path_for(self, ticker: str | Path) -> Path:
+        """
+        Resolve a ticker symbol (or an explicit file path) to its feature file.
+        """
+        candidate = Path(ticker)
+        if candidate.suffix == ".parquet":
+            return candidate
+        matches = [p for p in self.paths() if ticker_from_path(p) == str(ticker)]
+        if not matches:
+            raise FileNotFoundError(f"No feature file for ticker={ticker} in {self.root}")
+        return matches[0]
+
+    def entry(self, ticker: str | Path) -> dict | None:
+        """
+        Up-to-date catalog entry of a partition, or None (see catalog.lookup).
+        """
+        return catalog.lookup(self.path_for(ticker))
+
+    def select(
+        self,
+        tickers: list[str] | None = None,
+        start: str | None = None,
+        end: str | None = None,
+    ) -> list[Path]:
+        """
+        Partitions of the given tickers (default: all) with rows in [start, end),
+        decided from the catalog without opening the files. Files without an
+        up-to-date entry are kept (they may have rows in range).
+        """
+        wanted = None if tickers is None else {str(t) for t in tickers}
+        out = []
+        for path in self.paths():
+            entry = catalog.lookup(path)
+            ticker = entry["ticker"] if entry else ticker_from_path(path)
+            if wanted is not None and ticker not in wanted:
+                continue
+            if entry is not None and not catalog.overlaps(entry, start, end):
+                continue
+            out.append(path)
+        return out
+
+    def check(
+        self,
+        ticker: str | Path,
+        columns: list[str] | None = None,
+        start: str | None = None,
+        end: str | None = None,
+    ) -> list[str]:
+        """
+        Input problems of a partition (see catalog.check); empty when usable.
+        """
+        try:
+            path = self.path_for(ticker)
+        except FileNotFoundError as e:
+            return [str(e)]
+        return catalog.check(path, columns, start, end)
+
+    def columns(self, ticker: str | Path) -> list[str]:
+        """
+        Column names of a partition, from the catalog or else the parquet footer only.
+        """
+        path = self.path_for(ticker)
+        entry = catalog.lookup(path)
+        if entry is not None:
+            return [name for name, _ in entry["schema"]]
+        return pq.read_schema(path).names
+
+    # ------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------
+    def read_table(
+        self,
+        ticker: str | Path,
+        columns: list[str] | None = None,
+        start: str | None = None,
+        end: str | None = None,
+    ) -> pa.Table:
+        """
+        Arrow table for one ticker with column projection and Date-range pushdown.
+        Rows are in Date order. Date is always included.
+        """
+        if columns is not None and "Date" not in columns:
+            columns = ["Date", *columns]
+
+        filters = []
+        if start is not None:
+            filters.append(("Date", ">=", pd.Timestamp(start)))
+        if end is not None:
+            filters.append(("Date", "<", pd.Timestamp(end)))
+
+        path = self.path_for(ticker)
+        with span("parquet_load", file=path.name, columns=len(columns) if columns else "all"):
+            table = pq.read_table(path, columns=columns, filters=filters or None)
+
+        entry = catalog.lookup(path)
+        if entry is not None and entry["sorted"]:
+            return table  # written in Date order (filters keep row order)
+
+        dates = table.column("Date").to_numpy()
+        if len(dates) > 1 and not (dates[1:] >= dates[:-1]).all():
+            with span("sort", file=path.name, rows=table.num_rows):
+                table = table.sort_by("Date")
+        return table
+
+    def read(
+        self,
+        ticker: str | Path,
+        columns: list[str] | None = None,
+        start: str | None = None,
+        end: str | None = None,
+    ) -> pd.DataFrame:
+        """
+        Same as read_table, as a pandas DataFrame.
+        """
+        return self.read_table(ticker, columns, start, end).to_pandas()
+
+    def read_arrays(
+        self,
+        ticker: str | Path,
+        columns: list[str],
+        start: str | None = None,
+        end: str | None = None,
+    ) -> dict[str, np.ndarray]:
+        """
+        Column name -> NumPy array. Null-free numeric columns are returned as
+        zero-copy views of the Arrow buffers (read-only); others are copied.
+        With a process feature memory (use_memory), repeated reads come from RAM.
+        """
+        if _memory is not None:
+            cols = ["Date", *(c for c in columns if c != "Date")]
+            return _memory.get(
+                self.path_for(ticker), cols, start, end,
+                lambda missing: self._read_arrays(ticker, missing, start, end),
+            )
+        return self._read_arrays(ticker, columns, start, end)
+
+    def _read_arrays(
+        self,
+        ticker: str | Path,
+        columns: list[str],
+        start: str | None,
+        end: str | None,
+    ) -> dict[str, np.ndarray]:
+        table = self.read_table(ticker, columns, start, end).combine_chunks()
+
+        arrays = {}
+        for name in table.column_names:
+            col = table.column(name)
+            if col.num_chunks == 1:
+                try:
+                    arrays[name] = col.chunk(0).to_numpy(zero_copy_only=True)
+                    continue
+                except pa.ArrowInvalid:
+                    pass
+            arrays[name] = col.to_numpy()
+        return arrays
+
+    def iter_batches(
+        self,
+        ticker: str | Path,
+        columns: list[str] | None = None,
+        start: str | None = None,
+        end: str | None = None,
+    ) -> Iterator[pa.Table]:
+        """
+        Chunked read_table: one Arrow table per row group, in Date order
+        (see iter_date_chunks). Peak memory is one row group, not the file.
+        """
+        yield from iter_date_chunks(self.path_for(ticker), columns, "Date", start, end)
+
+    def read_panel(
+        self,
+        tickers: list[str | Path] | None = None,
+        columns: tuple[str, ...] = ("Close", "ret_1d"),
+        start: str | None = None,
+        end: str | None = None,
+    ) -> tuple[pd.DatetimeIndex, list[str], dict[str, np.ndarray]]:
+        """
+        Load many tickers and align them on a shared Date index.
+
+        Returns:
+          - dates: union of all Dates (sorted)
+          - labels: one label per ticker, in the order given (default: all partitions)
+          - arrays: column name -> float64 array shaped (dates, tickers);
+                    NaN where a ticker has no row for that Date
+        """
+        paths = [self.path_for(t) for t in tickers] if tickers is not None else self.paths()
+        if not paths:
+            raise FileNotFoundError(f"No feature files found in {self.root}")
+
+        labels = panel_labels(paths)
+
+        # Plain arrays per partition (rows come back in Date order); duplicate Dates
+        # keep their last row unless the catalog says the file has none
+        parts = []
+        for path in paths:
+            cols = self.read_arrays(path, list(columns), start, end)
+            d = cols["Date"]
+            entry = catalog.lookup(path)
+            if (entry is None or not entry["deduplicated"]) and len(d) > 1:
+                keep = np.append(d[1:] != d[:-1], True)
+                cols = {k: v[keep] for k, v in cols.items()}
+            parts.append(cols)
+
+        dates = pd.DatetimeIndex(np.unique(np.concatenate([c["Date"] for c in parts])))
+
+        arrays = {c: np.full((len(dates), len(parts)), np.nan) for c in columns}
+        for j, cols in enumerate(parts):
+            pos = dates.get_indexer(pd.DatetimeIndex(cols["Date"]))
+            for c in columns:
+                arrays[c][pos, j] = cols[c]
+
+        return dates, labels, arrays
@@ -1,15 +1,84 @@
 from __future__ import annotations
 
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import json
 from pathlib import Path
-import yfinance as yf
+from typing import Protocol
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.features import catalog
+
+RAW_DIR = Path("data") / "raw"
+
+# Parquet key-value metadata entry holding the [start, end) range a store has fetched
+COVERAGE_KEY = b"axiom.coverage"
+
+
+class OHLCVSource(Protocol):
+    """
+    Anything that can return daily OHLCV rows for [start, end) with a Date column.
+    """
+
+    def fetch(self, ticker: str, start: str, end: str) -> pd.DataFrame:
+        ...
+
+
+class YFinanceSource:
+    """
+    Adjusted OHLCV from Yahoo Finance (yfinance is imported lazily).
+
+    Uses one yf.Ticker per call rather than yf.download: download keeps its
+    results in module-global state, so concurrent calls from download_many's
+    threads could mix up or drop other tickers' rows.
+    """
+
+    columns = ["Date", "Open", "High", "Low", "Close", "Volume"]
+
+    def fetch(self, ticker: str, start: str, end: str) -> pd.DataFrame:
+        import yfinance as yf
+
+        df = yf.Ticker(ticker).history(start=start, end=end, auto_adjust=True)
+        if df is None or df.empty:
+            return pd.DataFrame()
+
+        df = df.reset_index()
+        # Daily bars come back on exchange-local, tz-aware midnights: store naive dates
+        if getattr(df["Date"].dt, "tz", None) is not None:
+            df["Date"] = df["Date"].dt.tz_localize(None)
+        return df[[c for c in self.columns if c in df.columns]]
+
+
+class LocalFileSource:
+    """
+    Offline stand-in: serves {root}/{ticker}.parquet (or .csv) sliced to [start, end).
+    """
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+
+    def fetch(self, ticker: str, start: str, end: str) -> pd.DataFrame:
+        path = self.root / f"{ticker}.parquet"
+        if path.exists():
+            df = pd.read_parquet(path)
+        elif path.with_suffix(".csv").exists():
+            df = pd.read_csv(path.with_suffix(".csv"), parse_dates=["Date"])
+        else:
+            return pd.DataFrame()
+
+        mask = (df["Date"] >= pd.Timestamp(start)) & (df["Date"] < pd.Timestamp(end))
+        return df[mask].reset_index(drop=True)
 
 
 def download_ohlcv(ticker: str, start: str, end: str) -> Path:
     """
-    Download adjusted OHLCV data and save to data/raw as parquet.
-    Uses a simple cache: if file already exists, returns it.
+    Download adjusted OHLCV data and save to data/raw as parquet (recorded in
+    data/raw/catalog.json). Uses a simple cache: if file already exists, returns it.
     """
-    out_dir = Path("data") / "raw"
+    out_dir = RAW_DIR
     out_dir.mkdir(parents=True, exist_ok=True)
 
     out_path = out_dir / f"{ticker}_{start}_{end}.parquet"
@@ -19,24 +88,149 @@ def download_ohlcv(ticker: str, start: str, end: str) -> Path:
         print("Using cached file:", out_path)
         return out_path
 
-    df = yf.download(
-        ticker,
-        start=start,
-        end=end,
-        auto_adjust=True,
-        progress=False,
-    )
+    df = YFinanceSource().fetch(ticker, start, end)
 
     if df is None or df.empty:
         raise ValueError(f"No data returned for ticker={ticker}")
 
-    df = df.reset_index()
     df.to_parquet(out_path, index=False)
+    catalog.record(out_path)
 
     print("Downloaded and saved:", out_path)
     return out_path
 
 
+def store_path(ticker: str, raw_dir: Path = RAW_DIR) -> Path:
+    """
+    Single per-ticker store used by download_many: data/raw/{ticker}.parquet
+    """
+    return Path(raw_dir) / f"{ticker}.parquet"
+
+
+def read_coverage(path: Path) -> tuple[str, str] | None:
+    """
+    [start, end) date range already fetched into a store, or None if unknown.
+    """
+    if not path.exists():
+        return None
+    meta = pq.read_schema(path).metadata or {}
+    if COVERAGE_KEY not in meta:
+        return None
+    cov = json.loads(meta[COVERAGE_KEY])
+    return cov["start"], cov["end"]
+
+
+def missing_ranges(coverage: tuple[str, str] | None, start: str, end: str) -> list[tuple[str, str]]:
+    """
+    Date ranges of [start, end) not yet covered by the store.
+    Gaps are bridged to the covered range so the store always stays one contiguous span.
+    """
+    if coverage is None:
+        return [(start, end)]
+
+    have_start, have_end = coverage
+    gaps = []
+    if pd.Timestamp(start) < pd.Timestamp(have_start):
+        gaps.append((start, have_start))
+    if pd.Timestamp(end) > pd.Timestamp(have_end):
+        gaps.append((have_end, end))
+    return gaps
+
+
+def update_store(ticker: str, start: str, end: str, source: OHLCVSource, raw_dir: Path = RAW_DIR) -> Path:
+    """
+    Make sure the ticker's store covers [start, end): fetch only the missing gaps,
+    merge them with what is stored (dedup on Date) and rewrite the store, then
+    record it in the folder's catalog.json.
+    """
+    path = store_path(ticker, raw_dir)
+    coverage = read_coverage(path)
+    gaps = missing_ranges(coverage, start, end)
+    if not gaps:
+        print("Using cached store:", path)
+        return path
+
+    parts = [source.fetch(ticker, g_start, g_end) for g_start, g_end in gaps]
+    parts = [p for p in parts if p is not None and not p.empty]
+    if path.exists():
+        parts.insert(0, pd.read_parquet(path))
+
+    if not parts:
+        raise ValueError(f"No data returned for ticker={ticker}")
+
+    df = (
+        pd.concat(parts, ignore_index=True)
+        .drop_duplicates("Date", keep="last")
+        .sort_values("Date")
+        .reset_index(drop=True)
+    )
+
+    new_start = min([start] + ([coverage[0]] if coverage else []), key=pd.Timestamp)
+    new_end = max([end] + ([coverage[1]] if coverage else []), key=pd.Timestamp)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    meta = dict(table.schema.metadata or {})
+    meta[COVERAGE_KEY] = json.dumps({"start": new_start, "end": new_end}).encode()
+    table = table.replace_schema_metadata(meta)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".parquet.tmp")
+    pq.write_table(table, tmp_path)
+    tmp_path.replace(path)
+    catalog.record(path)
+
+    print(f"Updated store: {path} (fetched {', '.join(f'{a}..{b}' for a, b in gaps)})")
+    return path
+
+
+def download_many(
+    tickers: list[str],
+    start: str,
+    end: str,
+    source: OHLCVSource | None = None,
+    max_workers: int = 8,
+    raw_dir: Path = RAW_DIR,
+) -> dict[str, Path]:
+    """
+    Bring many tickers' stores up to [start, end) concurrently on a bounded thread pool.
+    Each ticker only fetches its missing date gaps. Returns ticker -> store path.
+    Failures don't stop the other tickers; they are raised together at the end.
+    """
+    source = source or YFinanceSource()
+    tickers = list(dict.fromkeys(tickers))
+
+    paths: dict[str, Path] = {}
+    errors: dict[str, str] = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(update_store, t, start, end, source, raw_dir): t for t in tickers}
+        for fut in as_completed(futures):
+            ticker = futures[fut]
+            try:
+                paths[ticker] = fut.result()
+            except Exception as e:
+                errors[ticker] = f"{type(e).__name__}: {e}"
+
+    if errors:
+        details = "; ".join(f"{t}: {msg}" for t, msg in sorted(errors.items()))
+        raise RuntimeError(f"{len(errors)}/{len(tickers)} tickers failed: {details}")
+
+    return {t: paths[t] for t in tickers}
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Download daily OHLCV into per-ticker raw stores.")
+    p.add_argument("--tickers", nargs="+", default=["AAPL"], help="Ticker symbols")
+    p.add_argument("--start", default="2020-01-01", help="Start date (inclusive)")
+    p.add_argument("--end", default="2025-01-01", help="End date (exclusive)")
+    p.add_argument("--jobs", type=int, default=8, help="Concurrent downloads")
+    p.add_argument("--source_dir", default=None,
+                   help="Serve data from local {ticker}.parquet/.csv files instead of yfinance")
+    return p.parse_args()
+
+
 if __name__ == "__main__":
-    path = download_ohlcv("AAPL", "2020-01-01", "2025-01-01")
-    print("Done:", path)
\ No newline at end of file
+    args = parse_args()
+    source = LocalFileSource(args.source_dir) if args.source_dir else YFinanceSource()
+    paths = download_many(args.tickers, args.start, args.end, source=source, max_workers=args.jobs)
+    for ticker, path in paths.items():
+        print("Done:", ticker, path)
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor
+import hashlib
+import json
+import os
+from pathlib import Path
+import time
+from typing import Callable
+
+from src.digest import file_digest
+from src.tracing import span
+
+
+STATE_PATH = Path("data") / "pipeline" / "dag_state.json"
+
+
+class Node:
+    """
+    One pipeline step.
+
+    fn(*args) is a picklable top-level function run in a worker process.
+    inputs() lists the files the step reads; it is called after the dependencies
+    finished, so it may name files they produced. params are the step's settings.
+    The node is up to date when the hash of (params, input file contents) matches
+    the last successful run and every path in outputs exists.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable,
+        args: tuple = (),
+        deps: list[str] | None = None,
+        inputs: Callable[[], list[Path]] | None = None,
+        outputs: list[Path] | None = None,
+        params: dict | None = None,
+    ):
+        self.name = name
+        self.fn = fn
+        self.args = args
+        self.deps = list(deps or [])
+        self.inputs = inputs or (lambda: [])
+        self.outputs = [Path(p) for p in outputs or []]
+        self.params = params or {}
+
+    def signature(self, digest_index: Path | None = None) -> str:
+        h = hashlib.sha256()
+        h.update(json.dumps({"node": self.name, "params": self.params}, sort_keys=True, default=str).encode())
+        for path in sorted({Path(p) for p in self.inputs()}):
+            h.update(str(path).encode())
+            h.update(file_digest(path, digest_index).encode() if path.exists() else b"<missing>")
+        return h.hexdigest()
+
+
+def _read_state(path: Path) -> dict:
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _write_state(path: Path, state: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    tmp.replace(path)
+
+
+def _check_graph(nodes: list[Node]) -> dict[str, Node]:
+    by_name = {}
+    for node in nodes:
+        if node.name in by_name:
+            raise ValueError(f"Duplicate DAG node: {node.name}")
+        by_name[node.name] = node
+    for node in nodes:
+        unknown = [d for d in node.deps if d not in by_name]
+        if unknown:
+            raise ValueError(f"Node {node.name} depends on unknown nodes: {unknown}")
+
+    # Cycle check (DFS colouring)
+    colour: dict[str, int] = {}
+
+    def visit(name: str, stack: list[str]) -> None:
+        if colour.get(name) == 2:
+            return
+        if colour.get(name) == 1:
+            raise ValueError(f"Cycle in DAG: {' -> '.join(stack + [name])}")
+        colour[name] = 1
+        for dep in by_name[name].deps:
+            visit(dep, stack + [name])
+        colour[name] = 2
+
+    for node in nodes:
+        visit(node.name, [])
+    return by_name
+
+
+async def _run_dag(
+    nodes: list[Node],
+    executor: Executor,
+    state: dict,
+    state_path: Path,
+    force: bool,
+) -> dict[str, dict]:
+    by_name = _check_graph(nodes)
+    loop = asyncio.get_running_loop()
+    digest_index = state_path.with_name("digests.json")
+    results: dict[str, dict] = {}
+    tasks: dict[str, asyncio.Task] = {}
+
+    async def run_node(node: Node) -> dict:
+        for dep in node.deps:
+            await tasks[dep]
+        blocked = [d for d in node.deps if results[d]["status"] not in ("ok", "skipped")]
+        if blocked:
+            res = {"status": "blocked", "error": f"upstream failed: {blocked}", "seconds": 0.0}
+            results[node.name] = res
+            return res
+
+        sig = node.signature(digest_index)
+        if not force and state.get(node.name) == sig and all(p.exists() for p in node.outputs):
+            res = {"status": "skipped", "error": None, "seconds": 0.0}
+            print(f"[skipped] {node.name} (inputs unchanged)")
+            results[node.name] = res
+            return res
+
+        start = time.perf_counter()
+        status, error = "ok", None
+        with span("dag_node", node=node.name):
+            try:
+                await loop.run_in_executor(executor, node.fn, *node.args)
+            except Exception as e:
+                status, error = "failed", f"{type(e).__name__}: {e}"
+
+        if status == "ok":
+            state[node.name] = sig
+            _write_state(state_path, state)
+        else:
+            state.pop(node.name, None)
+
+        res = {"status": status, "error": error, "seconds": time.perf_counter() - start}
+        print(f"[{status:>7}] {node.name} ({res['seconds']:.2f}s)" + (f"  {error}" if error else ""))
+        results[node.name] = res
+        return res
+
+    for node in by_name.values():
+        tasks[node.name] = asyncio.ensure_future(run_node(node))
+    await asyncio.gather(*tasks.values())
+    return results
+
+
+def run_dag(
+    nodes: list[Node],
+    max_concurrency: int = 4,
+    state_path: Path = STATE_PATH,
+    force: bool = False,
+    initializer: Callable[[], None] | None = None,
+) -> dict[str, dict]:
+    """
+    Execute a DAG of nodes with an asyncio scheduler.
+
+    A node starts as soon as all its dependencies succeeded (or were up to date);
+    at most max_concurrency nodes run at once, each in a worker process. Nodes whose
+    input hashes and params match the last successful run (recorded in state_path)
+    are skipped, make-style, so editing one config only re-runs that branch.
+    A failed node blocks its descendants; independent branches keep running.
+
+    Returns node name -> {status: ok|skipped|failed|blocked, error, seconds}.
+    Raises RuntimeError after the run if any node failed.
+    """
+    state_path = Path(state_path)
+    state = _read_state(state_path)
+
+    with ProcessPoolExecutor(max_workers=max_concurrency, initializer=initializer) as executor:
+        results = asyncio.run(_run_dag(nodes, executor, state, state_path, force))
+
+    failed = {n: r for n, r in results.items() if r["status"] == "failed"}
+    if failed:
+        details = "; ".join(f"{n}: {r['error']}" for n, r in sorted(failed.items()))
+        raise RuntimeError(f"{len(failed)} pipeline node(s) failed: {details}")
+    return results
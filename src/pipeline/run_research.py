@@ -1,8 +1,18 @@
 from __future__ import annotations
 
 import argparse
+from pathlib import Path
+import shutil
+import sys
 
-from src.tools.run_batch import run_batch
+from src import tracing
+from src.backtest.run_ma_backtest import STRATEGY_VERSION
+from src.features.library import FEATURES_SPEC_PATH
+from src.features.store import FeatureStore
+from src.ingest.download import RAW_DIR, store_path
+from src.pipeline.dag import STATE_PATH, Node, run_dag
+from src.tools.research_worker import SOCKET_PATH
+from src.tools.run_batch import _warm_imports, failed_runs, run_batch
 from src.tools.summarize_runs import summarize
 
 
@@ -11,9 +21,159 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--configs_dir", default="configs", help="Folder containing *.yaml configs")
     p.add_argument("--features", default="data/features", help="Folder containing *_feat.parquet files")
     p.add_argument("--out_root", default="data/reports/batch", help="Output root folder for all runs")
+    p.add_argument("--jobs", type=int, default=1, help="Parallel worker processes for the batch stage")
+    p.add_argument("--keep-going", dest="fail_fast", action="store_false",
+                   help="Keep running remaining configs after a failure")
+    p.add_argument("--worker", nargs="?", const=str(SOCKET_PATH), default=None, metavar="SOCKET",
+                   help="Run agent steps on a resident research worker (src.tools.research_worker serve)")
+    p.add_argument("--trace", default=None,
+                   help="Write a Chrome-trace / Perfetto JSON timeline of every stage (incl. workers) here")
+
+    dag = p.add_argument_group("DAG mode (ingest -> features -> agents -> summarize -> report)")
+    dag.add_argument("--dag", action="store_true",
+                     help="Run as an incremental DAG: steps whose inputs are unchanged are skipped")
+    dag.add_argument("--tickers", nargs="+", default=None,
+                     help="Ingest these tickers first (default: build features from the files already in --raw_dir)")
+    dag.add_argument("--start", default="2020-01-01", help="Ingest start date (inclusive)")
+    dag.add_argument("--end", default="2025-01-01", help="Ingest end date (exclusive)")
+    dag.add_argument("--source_dir", default=None,
+                     help="Ingest from local {ticker}.parquet/.csv files instead of yfinance")
+    dag.add_argument("--raw_dir", default=str(RAW_DIR), help="Raw OHLCV folder")
+    dag.add_argument("--force", action="store_true", help="Re-run every DAG node even if up to date")
     return p.parse_args()
 
 
+# ------------------------------------------------------------
+# DAG node bodies (top-level so worker processes can unpickle them)
+# ------------------------------------------------------------
+def _ingest_node(tickers: list[str], start: str, end: str, source_dir: str | None, raw_dir: str) -> None:
+    from src.ingest.download import LocalFileSource, YFinanceSource, download_many
+
+    source = LocalFileSource(source_dir) if source_dir else YFinanceSource()
+    download_many(tickers, start, end, source=source, raw_dir=Path(raw_dir))
+
+
+def _features_node(raw_path: str, features: str) -> None:
+    from src.features.build_features import build_features
+
+    build_features(Path(raw_path), out_dir=Path(features))
+
+
+def _agent_node(cfg: str, features: str, run_out: str, worker: str | None = None) -> None:
+    from src.tools.run_batch import _run_config_in_worker
+
+    Path(run_out).mkdir(parents=True, exist_ok=True)
+    if worker:
+        from src.tools.research_worker import submit
+
+        res = submit(cfg, features, run_out, worker)
+    else:
+        res = _run_config_in_worker(cfg, features, run_out)
+    if res["status"] != "ok":
+        raise RuntimeError(f"{res['error']} (see {Path(run_out) / 'stderr.log'})")
+
+
+def _summarize_node(out_root: str) -> None:
+    summarize(out_root)
+
+
+def _report_node(summary_path: str) -> None:
+    from src.agents.report_llm_agent import write_report
+
+    write_report(Path(summary_path))
+
+
+def build_research_dag(
+    configs_dir: str,
+    features: str,
+    out_root: str,
+    raw_dir: str = str(RAW_DIR),
+    tickers: list[str] | None = None,
+    start: str = "2020-01-01",
+    end: str = "2025-01-01",
+    source_dir: str | None = None,
+    worker: str | None = None,
+) -> list[Node]:
+    """
+    The research pipeline as DAG nodes:
+      ingest (with tickers) -> features:<raw file> -> agent:<config> -> summarize -> report
+    Each node declares the files it reads, so only stale branches re-run.
+    With worker (a research worker socket), agent nodes run on that worker.
+    """
+    configs = sorted(Path(configs_dir).glob("*.yaml"))
+    if not configs:
+        raise FileNotFoundError(f"No .yaml configs found in: {configs_dir}")
+    out_root_path = Path(out_root)
+    nodes: list[Node] = []
+
+    if tickers:
+        raw_paths = [store_path(t, Path(raw_dir)) for t in dict.fromkeys(tickers)]
+        nodes.append(Node(
+            "ingest", _ingest_node, (list(tickers), start, end, source_dir, raw_dir),
+            outputs=raw_paths,
+            params={"tickers": sorted(tickers), "start": start, "end": end, "source_dir": source_dir},
+        ))
+    else:
+        raw_paths = sorted(Path(raw_dir).glob("*.parquet"))
+    ingest_deps = ["ingest"] if tickers else []
+
+    feature_nodes = []
+    for raw in raw_paths:
+        name = f"features:{raw.stem}"
+        feature_nodes.append(name)
+        nodes.append(Node(
+            name, _features_node, (str(raw), features),
+            deps=ingest_deps,
+            inputs=lambda raw=raw: [raw, FEATURES_SPEC_PATH],
+            outputs=[Path(features) / raw.name.replace(".parquet", "_feat.parquet")],
+        ))
+
+    agent_nodes = []
+    for cfg in configs:
+        run_out = out_root_path / cfg.stem
+        name = f"agent:{cfg.stem}"
+        agent_nodes.append(name)
+        nodes.append(Node(
+            name, _agent_node, (str(cfg), features, str(run_out), worker),
+            deps=feature_nodes,
+            # run_agent reads only the store's first file, so only that one is an input
+            inputs=lambda cfg=cfg: [cfg, *FeatureStore(features).paths()[:1]],
+            outputs=[run_out / "best_config.json"],
+            params={"strategy_version": STRATEGY_VERSION},
+        ))
+
+    summary_path = out_root_path / "summary.csv"
+    nodes.append(Node(
+        "summarize", _summarize_node, (str(out_root_path),),
+        deps=agent_nodes,
+        inputs=lambda: [out_root_path / cfg.stem / "best_config.json" for cfg in configs],
+        outputs=[summary_path],
+    ))
+    nodes.append(Node(
+        "report", _report_node, (str(summary_path),),
+        deps=["summarize"],
+        inputs=lambda: [summary_path],
+        outputs=[out_root_path / "report.md"],
+    ))
+    return nodes
+
+
+def _run_as_dag(args: argparse.Namespace) -> Path:
+    nodes = build_research_dag(
+        args.configs_dir, args.features, args.out_root, raw_dir=args.raw_dir,
+        tickers=args.tickers, start=args.start, end=args.end, source_dir=args.source_dir,
+        worker=args.worker,
+    )
+    results = run_dag(
+        nodes, max_concurrency=max(1, args.jobs), state_path=STATE_PATH,
+        force=args.force, initializer=_warm_imports,
+    )
+    ran = sum(r["status"] == "ok" for r in results.values())
+    skipped = sum(r["status"] == "skipped" for r in results.values())
+    print(f"\nDAG: {len(results)} nodes, ran {ran}, skipped {skipped} (up to date)")
+    return Path(args.out_root) / "summary.csv"
+
+
 def main() -> None:
     args = parse_args()
 
@@ -22,11 +182,33 @@ def main() -> None:
     print("Features:", args.features)
     print("Out root:", args.out_root)
 
-    out_root_path = run_batch(args.configs_dir, args.features, args.out_root)
-    summary_path = summarize(str(out_root_path))
+    # Per-process span files are collected next to the trace and merged at the end
+    trace_parts = None
+    if args.trace:
+        trace_parts = Path(args.trace).with_suffix(".parts")
+        shutil.rmtree(trace_parts, ignore_errors=True)
+        tracing.enable(trace_parts)
+
+    try:
+        with tracing.span("pipeline", dag=args.dag):
+            if args.dag:
+                summary_path = _run_as_dag(args)
+            else:
+                out_root_path = run_batch(
+                    args.configs_dir, args.features, args.out_root,
+                    jobs=args.jobs, fail_fast=args.fail_fast, worker=args.worker,
+                )
+                summary_path = summarize(str(out_root_path))
+    finally:
+        if trace_parts is not None:
+            trace_path = tracing.merge_traces(trace_parts, args.trace)
+            shutil.rmtree(trace_parts, ignore_errors=True)
+            print("Trace written:", trace_path)
 
     print("\nPipeline complete.")
     print("Summary:", summary_path)
+    if not args.dag and failed_runs(out_root_path):
+        sys.exit(1)
 
 
 if __name__ == "__main__":
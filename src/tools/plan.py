@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+import sys
+import time
+
+import numpy as np
+
+from src.agents.ma_research_agent import artifact_params, data_window, search_params, stage2_windows
+from src.backtest.cache import ResultCache
+from src.backtest.run_ma_backtest import run_ma_sweep
+from src.config import ConfigError, config_problems, load_config
+from src.features.store import FeatureStore
+from src.tools.run_batch import _report, _run_config_in_worker
+from src.tracing import span
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(
+        description="Validate configs, run every unique (feature file, window) backtest once, "
+                    "and write per-config reports."
+    )
+    p.add_argument("--configs", nargs="+", default=["configs", "configs/llm_next"],
+                   help="Config folders (their *.yaml) and/or config files")
+    p.add_argument("--features", default="data/features", help="Folder containing *_feat.parquet files")
+    p.add_argument("--out_root", default="data/reports/batch", help="Root folder to store each run outputs")
+    p.add_argument("--dry_run", action="store_true", help="Validate and print the Stage 1 plan only")
+    p.add_argument("--no-cache", dest="use_cache", action="store_false",
+                   help="Don't serve or store sweep results in the on-disk result cache")
+
+    policy = p.add_mutually_exclusive_group()
+    policy.add_argument("--fail-fast", dest="fail_fast", action="store_true", default=True,
+                        help="Stop writing reports after the first failed config (default)")
+    policy.add_argument("--keep-going", dest="fail_fast", action="store_false",
+                        help="Report every config and list all failures at the end")
+    return p.parse_args()
+
+
+# A job is one MA backtest: (feature file, start, end, window)
+Job = tuple[str, "str | None", "str | None", int]
+
+
+def find_configs(paths: list[str | Path]) -> list[Path]:
+    """
+    *.yaml files of every folder in paths (not recursive), plus any paths that are files.
+    """
+    configs: list[Path] = []
+    for p in map(Path, paths):
+        if p.is_dir():
+            configs.extend(sorted(p.glob("*.yaml")))
+        elif p.exists():
+            configs.append(p)
+        else:
+            raise FileNotFoundError(f"Config path not found: {p}")
+    return configs
+
+
+class PlannedRun:
+    """
+    One validated config. `planned` runs (grid search, model=ma) get their sweeps
+    from the shared plan; the other strategies run their own search in the fan-out.
+    """
+
+    def __init__(self, path: Path, config: dict, feature_path: Path):
+        self.path = Path(path)
+        self.run_name = self.path.stem
+        self.config = config
+        search_cfg = config.get("search", {})
+        self.planned = search_cfg.get("strategy", "grid") == "grid" and search_cfg.get("model", "ma") == "ma"
+        _, self.coarse_windows, self.refine_range, self.refine_step = search_params(config)
+        self.start, self.end = data_window(config)
+        self.feature_file = str(feature_path)
+        self.curves = artifact_params(config)["equity_curves"]
+
+    def jobs(self, windows: list[int]) -> set[Job]:
+        return {(self.feature_file, self.start, self.end, int(w)) for w in windows}
+
+
+class SweepMemo:
+    """
+    In-memory table of MA sweep rows keyed by job.
+
+    run() evaluates only the jobs not in the table, as one batched run_ma_sweep per
+    (feature file, start, end). Calling the memo has run_ma_sweep's signature, so
+    run_agent can use it in place of run_ma_sweep and every planned lookup is a hit.
+    With curves=True the equity curve of each job the memo computes is kept too
+    (float32, full length) and handed to the caller's equity_sink; jobs served
+    from the ResultCache have none, and the caller backtests just those for curves.
+    """
+
+    def __init__(self, cache: ResultCache | None = None, curves: bool = False):
+        self.cache = cache
+        self.rows: dict[Job, dict] = {}
+        self.curves: dict[Job, np.ndarray] | None = {} if curves else None
+        self.sweeps = 0
+        self.executed = 0
+
+    def run(self, jobs: set[Job]) -> None:
+        groups: dict[tuple, list[int]] = {}
+        for feature_file, start, end, w in jobs - self.rows.keys():
+            groups.setdefault((feature_file, start, end), []).append(w)
+
+        for (feature_file, start, end), windows in sorted(groups.items(), key=str):
+            windows = sorted(windows)
+            sink = None
+            if self.curves is not None:
+                def sink(ws, equity, group=(feature_file, start, end)):
+                    for w, curve in zip(ws, equity):
+                        self.curves[(*group, int(w))] = curve.astype(np.float32)
+            with span("plan_sweep", file=Path(feature_file).name, windows=len(windows)):
+                for m in run_ma_sweep(Path(feature_file), windows, start, end, cache=self.cache, equity_sink=sink):
+                    self.rows[(feature_file, start, end, int(m["ma_window"]))] = m
+            self.sweeps += 1
+            self.executed += len(windows)
+
+    def __call__(self, feature_path, windows, start=None, end=None, cache=None, equity_sink=None) -> list[dict]:
+        keys = [(str(feature_path), start, end, int(w)) for w in windows]
+        # Anything the plan did not foresee is computed on demand
+        self.run(set(keys))
+        if equity_sink is not None and self.curves is not None:
+            have = [k for k in keys if k in self.curves]
+            if have:
+                equity_sink([k[3] for k in have], np.stack([self.curves[k] for k in have]))
+        return [dict(self.rows[k]) for k in keys]
+
+
+def compile_plan(config_paths: list[str | Path], features: str | Path) -> list[PlannedRun]:
+    """
+    Load and validate every config. Raises ConfigError listing the problems of
+    all files at once (unknown keys, wrong types, clashing run names).
+    """
+    feature_path = FeatureStore(features).first()
+    problems: list[str] = []
+    runs: list[PlannedRun] = []
+    seen: dict[str, Path] = {}
+
+    for path in map(Path, config_paths):
+        try:
+            config = load_config(path)
+        except Exception as e:
+            problems.append(f"{path}: cannot be read ({type(e).__name__}: {e})")
+            continue
+        issues = config_problems(config, path)
+        if path.stem in seen:
+            issues.append(f"{path}: run name '{path.stem}' is also used by {seen[path.stem]}")
+        seen.setdefault(path.stem, path)
+        if issues:
+            problems.extend(issues)
+            continue
+        runs.append(PlannedRun(path, config or {}, feature_path))
+
+    if problems:
+        raise ConfigError(problems)
+    return runs
+
+
+def execute_plan(
+    runs: list[PlannedRun],
+    features: str | Path,
+    out_root: str | Path,
+    use_cache: bool = True,
+    fail_fast: bool = True,
+    results: list[dict] | None = None,
+) -> list[dict]:
+    """
+    Run the deduplicated backtests, then write every config's usual artifacts.
+
+    The 2-stage search is planned in two waves: the union of all Stage 1 windows
+    is evaluated first, each config then picks its Stage 2 refine windows from
+    those results, and the union of the Stage 2 windows is evaluated once more.
+    Each (feature file, window) job runs once however many configs list it.
+    The fan-out calls run_agent per config with the memo in place of
+    run_ma_sweep, so ma_sweep.csv, best_config.json and the registry entry are
+    the same as an independent run. Plan statistics go to out_root/plan.json.
+
+    Returns one batch result dict per config (run_batch's report format), also
+    appended to `results` as runs finish; with fail_fast the fan-out stops at the
+    first failure. plan.json is written either way.
+    """
+    out_root_path = Path(out_root)
+    out_root_path.mkdir(parents=True, exist_ok=True)
+    planned = [r for r in runs if r.planned]
+    memo = SweepMemo(ResultCache() if use_cache else None, curves=any(r.curves for r in planned))
+
+    start = time.perf_counter()
+    with span("plan_stage1", configs=len(planned)):
+        memo.run(set().union(*(r.jobs(r.coarse_windows) for r in planned)))
+
+    requested = 0
+    stage2: set[Job] = set()
+    for r in planned:
+        refine = stage2_windows(memo(r.feature_file, r.coarse_windows, r.start, r.end), r.refine_range, r.refine_step)
+        requested += len(r.coarse_windows) + len(refine)
+        stage2 |= r.jobs(refine)
+    with span("plan_stage2", jobs=len(stage2)):
+        memo.run(stage2)
+    compute_seconds = time.perf_counter() - start
+
+    print(
+        f"Plan: {len(runs)} configs ({len(planned)} planned)  "
+        f"backtests requested: {requested}  unique: {memo.executed}  sweeps: {memo.sweeps}  "
+        f"({compute_seconds:.2f}s)"
+    )
+
+    results = [] if results is None else results
+    try:
+        for r in runs:
+            run_out = out_root_path / r.run_name
+            run_out.mkdir(parents=True, exist_ok=True)
+            res = _run_config_in_worker(str(r.path), str(features), str(run_out), sweep=memo)
+            results.append(res)
+            print(f"[{res['status']:>6}] {res['run_name']} ({res['seconds']:.2f}s)")
+            if res["status"] != "ok" and fail_fast:
+                break
+    finally:
+        stats = {
+            "configs": [str(r.path) for r in runs],
+            "planned": [r.run_name for r in planned],
+            "requested_backtests": requested,
+            "unique_backtests": memo.executed,
+            "sweeps": memo.sweeps,
+            "compute_seconds": compute_seconds,
+            "runs_finished": len(results),
+        }
+        with (out_root_path / "plan.json").open("w", encoding="utf-8") as f:
+            json.dump(stats, f, indent=2)
+    return results
+
+
+def main() -> None:
+    args = parse_args()
+    runs = compile_plan(find_configs(args.configs), args.features)
+
+    if args.dry_run:
+        planned = [r for r in runs if r.planned]
+        stage1 = set().union(*(r.jobs(r.coarse_windows) for r in planned))
+        print(f"{len(runs)} valid configs ({len(planned)} planned)")
+        print(f"Stage 1 backtests requested: {sum(len(r.coarse_windows) for r in planned)}  unique: {len(stage1)}")
+        for r in runs:
+            print(f"  {r.run_name:<32} {'planned' if r.planned else 'direct'}  {r.path}")
+        return
+
+    start = time.perf_counter()
+    results: list[dict] = []
+    try:
+        with span("plan", configs=len(runs)):
+            execute_plan(runs, args.features, args.out_root, use_cache=args.use_cache,
+                         fail_fast=args.fail_fast, results=results)
+    finally:
+        _report(results, time.perf_counter() - start, Path(args.out_root))
+    if any(r["status"] != "ok" for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
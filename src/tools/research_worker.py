@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import argparse
+from contextlib import contextmanager
+import json
+import os
+from pathlib import Path
+import socket
+import socketserver
+import threading
+import time
+
+from src.features.memory import DEFAULT_MAX_BYTES, FeatureMemory
+
+
+SOCKET_PATH = Path("data") / "worker" / "research.sock"
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Resident research worker: warm imports and feature arrays in RAM.")
+    p.add_argument("--socket", default=str(SOCKET_PATH), help="Unix socket to listen on / talk to")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    serve = sub.add_parser("serve", help="Run the worker in the foreground")
+    serve.add_argument("--max_mb", type=float, default=DEFAULT_MAX_BYTES / (1 << 20),
+                       help="Feature memory budget (least recently used files are dropped)")
+
+    sub.add_parser("ping", help="Check that a worker is listening")
+    sub.add_parser("stats", help="Jobs served and feature memory usage")
+    sub.add_parser("shutdown", help="Stop the worker")
+
+    run = sub.add_parser("run", help="Run one config on the worker")
+    run.add_argument("--config", required=True)
+    run.add_argument("--features", default="data/features")
+    run.add_argument("--outdir", default="data/reports")
+    return p.parse_args()
+
+
+# ------------------------------------------------------------
+# Server
+# ------------------------------------------------------------
+@contextmanager
+def _working_dir(path: str | None):
+    # Jobs resolve data/... paths (result cache, registry) against the caller's cwd
+    prev = os.getcwd()
+    if path:
+        os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(prev)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        try:
+            reply = self.server.dispatch(json.loads(line))
+        except Exception as e:
+            reply = {"status": "failed", "error": f"{type(e).__name__}: {e}"}
+        self.wfile.write((json.dumps(reply) + "\n").encode())
+
+
+class ResearchWorker(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Long-lived research worker on a Unix socket.
+
+    The agent and its dependencies are imported once at startup, and every feature
+    read goes through a FeatureMemory, so repeated runs over the same files skip
+    both the interpreter start and the parquet read. Requests are one JSON line:
+      {"op": "run", "config", "features", "outdir", "cwd"} -> run_batch result dict
+      {"op": "ping" | "stats" | "shutdown"}
+    Every connection gets its own thread, so ping / stats / shutdown answer while
+    a job runs; jobs themselves take `run_lock` and run one at a time (they chdir
+    to the caller's working directory), with stdout/stderr in the run folder's
+    logs (as pool workers do). Restart the worker after changing code: modules
+    stay imported for its whole lifetime.
+    """
+
+    def __init__(self, socket_path: str | Path = SOCKET_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        from src.features.store import use_memory
+        from src.tools.run_batch import _warm_imports
+
+        self.socket_path = Path(socket_path)
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.socket_path.exists():
+            if ping(self.socket_path):
+                raise RuntimeError(f"A research worker is already listening on {self.socket_path}")
+            self.socket_path.unlink()
+
+        _warm_imports()
+        self.memory = FeatureMemory(max_bytes)
+        use_memory(self.memory)
+        self.jobs = 0
+        self.started = time.time()
+        self.run_lock = threading.Lock()
+        super().__init__(str(self.socket_path), _Handler)
+
+    def dispatch(self, request: dict) -> dict:
+        op = request.get("op")
+        if op == "ping":
+            return {"status": "ok", "pid": os.getpid()}
+        if op == "stats":
+            return {"status": "ok", "pid": os.getpid(), "jobs": self.jobs,
+                    "uptime_seconds": time.time() - self.started, "memory": self.memory.stats()}
+        if op == "shutdown":
+            # Ends serve_forever (running in the main thread); a running job still finishes
+            self.shutdown()
+            return {"status": "ok"}
+        if op == "run":
+            from src.tools.run_batch import _run_config_in_worker
+
+            with self.run_lock, _working_dir(request.get("cwd")):
+                Path(request["outdir"]).mkdir(parents=True, exist_ok=True)
+                result = _run_config_in_worker(request["config"], request["features"], request["outdir"])
+                self.jobs += 1
+            return result
+        raise ValueError(f"Unknown op: {op!r}")
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.socket_path.unlink(missing_ok=True)
+
+
+def serve(socket_path: str | Path = SOCKET_PATH, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+    with ResearchWorker(socket_path, max_bytes) as server:
+        print(f"Research worker {os.getpid()} listening on {server.socket_path}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    print("Research worker stopped.")
+
+
+# ------------------------------------------------------------
+# Client
+# ------------------------------------------------------------
+def request(socket_path: str | Path, payload: dict, timeout: float | None = None) -> dict:
+    """
+    Send one request to the worker and wait for its reply.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(str(socket_path))
+        sock.sendall((json.dumps(payload) + "\n").encode())
+        with sock.makefile("rb") as f:
+            line = f.readline()
+    if not line:
+        raise ConnectionError(f"Research worker at {socket_path} closed the connection")
+    return json.loads(line)
+
+
+def ping(socket_path: str | Path = SOCKET_PATH) -> bool:
+    """
+    Whether a worker is listening. A connection that is accepted but not answered
+    in time still counts (a worker that is busy or predates threaded control ops);
+    only a missing socket or a refused connection means no worker.
+    """
+    try:
+        return request(socket_path, {"op": "ping"}, timeout=2.0).get("status") == "ok"
+    except TimeoutError:
+        return True
+    except OSError:
+        return False
+
+
+def submit(cfg: str | Path, features: str | Path, run_out: str | Path, socket_path: str | Path = SOCKET_PATH) -> dict:
+    """
+    Run one config on the worker. Returns the same result dict as a pool worker
+    (run_name, config, status, error, seconds); failures are reported, not raised.
+    """
+    return request(socket_path, {
+        "op": "run",
+        "config": str(cfg),
+        "features": str(features),
+        "outdir": str(run_out),
+        "cwd": os.getcwd(),
+    })
+
+
+def main() -> None:
+    args = parse_args()
+    if args.cmd == "serve":
+        serve(args.socket, int(args.max_mb * (1 << 20)))
+    elif args.cmd == "run":
+        res = submit(args.config, args.features, args.outdir, args.socket)
+        print(f"[{res['status']:>6}] {res.get('run_name', args.config)} ({res.get('seconds', 0.0):.2f}s)"
+              + (f"  {res['error']}" if res.get("error") else ""))
+    else:
+        print(json.dumps(request(args.socket, {"op": args.cmd}, timeout=10.0), indent=2))
+
+
+if __name__ == "__main__":
+    main()
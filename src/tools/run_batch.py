@@ -1,9 +1,17 @@
 from __future__ import annotations
 
 import argparse
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import redirect_stderr, redirect_stdout
+import json
 from pathlib import Path
 import subprocess
 import sys
+import time
+import traceback
+
+from src.tools.research_worker import SOCKET_PATH
+from src.tracing import span
 
 
 def parse_args() -> argparse.Namespace:
@@ -11,22 +19,75 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--configs_dir", default="configs", help="Folder containing *.yaml configs")
     p.add_argument("--features", default="data/features", help="Folder containing *_feat.parquet files")
     p.add_argument("--out_root", default="data/reports/batch", help="Root folder to store each run outputs")
+    p.add_argument("--jobs", type=int, default=1,
+                   help="Number of parallel worker processes (1 = sequential subprocess per config)")
+
+    p.add_argument("--worker", nargs="?", const=str(SOCKET_PATH), default=None, metavar="SOCKET",
+                   help="Submit configs to a running research worker (src.tools.research_worker serve) "
+                        "instead of starting processes")
+    p.add_argument("--queue", default=None, metavar="DIR",
+                   help="Sharded mode: queue one unit per (config, feature file) in this shared folder and "
+                        "work on it with --jobs local processes (other hosts join with src.tools.work_queue work)")
+    p.add_argument("--plan", action="store_true",
+                   help="Validate all configs first and run each unique (feature file, window) "
+                        "backtest once for all of them (see src.tools.plan; --jobs is ignored)")
+
+    policy = p.add_mutually_exclusive_group()
+    policy.add_argument("--fail-fast", dest="fail_fast", action="store_true", default=True,
+                        help="Stop scheduling new runs after the first failure (default)")
+    policy.add_argument("--keep-going", dest="fail_fast", action="store_false",
+                        help="Run every config and report all failures at the end")
     return p.parse_args()
 
 
-def run_batch(configs_dir: str, features: str, out_root: str) -> Path:
+def _warm_imports() -> None:
     """
-    Run MA research agent for every YAML config in configs_dir.
-    Returns the output root folder path.
+    Pool initializer: import the agent (pandas, numpy, yaml, pyarrow) once per worker,
+    so each scheduled config starts with a warm interpreter.
     """
-    configs_path = Path(configs_dir)
-    out_root_path = Path(out_root)
-    out_root_path.mkdir(parents=True, exist_ok=True)
+    import src.agents.ma_research_agent  # noqa: F401
+
+
+def _run_config_in_worker(cfg: str, features: str, run_out: str, sweep=None) -> dict:
+    """
+    Run one config inside a pool worker (or in-process, for the experiment planner's
+    fan-out, with `sweep` serving precomputed results).
+    stdout/stderr go to stdout.log / stderr.log in the run folder.
+    Never raises: failures are returned as status="failed" so the parent decides the policy.
+    """
+    from src.agents.ma_research_agent import run_agent
+
+    run_out_path = Path(run_out)
+    start = time.perf_counter()
+    status, error = "ok", None
+
+    with (run_out_path / "stdout.log").open("w", encoding="utf-8") as out, \
+            (run_out_path / "stderr.log").open("w", encoding="utf-8") as err, \
+            redirect_stdout(out), redirect_stderr(err):
+        try:
+            with span("agent", config=cfg):
+                run_agent(cfg, features, run_out, sweep=sweep)
+        except BaseException as e:  # report everything, including SystemExit from the agent
+            traceback.print_exc()
+            status, error = "failed", f"{type(e).__name__}: {e}"
+
+    return {
+        "run_name": Path(cfg).stem,
+        "config": cfg,
+        "status": status,
+        "error": error,
+        "seconds": time.perf_counter() - start,
+    }
 
-    configs = sorted(configs_path.glob("*.yaml"))
-    if not configs:
-        raise FileNotFoundError(f"No .yaml configs found in: {configs_path}")
 
+def _run_sequential(
+    configs: list[Path], features: str, out_root_path: Path, fail_fast: bool, results: list[dict],
+) -> list[dict]:
+    """
+    Original mode: one blocking `python -m src.agents.ma_research_agent` per config,
+    with its stdout/stderr in stdout.log / stderr.log of the run folder.
+    Results are appended to `results` as runs finish.
+    """
     for cfg in configs:
         run_name = cfg.stem
         run_out = out_root_path / run_name
@@ -42,18 +103,230 @@ def run_batch(configs_dir: str, features: str, out_root: str) -> Path:
         print("\n=== Running:", run_name, "===")
         print("Command:", " ".join(cmd))
 
-        result = subprocess.run(cmd)
-        if result.returncode != 0:
-            raise RuntimeError(f"Run failed for config={cfg} (exit={result.returncode})")
+        start = time.perf_counter()
+        with span("run", run=run_name), \
+                (run_out / "stdout.log").open("w", encoding="utf-8") as out, \
+                (run_out / "stderr.log").open("w", encoding="utf-8") as err:
+            result = subprocess.run(cmd, stdout=out, stderr=err)
+        ok = result.returncode == 0
+        results.append({
+            "run_name": run_name,
+            "config": str(cfg),
+            "status": "ok" if ok else "failed",
+            "error": None if ok else f"exit={result.returncode}",
+            "seconds": time.perf_counter() - start,
+        })
+        print(f"[{results[-1]['status']:>6}] {run_name} ({results[-1]['seconds']:.2f}s)")
+
+        if not ok and fail_fast:
+            break
+    return results
+
+
+def _run_on_worker(
+    configs: list[Path], features: str, out_root_path: Path, socket_path: str, fail_fast: bool, results: list[dict],
+) -> list[dict]:
+    """
+    Submit configs one by one to a resident research worker (warm imports and feature memory).
+    Logs go to stdout.log / stderr.log in each run folder, as with the pool.
+    """
+    from src.tools.research_worker import ping, submit
+
+    if not ping(socket_path):
+        raise ConnectionError(f"No research worker listening on {socket_path} "
+                              f"(start one with: python -m src.tools.research_worker serve)")
+
+    for cfg in configs:
+        run_out = out_root_path / cfg.stem
+        with span("run", run=cfg.stem, worker=True):
+            res = submit(cfg, features, run_out, socket_path)
+        results.append(res)
+        print(f"[{res['status']:>6}] {res['run_name']} ({res['seconds']:.2f}s)")
+        if res["status"] != "ok" and fail_fast:
+            break
+    return results
+
+
+def _queue_worker(queue_root: str) -> int:
+    from src.tools.work_queue import WorkQueue, work
+
+    return work(WorkQueue(queue_root), wait=True)
+
+
+def _run_queue(configs_dir: str, features: str, out_root_path: Path, queue_root: str, jobs: int) -> list[dict]:
+    """
+    Sharded mode: enqueue every (config, feature file) unit, work on the queue with
+    `jobs` local processes until it is drained, and return every unit's result
+    (including units run by workers on other hosts).
+    """
+    from src.tools.work_queue import WorkQueue, make_units
+
+    queue = WorkQueue(queue_root)
+    units = make_units(configs_dir, features, out_root_path)
+    print(f"\n=== Queued {queue.enqueue(units)} of {len(units)} units in {queue.root} ===")
+
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_warm_imports) as pool:
+            list(pool.map(_queue_worker, [str(queue.root)] * jobs))
+    else:
+        _queue_worker(str(queue.root))
+
+    # Only this batch's units: the queue folder may hold other out_roots' results
+    dirs = {Path(u["out_dir"]).resolve() for u in units}
+    return [r for r in queue.results() if Path(r["out_dir"]).resolve() in dirs]
+
+
+def _run_pool(
+    configs: list[Path], features: str, out_root_path: Path, jobs: int, fail_fast: bool, results: list[dict],
+) -> list[dict]:
+    """
+    Schedule configs on a process pool of warm workers.
+    With fail_fast, pending runs are cancelled after the first failure (running ones finish).
+    """
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_warm_imports) as pool:
+        pending = {}
+        for cfg in configs:
+            run_out = out_root_path / cfg.stem
+            run_out.mkdir(parents=True, exist_ok=True)
+            fut = pool.submit(_run_config_in_worker, str(cfg), features, str(run_out))
+            pending[fut] = cfg
+
+        print(f"\n=== Scheduled {len(configs)} runs on {jobs} workers ===")
+        stop = False
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                cfg = pending.pop(fut)
+                if fut.cancelled():
+                    continue
+                res = fut.result()
+                results.append(res)
+                print(f"[{res['status']:>6}] {res['run_name']} ({res['seconds']:.2f}s)")
+
+                if res["status"] != "ok" and fail_fast and not stop:
+                    stop = True
+                    for other in pending:
+                        other.cancel()
+    return results
+
+
+def _report(results: list[dict], wall_seconds: float, out_root_path: Path) -> None:
+    """
+    Print the end-of-batch timing report and save it as batch_report.json.
+    """
+    failed = [r for r in results if r["status"] != "ok"]
+    per_run = sum(r["seconds"] for r in results) / len(results) if results else 0.0
+
+    print("\n=== Batch report ===")
+    for r in sorted(results, key=lambda r: r["run_name"]):
+        line = f"  {r['run_name']:<32} {r['status']:<7} {r['seconds']:8.2f}s"
+        if r["error"]:
+            line += f"  {r['error']}"
+        print(line)
+    print(f"Runs: {len(results)}  failed: {len(failed)}")
+    print(f"Wall clock: {wall_seconds:.2f}s  mean time per run: {per_run:.2f}s")
+
+    report = {
+        "wall_seconds": wall_seconds,
+        "mean_run_seconds": per_run,
+        "runs": results,
+    }
+    with (out_root_path / "batch_report.json").open("w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+
+def failed_runs(out_root: str | Path) -> list[dict]:
+    """
+    Failed runs listed in a batch's batch_report.json ([] if there is no report).
+    """
+    path = Path(out_root) / "batch_report.json"
+    if not path.exists():
+        return []
+    with path.open("r", encoding="utf-8") as f:
+        return [r for r in json.load(f)["runs"] if r["status"] != "ok"]
+
+
+def _raise_failed(results: list[dict], out_root_path: Path) -> None:
+    failed = [r for r in results if r["status"] != "ok"]
+    if failed:
+        raise RuntimeError(
+            f"Run failed for config={failed[0]['config']} ({failed[0]['error']}); "
+            f"see {out_root_path / failed[0]['run_name'] / 'stderr.log'}"
+        )
+
+
+def run_batch(
+    configs_dir: str,
+    features: str,
+    out_root: str,
+    jobs: int = 1,
+    fail_fast: bool = True,
+    plan: bool = False,
+    worker: str | None = None,
+    queue: str | None = None,
+) -> Path:
+    """
+    Run MA research agent for every YAML config in configs_dir.
+    jobs > 1 runs configs in parallel on a worker pool (logs under each run folder).
+    The timing report (batch_report.json) is written even when runs fail or the
+    batch is interrupted. With fail_fast, scheduling stops at the first failure and
+    RuntimeError is raised after the report; fail_fast=False keeps going and only
+    lists failures in the report (see failed_runs).
+    plan=True validates every config up front and shares backtests across configs
+    (src.tools.plan); the per-run artifacts are the same.
+    worker is the socket of a running research worker to submit configs to.
+    queue shards the batch into (config, feature file) units on a shared work queue
+    folder; their outputs go to out_root/<config>__<ticker>.
+    Returns the output root folder path.
+    """
+    configs_path = Path(configs_dir)
+    out_root_path = Path(out_root)
+    out_root_path.mkdir(parents=True, exist_ok=True)
+
+    configs = sorted(configs_path.glob("*.yaml"))
+    if not configs:
+        raise FileNotFoundError(f"No .yaml configs found in: {configs_path}")
+
+    start = time.perf_counter()
+    results: list[dict] = []
+    try:
+        with span("run_batch", configs=len(configs), jobs=jobs):
+            if queue:
+                results.extend(_run_queue(configs_dir, features, out_root_path, queue, jobs))
+            elif plan:
+                from src.tools.plan import compile_plan, execute_plan
+
+                execute_plan(compile_plan(configs, features), features, out_root_path,
+                             fail_fast=fail_fast, results=results)
+            elif worker:
+                _run_on_worker(configs, features, out_root_path, worker, fail_fast, results)
+            elif jobs > 1:
+                _run_pool(configs, features, out_root_path, jobs, fail_fast, results)
+            else:
+                _run_sequential(configs, features, out_root_path, fail_fast, results)
+    finally:
+        _report(results, time.perf_counter() - start, out_root_path)
 
-    print("\nAll runs completed. Output root:", out_root_path)
+    if fail_fast:
+        _raise_failed(results, out_root_path)
+    failed = [r for r in results if r["status"] != "ok"]
+    if failed:
+        print(f"\n{len(failed)} of {len(results)} runs failed. Output root:", out_root_path)
+    else:
+        print("\nAll runs completed. Output root:", out_root_path)
     return out_root_path
 
 
 def main() -> None:
     args = parse_args()
-    run_batch(args.configs_dir, args.features, args.out_root)
+    out_root = run_batch(
+        args.configs_dir, args.features, args.out_root,
+        jobs=args.jobs, fail_fast=args.fail_fast, plan=args.plan, worker=args.worker,
+        queue=args.queue,
+    )
+    if failed_runs(out_root):
+        sys.exit(1)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
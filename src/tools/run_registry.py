@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+import argparse
+from contextlib import contextmanager
+import json
+import math
+from pathlib import Path
+import sqlite3
+import time
+
+import pandas as pd
+
+
+REGISTRY_PATH = Path("data") / "registry" / "runs.sqlite"
+
+# Experiment columns stored natively (and indexable); anything else goes into `extra` as JSON
+EXPERIMENT_COLUMNS = ("feature_file", "ticker", "ma_window", "fast", "slow", "total_return", "max_drawdown", "sharpe")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id     INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_name   TEXT NOT NULL,
+    out_root   TEXT NOT NULL,
+    run_dir    TEXT NOT NULL,
+    config     TEXT,
+    model      TEXT,
+    best_json  TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS experiments (
+    run_id       INTEGER NOT NULL REFERENCES runs(run_id),
+    run_name     TEXT NOT NULL,
+    feature_file TEXT,
+    ticker       TEXT,
+    ma_window    INTEGER,
+    fast         INTEGER,
+    slow         INTEGER,
+    total_return REAL,
+    max_drawdown REAL,
+    sharpe       REAL,
+    is_best      INTEGER NOT NULL DEFAULT 0,
+    extra        TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_root_name ON runs(out_root, run_name, run_id);
+CREATE INDEX IF NOT EXISTS idx_exp_run ON experiments(run_id);
+CREATE INDEX IF NOT EXISTS idx_exp_run_name ON experiments(run_name);
+CREATE INDEX IF NOT EXISTS idx_exp_feature ON experiments(feature_file);
+CREATE INDEX IF NOT EXISTS idx_exp_window ON experiments(ma_window);
+CREATE INDEX IF NOT EXISTS idx_exp_sharpe ON experiments(sharpe);
+"""
+
+
+def _clean(v):
+    # NumPy scalars -> Python, NaN -> NULL
+    if hasattr(v, "item"):
+        v = v.item()
+    if isinstance(v, float) and math.isnan(v):
+        return None
+    return v
+
+
+class RunRegistry:
+    """
+    Append-only SQLite registry of agent runs and every experiment row they evaluated.
+
+    Each run_agent call appends one `runs` row (with its best config) plus one
+    `experiments` row per evaluated parameter set. Nothing is updated in place:
+    re-running a config adds a newer run, and queries use the latest run per
+    (out_root, run_name). Experiments are indexed on run_name, feature_file,
+    ma_window and sharpe, so summaries and top-k queries never scan run folders.
+    """
+
+    def __init__(self, path: str | Path = REGISTRY_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as con:
+            con.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # WAL + busy timeout: pool workers record runs concurrently
+        con = sqlite3.connect(self.path, timeout=30.0)
+        try:
+            con.execute("PRAGMA journal_mode=WAL")
+            with con:  # one transaction, committed on success
+                yield con
+        finally:
+            con.close()
+
+    # ------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------
+    def record_run(
+        self,
+        run_dir: str | Path,
+        rows: list[dict],
+        best: dict,
+        best_row: int | None = None,
+        config: str | Path | None = None,
+        model: str | None = None,
+    ) -> int:
+        """
+        Append one run (its folder name is the run_name) and all its experiment rows.
+        best_row is the index in `rows` of the selected experiment, if it is one of them.
+        Returns the new run_id.
+        """
+        run_dir = Path(run_dir).resolve()
+        run_name = run_dir.name
+        with self._connect() as con:
+            cur = con.execute(
+                "INSERT INTO runs (run_name, out_root, run_dir, config, model, best_json, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (run_name, str(run_dir.parent), str(run_dir), str(config) if config else None, model,
+                 json.dumps({k: _clean(v) for k, v in best.items()}), time.time()),
+            )
+            run_id = cur.lastrowid
+
+            records = []
+            for i, row in enumerate(rows):
+                extra = {k: _clean(v) for k, v in row.items() if k not in EXPERIMENT_COLUMNS}
+                records.append((
+                    run_id, run_name,
+                    *(_clean(row.get(c)) for c in EXPERIMENT_COLUMNS),
+                    int(i == best_row),
+                    json.dumps(extra) if extra else None,
+                ))
+            con.executemany(
+                f"INSERT INTO experiments (run_id, run_name, {', '.join(EXPERIMENT_COLUMNS)}, is_best, extra) "
+                f"VALUES ({', '.join('?' * (len(EXPERIMENT_COLUMNS) + 4))})",
+                records,
+            )
+        return run_id
+
+    # ------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------
+    def latest_runs(self, out_root: str | Path | None = None) -> pd.DataFrame:
+        """
+        Latest run per run_name (optionally only runs written under out_root).
+        Columns: run_id, run_name, out_root, run_dir, config, model, best_json, created_at.
+        """
+        where, params = "", []
+        if out_root is not None:
+            where, params = "WHERE out_root = ?", [str(Path(out_root).resolve())]
+        sql = (
+            f"SELECT r.* FROM runs r JOIN ("
+            f"  SELECT out_root, run_name, MAX(run_id) AS run_id FROM runs {where} GROUP BY out_root, run_name"
+            f") latest USING (run_id) ORDER BY r.run_name"
+        )
+        with self._connect() as con:
+            return pd.read_sql_query(sql, con, params=params)
+
+    def best_configs(self, out_root: str | Path) -> list[dict]:
+        """
+        best_config dict of the latest run of every run_name under out_root
+        (what summarize used to collect from best_config.json files).
+        """
+        runs = self.latest_runs(out_root)
+        return [{**json.loads(r.best_json), "run_name": r.run_name} for r in runs.itertuples()]
+
+    def last_recorded(self, out_root: str | Path) -> float | None:
+        """
+        created_at of the newest run under out_root (None if it has none); tells
+        whether a summary written earlier is still current.
+        """
+        with self._connect() as con:
+            row = con.execute(
+                "SELECT MAX(created_at) FROM runs WHERE out_root = ?", (str(Path(out_root).resolve()),)
+            ).fetchone()
+        return row[0]
+
+    def query(
+        self,
+        k: int = 20,
+        run_name: str | None = None,
+        feature: str | None = None,
+        ticker: str | None = None,
+        min_window: int | None = None,
+        max_window: int | None = None,
+        min_sharpe: float | None = None,
+        max_drawdown: float | None = None,
+        latest_only: bool = True,
+        out_root: str | Path | None = None,
+    ) -> pd.DataFrame:
+        """
+        Top-k experiments by Sharpe with optional filters. feature matches a
+        substring of the feature file path; max_drawdown keeps rows whose drawdown
+        is no worse than the limit (e.g. -0.3). latest_only ignores superseded runs.
+        """
+        clauses, params = [], []
+        if run_name is not None:
+            clauses.append("e.run_name = ?")
+            params.append(run_name)
+        if feature is not None:
+            clauses.append("e.feature_file LIKE ?")
+            params.append(f"%{feature}%")
+        if ticker is not None:
+            clauses.append("e.ticker = ?")
+            params.append(ticker)
+        if min_window is not None:
+            clauses.append("e.ma_window >= ?")
+            params.append(int(min_window))
+        if max_window is not None:
+            clauses.append("e.ma_window <= ?")
+            params.append(int(max_window))
+        if min_sharpe is not None:
+            clauses.append("e.sharpe >= ?")
+            params.append(float(min_sharpe))
+        if max_drawdown is not None:
+            clauses.append("e.max_drawdown >= ?")
+            params.append(float(max_drawdown))
+        if latest_only or out_root is not None:
+            root_filter, root_params = "", []
+            if out_root is not None:
+                root_filter, root_params = "WHERE out_root = ?", [str(Path(out_root).resolve())]
+            # Unary + keeps the planner on the sharpe index (ORDER BY ... LIMIT k stops early)
+            clauses.append(
+                f"+e.run_id IN (SELECT MAX(run_id) FROM runs {root_filter} GROUP BY out_root, run_name)"
+            )
+            params.extend(root_params)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = (
+            f"SELECT e.run_id, e.run_name, {', '.join('e.' + c for c in EXPERIMENT_COLUMNS)}, e.is_best "
+            f"FROM experiments e {where} ORDER BY e.sharpe DESC LIMIT ?"
+        )
+        with self._connect() as con:
+            df = pd.read_sql_query(sql, con, params=[*params, int(k)])
+        return df.dropna(axis=1, how="all")
+
+    def stats(self) -> dict:
+        with self._connect() as con:
+            runs = con.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+            names = con.execute("SELECT COUNT(DISTINCT run_name) FROM runs").fetchone()[0]
+            experiments = con.execute("SELECT COUNT(*) FROM experiments").fetchone()[0]
+        return {
+            "path": str(self.path),
+            "runs": runs,
+            "run_names": names,
+            "experiments": experiments,
+            "bytes": self.path.stat().st_size,
+        }
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Query the run registry.")
+    p.add_argument("--db", default=str(REGISTRY_PATH), help="Registry SQLite file")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    sub.add_parser("stats", help="Run and experiment counts")
+
+    runs = sub.add_parser("runs", help="Latest run per run_name")
+    runs.add_argument("--out_root", default=None, help="Only runs under this output root")
+
+    top = sub.add_parser("top", help="Top-k experiments by Sharpe")
+    top.add_argument("-k", type=int, default=20)
+    top.add_argument("--run_name", default=None)
+    top.add_argument("--feature", default=None, help="Substring of the feature file path")
+    top.add_argument("--ticker", default=None)
+    top.add_argument("--min_window", type=int, default=None)
+    top.add_argument("--max_window", type=int, default=None)
+    top.add_argument("--min_sharpe", type=float, default=None)
+    top.add_argument("--max_drawdown", type=float, default=None, help="e.g. -0.3 keeps drawdowns of at most 30%%")
+    top.add_argument("--out_root", default=None, help="Only runs under this output root")
+    top.add_argument("--all_runs", dest="latest_only", action="store_false",
+                     help="Include superseded runs of the same run_name")
+    return p.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    registry = RunRegistry(args.db)
+
+    if args.cmd == "stats":
+        for k, v in registry.stats().items():
+            print(f"{k}: {v}")
+    elif args.cmd == "runs":
+        runs = registry.latest_runs(args.out_root)
+        runs["created_at"] = pd.to_datetime(runs["created_at"], unit="s").dt.strftime("%Y-%m-%d %H:%M:%S")
+        print(runs[["run_id", "run_name", "model", "created_at", "run_dir"]].to_string(index=False))
+    elif args.cmd == "top":
+        start = time.perf_counter()
+        df = registry.query(
+            k=args.k, run_name=args.run_name, feature=args.feature, ticker=args.ticker,
+            min_window=args.min_window, max_window=args.max_window, min_sharpe=args.min_sharpe,
+            max_drawdown=args.max_drawdown, latest_only=args.latest_only, out_root=args.out_root,
+        )
+        print(df.to_string(index=False))
+        print(f"{len(df)} rows in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
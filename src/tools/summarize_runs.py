@@ -6,24 +6,38 @@ from pathlib import Path
 
 import pandas as pd
 
+from src.tools.run_registry import REGISTRY_PATH, RunRegistry
+from src.tracing import span
+
 
 def parse_args() -> argparse.Namespace:
     p = argparse.ArgumentParser(description="Summarize batch runs into a single CSV.")
     p.add_argument("--out_root", default="data/reports/batch", help="Root folder that contains run subfolders")
+    p.add_argument("--registry", default=str(REGISTRY_PATH), help="Run registry SQLite file")
+    p.add_argument("--scan", action="store_true",
+                   help="Also read best_config.json from run folders the registry has no record of "
+                        "(runs from before the registry, or run with --no-registry)")
     return p.parse_args()
 
 
-def summarize(out_root: str) -> Path:
+def summarize(out_root: str, registry_path: str | Path | None = REGISTRY_PATH, scan: bool = False) -> Path:
     """
-    Read best_config.json from each run folder and write a summary.csv.
+    Write summary.csv with the best config of every run under out_root.
     Returns the summary.csv path.
+
+    Best configs come from the run registry alone (latest run per run_name under
+    out_root, one indexed query); run folders are not opened. An existing
+    summary.csv newer than the last run recorded under out_root is kept as is.
+    scan=True (or registry_path=None) is the fallback for legacy runs: it also
+    reads best_config.json from every run folder the registry has no record of.
     """
-    out_root_path = Path(out_root)
-    if not out_root_path.exists():
-        raise FileNotFoundError(f"out_root not found: {out_root_path}")
+    with span("summarize", out_root=out_root):
+        return _summarize(out_root, registry_path, scan or registry_path is None)
 
+
+def _scan_best_configs(out_root_path: Path, skip: set[str]) -> list[dict]:
     rows: list[dict] = []
-    for run_dir in sorted([p for p in out_root_path.iterdir() if p.is_dir()]):
+    for run_dir in sorted([p for p in out_root_path.iterdir() if p.is_dir() and p.name not in skip]):
         best_path = run_dir / "best_config.json"
         if not best_path.exists():
             continue
@@ -33,9 +47,41 @@ def summarize(out_root: str) -> Path:
 
         best["run_name"] = run_dir.name
         rows.append(best)
+    return rows
+
+
+def _print_summary(df: pd.DataFrame) -> None:
+    shown = [c for c in ("run_name", "ma_window", "fast", "slow", "total_return", "max_drawdown", "sharpe") if c in df.columns]
+    print(df[shown])
+
+
+def _summarize(out_root: str, registry_path: str | Path | None, scan: bool) -> Path:
+    out_root_path = Path(out_root)
+    if not out_root_path.exists():
+        raise FileNotFoundError(f"out_root not found: {out_root_path}")
+    out_path = out_root_path / "summary.csv"
+
+    registry = None
+    if registry_path is not None and Path(registry_path).exists():
+        registry = RunRegistry(registry_path)
+
+    if registry is not None and not scan and out_path.exists():
+        last = registry.last_recorded(out_root_path)
+        if last is not None and out_path.stat().st_mtime > last:
+            print("Summary up to date:", out_path)
+            _print_summary(pd.read_csv(out_path))
+            return out_path
+
+    rows: list[dict] = []
+    if registry is not None:
+        with span("registry_query", out_root=out_root):
+            rows = registry.best_configs(out_root_path)
+    if scan:
+        rows += _scan_best_configs(out_root_path, {r["run_name"] for r in rows})
 
     if not rows:
-        raise RuntimeError(f"No best_config.json found under: {out_root_path}")
+        hint = "" if scan else " (use --scan for runs the registry has no record of)"
+        raise RuntimeError(f"No runs recorded under: {out_root_path}{hint}")
 
     df = pd.DataFrame(rows)
     cols = ["run_name"] + [c for c in df.columns if c != "run_name"]
@@ -44,17 +90,16 @@ def summarize(out_root: str) -> Path:
     if "sharpe" in df.columns:
         df = df.sort_values("sharpe", ascending=False)
 
-    out_path = out_root_path / "summary.csv"
     df.to_csv(out_path, index=False)
 
     print("Saved summary:", out_path)
-    print(df[["run_name", "ma_window", "total_return", "max_drawdown", "sharpe"]])
+    _print_summary(df)
     return out_path
 
 
 def main() -> None:
     args = parse_args()
-    summarize(args.out_root)
+    summarize(args.out_root, args.registry, scan=args.scan)
 
 
 if __name__ == "__main__":
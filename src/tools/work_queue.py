@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+from pathlib import Path
+import re
+import socket
+import threading
+import time
+
+from src.features.store import FeatureStore, ticker_from_path
+from src.tracing import span
+
+
+QUEUE_DIR = Path("data") / "queue"
+LEASE_SECONDS = 600.0
+MAX_ATTEMPTS = 3
+STATES = ("pending", "claimed", "done", "failed")
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Shared-directory work queue for sharded batch runs.")
+    p.add_argument("--queue", default=str(QUEUE_DIR), help="Queue folder (shared by every worker host)")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    enq = sub.add_parser("enqueue", help="Add one unit per (config, feature file)")
+    enq.add_argument("--configs_dir", default="configs", help="Folder containing *.yaml configs")
+    enq.add_argument("--features", default="data/features", help="Folder containing *_feat.parquet files")
+    enq.add_argument("--out_root", default="data/reports/batch", help="Root folder to store each unit's outputs")
+    enq.add_argument("--rerun", action="store_true", help="Queue units again even if they are already done")
+
+    work = sub.add_parser("work", help="Claim and run units until the queue is empty")
+    work.add_argument("--lease", type=float, default=LEASE_SECONDS,
+                      help="Seconds without a heartbeat before a claimed unit is requeued")
+    work.add_argument("--max_attempts", type=int, default=MAX_ATTEMPTS)
+    work.add_argument("--wait", action="store_true",
+                      help="Keep polling while other workers still hold units (to pick up expired leases)")
+
+    sub.add_parser("status", help="Unit counts per state")
+    return p.parse_args()
+
+
+def worker_name() -> str:
+    """
+    host-pid, safe to use in file names.
+    """
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", f"{socket.gethostname()}-{os.getpid()}")
+
+
+def _write_json(path: Path, data: dict) -> None:
+    # Write-then-rename, so readers on other hosts never see a partial file
+    tmp = path.with_name(f".{path.name}.{worker_name()}.tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    tmp.replace(path)
+
+
+def _read_json(path: Path) -> dict | None:
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+class WorkQueue:
+    """
+    Work queue on a shared directory; no broker, only atomic renames.
+
+    Each unit is one JSON file that moves between state folders:
+      pending/<id>.json -> claimed/<id>@<worker>.json -> done/<id>.json
+                                                      -> failed/<id>.json
+    A worker claims a unit by renaming it out of pending/; when several workers
+    race for the same file exactly one rename succeeds. The claimed file's mtime
+    is the lease: the owner touches it periodically (renew), and any worker may
+    requeue claims whose mtime is older than lease_seconds (reap), counting an
+    attempt; after max_attempts the unit is moved to failed/. Keep lease_seconds
+    well above the clock skew between hosts.
+    """
+
+    def __init__(self, root: str | Path = QUEUE_DIR, lease_seconds: float = LEASE_SECONDS,
+                 max_attempts: int = MAX_ATTEMPTS):
+        self.root = Path(root)
+        self.lease_seconds = float(lease_seconds)
+        self.max_attempts = int(max_attempts)
+        for state in STATES:
+            (self.root / state).mkdir(parents=True, exist_ok=True)
+
+    def _dir(self, state: str) -> Path:
+        return self.root / state
+
+    def _ids(self, state: str) -> set[str]:
+        return {p.name.split("@")[0].removesuffix(".json") for p in self._dir(state).glob("*.json")}
+
+    # ------------------------------------------------------------
+    # Producer
+    # ------------------------------------------------------------
+    def enqueue(self, units: list[dict], rerun: bool = False) -> int:
+        """
+        Add units (dicts with a unique "id"). Units already pending or claimed are
+        skipped, and so are done ones unless rerun. Returns the number added.
+        """
+        skip = self._ids("pending") | self._ids("claimed")
+        if not rerun:
+            skip |= self._ids("done")
+        added = 0
+        for unit in units:
+            if unit["id"] in skip:
+                continue
+            (self._dir("failed") / f"{unit['id']}.json").unlink(missing_ok=True)
+            _write_json(self._dir("pending") / f"{unit['id']}.json", {**unit, "attempts": 0})
+            added += 1
+        return added
+
+    # ------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------
+    def claim(self, worker: str) -> tuple[dict, Path] | None:
+        """
+        Atomically take one pending unit. Returns (unit, claim path) or None if none is left.
+        """
+        for path in sorted(self._dir("pending").glob("*.json")):
+            target = self._dir("claimed") / f"{path.stem}@{worker}.json"
+            try:
+                path.rename(target)
+            except FileNotFoundError:
+                continue  # another worker won this one
+            os.utime(target)  # the lease starts now (rename keeps the old mtime)
+            unit = _read_json(target)
+            if unit is not None:
+                return unit, target
+        return None
+
+    def renew(self, claim: Path) -> bool:
+        """
+        Extend the lease. False means the claim was reaped (the unit is someone else's now).
+        """
+        try:
+            os.utime(claim)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _release(self, claim: Path) -> Path | None:
+        # Take the claim file out of claimed/ before recording an outcome, so the
+        # owner and a reaper never both handle it. None = it was already reaped.
+        mine = claim.with_name(f".{claim.name}.release")
+        try:
+            claim.rename(mine)
+        except FileNotFoundError:
+            return None
+        return mine
+
+    def complete(self, unit: dict, claim: Path, result: dict) -> bool:
+        """
+        Move a unit to done/. False (and nothing recorded) if the claim was reaped
+        meanwhile: the unit was requeued and its new owner reports it.
+        """
+        mine = self._release(claim)
+        if mine is None:
+            return False
+        _write_json(self._dir("done") / f"{unit['id']}.json", {**unit, "result": result})
+        mine.unlink(missing_ok=True)
+        return True
+
+    def fail(self, unit: dict, claim: Path, result: dict) -> bool:
+        """
+        Requeue a failed unit, or park it in failed/ after max_attempts.
+        False (and nothing recorded) if the claim was reaped meanwhile.
+        """
+        mine = self._release(claim)
+        if mine is None:
+            return False
+        self._retry({**unit, "result": result})
+        mine.unlink(missing_ok=True)
+        return True
+
+    def _retry(self, unit: dict) -> None:
+        unit = {**unit, "attempts": int(unit.get("attempts", 0)) + 1}
+        state = "failed" if unit["attempts"] >= self.max_attempts else "pending"
+        _write_json(self._dir(state) / f"{unit['id']}.json", unit)
+
+    def reap(self) -> int:
+        """
+        Requeue claims whose lease expired (their worker crashed or hung).
+        Returns the number requeued or failed.
+        """
+        cutoff = time.time() - self.lease_seconds
+        reaped = 0
+        for path in self._dir("claimed").glob("*.json"):
+            try:
+                if path.stat().st_mtime >= cutoff:
+                    continue
+                # Rename first so only one reaper handles it
+                mine = path.with_name(f".{path.name}.reap.{worker_name()}")
+                path.rename(mine)
+            except FileNotFoundError:
+                continue
+            unit = _read_json(mine)
+            if unit is not None:
+                expired = {"config": unit["config"], "status": "failed", "error": f"lease expired ({path.name})",
+                           "seconds": 0.0}
+                self._retry({**unit, "result": expired})
+                reaped += 1
+            mine.unlink(missing_ok=True)
+        return reaped
+
+    # ------------------------------------------------------------
+    # Inspection
+    # ------------------------------------------------------------
+    def counts(self) -> dict[str, int]:
+        return {state: len(list(self._dir(state).glob("*.json"))) for state in STATES}
+
+    def results(self) -> list[dict]:
+        """
+        run_batch-style result dicts of every finished unit (done and failed), with
+        run_name = the unit's output folder name and out_dir = that folder.
+        """
+        out = []
+        for state in ("done", "failed"):
+            for path in sorted(self._dir(state).glob("*.json")):
+                unit = _read_json(path)
+                if unit is not None and "result" in unit:
+                    out.append({**unit["result"], "run_name": Path(unit["out_dir"]).name, "out_dir": unit["out_dir"]})
+        return out
+
+
+def batch_id(out_root: str | Path) -> str:
+    """
+    Short stable id of an output root. Unit ids carry it, so the same configs
+    queued for another out_root are new units rather than already done ones.
+    """
+    return hashlib.sha1(str(Path(out_root).resolve()).encode()).hexdigest()[:10]
+
+
+def make_units(configs_dir: str | Path, features: str | Path, out_root: str | Path) -> list[dict]:
+    """
+    One unit per (config, feature file), with id <batch id>-<config>__<ticker>;
+    outputs go to out_root/<config>__<ticker>. Paths are stored absolute so
+    workers started from another directory read and write the same files.
+    """
+    configs = sorted(Path(configs_dir).glob("*.yaml"))
+    if not configs:
+        raise FileNotFoundError(f"No .yaml configs found in: {configs_dir}")
+    feature_files = FeatureStore(features).paths()
+    if not feature_files:
+        raise FileNotFoundError(f"No feature files found in {features}")
+
+    batch = batch_id(out_root)
+    out_root = Path(out_root).resolve()
+    units = []
+    for cfg in configs:
+        for feature_path in feature_files:
+            run_name = f"{cfg.stem}__{ticker_from_path(feature_path)}"
+            units.append({
+                "id": f"{batch}-{run_name}",
+                "batch": batch,
+                "config": str(cfg.resolve()),
+                "features": str(Path(feature_path).resolve()),
+                "out_dir": str(out_root / run_name),
+            })
+    return units
+
+
+def work(
+    queue: WorkQueue,
+    worker: str | None = None,
+    wait: bool = False,
+    poll_seconds: float = 2.0,
+) -> int:
+    """
+    Claim and run units until none are pending (with wait, until none are claimed
+    either, so expired leases of crashed workers are picked up too). A heartbeat
+    thread renews the lease while a unit runs. Returns the number of units run.
+    """
+    from src.tools.run_batch import _run_config_in_worker
+
+    worker = worker or worker_name()
+    ran = 0
+    while True:
+        queue.reap()
+        claimed = queue.claim(worker)
+        if claimed is None:
+            if wait and queue.counts()["claimed"] > 0:
+                time.sleep(poll_seconds)
+                continue
+            return ran
+        unit, claim = claimed
+
+        stop = threading.Event()
+
+        def heartbeat() -> None:
+            while not stop.wait(queue.lease_seconds / 3):
+                if not queue.renew(claim):
+                    return
+
+        beat = threading.Thread(target=heartbeat, daemon=True)
+        beat.start()
+        Path(unit["out_dir"]).mkdir(parents=True, exist_ok=True)
+        try:
+            with span("queue_unit", unit=unit["id"], worker=worker):
+                res = _run_config_in_worker(unit["config"], unit["features"], unit["out_dir"])
+        finally:
+            stop.set()
+            beat.join()
+        res = {**res, "run_name": Path(unit["out_dir"]).name, "worker": worker}
+
+        recorded = queue.complete(unit, claim, res) if res["status"] == "ok" else queue.fail(unit, claim, res)
+        ran += 1
+        note = "" if recorded else "  (lease lost: result dropped, the unit was requeued)"
+        print(f"[{res['status']:>6}] {unit['id']} on {worker} ({res['seconds']:.2f}s){note}")
+
+
+def main() -> None:
+    args = parse_args()
+    if args.cmd == "enqueue":
+        queue = WorkQueue(args.queue)
+        units = make_units(args.configs_dir, args.features, args.out_root)
+        added = queue.enqueue(units, rerun=args.rerun)
+        print(f"Queued {added} of {len(units)} units in {queue.root}")
+    elif args.cmd == "work":
+        queue = WorkQueue(args.queue, args.lease, args.max_attempts)
+        ran = work(queue, wait=args.wait)
+        print(f"Worker {worker_name()} ran {ran} units; queue: {queue.counts()}")
+    else:
+        print(WorkQueue(args.queue).counts())
+
+
+if __name__ == "__main__":
+    main()
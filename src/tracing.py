@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+import json
+import os
+from pathlib import Path
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# Set by enable(); inherited by subprocesses and pool workers so their spans land in the same folder
+TRACE_DIR_ENV = "AXIOM_TRACE_DIR"
+
+_lock = threading.Lock()
+_named_pids: set[int] = set()
+
+
+def enable(trace_dir: str | Path) -> Path:
+    """
+    Turn tracing on for this process and every child it starts.
+    Each process appends its spans to trace_dir/trace-<pid>.jsonl.
+    """
+    trace_dir = Path(trace_dir)
+    trace_dir.mkdir(parents=True, exist_ok=True)
+    os.environ[TRACE_DIR_ENV] = str(trace_dir.resolve())
+    return trace_dir
+
+
+def enabled() -> bool:
+    return bool(os.environ.get(TRACE_DIR_ENV))
+
+
+def peak_rss_mb() -> float | None:
+    """
+    Peak resident set size of this process in MB (None where unsupported).
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _emit(event: dict) -> None:
+    trace_dir = os.environ.get(TRACE_DIR_ENV)
+    if not trace_dir:
+        return
+
+    pid = os.getpid()
+    path = Path(trace_dir) / f"trace-{pid}.jsonl"
+    with _lock:
+        lines = []
+        if pid not in _named_pids:
+            _named_pids.add(pid)
+            name = " ".join(Path(a).name if i == 0 else a for i, a in enumerate(sys.argv[:3])) or "python"
+            lines.append({"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": f"{name} [{pid}]"}})
+        lines.append(event)
+        with path.open("a", encoding="utf-8") as f:
+            for e in lines:
+                f.write(json.dumps(e) + "\n")
+
+
+@contextmanager
+def span(name: str, cat: str = "axiom", **args):
+    """
+    Time a block as a Chrome-trace "complete" event (no-op unless tracing is enabled).
+    Extra keyword args are attached to the event, together with the peak RSS at exit.
+    """
+    if not enabled():
+        yield
+        return
+
+    start_us = time.time_ns() // 1000
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _emit({
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": start_us,
+            "dur": (time.perf_counter() - t0) * 1e6,
+            "pid": os.getpid(),
+            "tid": threading.get_ident() % 1_000_000,
+            "args": {**{k: _jsonable(v) for k, v in args.items()}, "peak_rss_mb": peak_rss_mb()},
+        })
+
+
+def _jsonable(v):
+    return v if isinstance(v, (int, float, str, bool, type(None))) else str(v)
+
+
+def merge_traces(trace_dir: str | Path, out_path: str | Path) -> Path:
+    """
+    Merge every process's trace-<pid>.jsonl into one Chrome-trace / Perfetto JSON file.
+    """
+    events = []
+    for part in sorted(Path(trace_dir).glob("trace-*.jsonl")):
+        with part.open("r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    events.append(json.loads(line))
+    events.sort(key=lambda e: (e.get("ph") != "M", e.get("ts", 0)))
+
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with out_path.open("w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    return out_path